@@ -0,0 +1,85 @@
+"""
+Measures the time from launching the CLI until its first prompt is shown.
+
+Every run starts a fresh interpreter, imports the CLI like main.py does and
+stops right before PyInquirer would wait for input. The first run also fills
+the logo cache, so it is reported separately from the warm runs.
+
+Usage:
+    python benchmarks/cli_startup.py [--runs 10] [--target-ms 300]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent.joinpath("src")
+READY = "FIRST_PROMPT_READY"
+
+CHILD = f"""
+import sys
+from models.cryptobountybot_cli import CryptoBountyBotCLI
+
+
+def first_prompt(menu_item):
+    sys.stderr.write("{READY}\\n")
+    sys.stderr.flush()
+    raise SystemExit(0)
+
+
+cli = CryptoBountyBotCLI()
+cli.show = first_prompt
+cli.start()
+"""
+
+
+def time_to_first_prompt() -> float:
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR), "TERM": "dumb"}
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", CHILD],
+        cwd=SRC_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    output = []
+    for line in proc.stderr:
+        if line.strip() == READY:
+            elapsed = time.perf_counter() - started
+            proc.wait()
+            return elapsed
+        output.append(line)
+    proc.wait()
+    raise RuntimeError(
+        f"CLI exited with {proc.returncode} before its first prompt:\n"
+        + "".join(output[-20:])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    cold = time_to_first_prompt() * 1000
+    warm = [time_to_first_prompt() * 1000 for _ in range(args.runs)]
+    median = statistics.median(warm)
+    print(f"first run (logo cache miss): {cold:.1f} ms")
+    print(
+        f"warm runs: median {median:.1f} ms, min {min(warm):.1f} ms, "
+        f"max {max(warm):.1f} ms over {args.runs} runs"
+    )
+    print(f"target: {args.target_ms:.0f} ms")
+    if median > args.target_ms:
+        print("time to first prompt is above the target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
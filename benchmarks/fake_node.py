@@ -0,0 +1,555 @@
+"""
+In-process stand-in for the Ethereum and zkSync Era JSON-RPC nodes.
+
+Serves the eth_* and zks_* methods the providers use over HTTP, with a
+configurable latency per method and a block time per chain. Transactions are
+accepted into a mempool and mined into the next block, L1 deposits to the
+zkSync main contract emit a NewPriorityRequest log and are executed on L2 after
+a short delay. Signatures of EIP-712 transactions are not checked, the sender
+is taken from the transaction.
+
+Usage:
+    python benchmarks/fake_node.py [--block-time 0.2] [--latency 0.01]
+"""
+
+import argparse
+import json
+import threading
+import time
+import traceback
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi.abi import decode, encode
+from eth_account import Account
+from eth_utils import (
+    collapse_if_tuple,
+    event_abi_to_log_topic,
+    function_signature_to_4byte_selector,
+    keccak,
+    to_checksum_address,
+)
+from zksync2.manage_contracts.zksync_contract import _zksync_abi_default
+
+ETH_CHAIN_ID = 5
+ZKSYNC_CHAIN_ID = 280
+MAIN_CONTRACT = "0x1908e2BF4a88F91E4eF0DC72f02b8Ea36BEa2319"
+BRIDGE_CONTRACTS = {
+    "l1Erc20DefaultBridge": "0x927DdFcc55164a59E0F33918D13a2D559bC10ce7",
+    "l2Erc20DefaultBridge": "0x00ff932A6d70E2B8f1Eb4919e1e09C1923E7e57b",
+    "l1WethBridge": "0x0000000000000000000000000000000000000000",
+    "l2WethBridge": "0x0000000000000000000000000000000000000000",
+}
+
+BASE_FEE = 10**9
+PRIORITY_FEE = 10**8
+TRANSFER_GAS = 21_000
+CALL_GAS = 180_000
+L2_TX_BASE_COST = 10**14
+# output of the fake Izumi pools per wei of input, before the fee of every hop
+SWAP_PRICE = 1500
+
+REQUEST_L2_TX_SELECTOR = function_signature_to_4byte_selector(
+    "requestL2Transaction(address,uint256,bytes,uint256,uint256,bytes[],address)"
+)
+L2_TX_BASE_COST_SELECTOR = function_signature_to_4byte_selector(
+    "l2TransactionBaseCost(uint256,uint256,uint256)"
+)
+QUOTER_SWAP_AMOUNT_SELECTOR = function_signature_to_4byte_selector(
+    "swapAmount(uint128,bytes)"
+)
+EIP_712_TX_TYPE = 0x71
+
+
+def _abi_default(abi_type: dict):
+    # zero value of an abi input, enough to encode a well-formed event
+    type_str = abi_type["type"]
+    if type_str.endswith("[]"):
+        return []
+    if type_str.endswith("]"):
+        size = int(type_str[type_str.rindex("[") + 1 : -1])
+        inner = {**abi_type, "type": type_str[: type_str.rindex("[")]}
+        return [_abi_default(inner) for _ in range(size)]
+    if type_str == "tuple":
+        return tuple(_abi_default(c) for c in abi_type["components"])
+    if type_str in ("bytes", "string"):
+        return b"" if type_str == "bytes" else ""
+    if type_str.startswith("bytes"):
+        return b"\x00" * int(type_str[5:])
+    if type_str == "address":
+        return "0x" + "00" * 20
+    if type_str == "bool":
+        return False
+    return 0
+
+
+def _priority_request_log_parts(l2_hash: bytes) -> tuple[str, bytes]:
+    event = next(
+        e for e in _zksync_abi_default() if e.get("name") == "NewPriorityRequest"
+    )
+    types = [collapse_if_tuple(i) for i in event["inputs"]]
+    values = [_abi_default(i) for i in event["inputs"]]
+    values[[i["name"] for i in event["inputs"]].index("txHash")] = l2_hash
+    return "0x" + event_abi_to_log_topic(event).hex(), encode(types, values)
+
+
+def _to_int(value: bytes) -> int:
+    return int.from_bytes(value, "big")
+
+
+def decode_raw_tx(raw: bytes) -> dict:
+    """
+    Decodes the fields of a signed legacy, EIP-1559 or EIP-712 transaction.
+
+    Args:
+        raw (bytes): The signed transaction.
+
+    Returns:
+        dict: The hash, type, sender, nonce, recipient, value and data of the transaction.
+    """
+    if raw[0] == EIP_712_TX_TYPE:
+        fields = rlp.decode(raw[1:])
+        nonce, to, value, data = fields[0], fields[4], fields[5], fields[6]
+        sender = to_checksum_address(fields[11])
+    elif raw[0] >= 0xC0:
+        fields = rlp.decode(raw)
+        nonce, to, value, data = fields[0], fields[3], fields[4], fields[5]
+        sender = Account.recover_transaction(raw)
+    else:
+        fields = rlp.decode(raw[1:])
+        nonce, to, value, data = fields[1], fields[5], fields[6], fields[7]
+        sender = Account.recover_transaction(raw)
+
+    return {
+        "hash": keccak(raw),
+        "type": 0 if raw[0] >= 0xC0 else raw[0],
+        "from": sender,
+        "nonce": _to_int(nonce),
+        "to": to_checksum_address(to) if to else None,
+        "value": _to_int(value),
+        "data": bytes(data),
+    }
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeChain:
+    """
+    The state and JSON-RPC methods of one fake chain.
+
+    A miner thread produces a block every `block_time` seconds. Every block
+    includes all pending transactions and the deposits that became due.
+
+    Args:
+        name (str): The name of the chain in reports.
+        chain_id (int): The chain id returned by eth_chainId.
+        block_time (float): Seconds between two blocks.
+        latency (dict[str, float]): Seconds every method takes, "default" for the rest.
+
+    Methods:
+        handle(payload): Answers a single or batched JSON-RPC request.
+        credit(addr, amount): Adds wei to the balance of an address.
+        schedule_deposit(l2_hash, to, amount, delay): Executes a deposit after `delay` seconds.
+        request_latency(payload): Returns the seconds a request takes.
+        counts(): Returns the number of calls per method.
+    """
+
+    def __init__(
+        self, name: str, chain_id: int, block_time: float, latency: dict[str, float]
+    ):
+        self.name = name
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.latency = latency
+        self.peer: "FakeChain | None" = None
+        self.deposit_delay = 0.0
+        self.unknown_methods = set()
+
+        self._lock = threading.Lock()
+        self._block_number = 0
+        self._balances: Counter = Counter()
+        self._nonces: Counter = Counter()
+        self._pending_nonces: Counter = Counter()
+        self._mempool: list[dict] = []
+        self._deposits: list[tuple[float, dict]] = []
+        self._blocks: dict[int, list[dict]] = {0: []}
+        self._receipts: dict[str, dict] = {}
+        self._calls: Counter = Counter()
+        self._stopped = threading.Event()
+        self._miner = threading.Thread(
+            target=self._mine_loop, name=f"fake-{name}-miner", daemon=True
+        )
+        self._miner.start()
+
+        self.methods = {
+            "eth_chainId": lambda: hex(self.chain_id),
+            "net_version": lambda: str(self.chain_id),
+            "eth_blockNumber": lambda: hex(self._block_number),
+            "eth_getBlockByNumber": self._get_block_by_number,
+            "eth_feeHistory": self._fee_history,
+            "eth_gasPrice": lambda: hex(BASE_FEE + PRIORITY_FEE),
+            "eth_maxPriorityFeePerGas": lambda: hex(PRIORITY_FEE),
+            "eth_getBalance": lambda addr, block="latest": hex(
+                self._balances[to_checksum_address(addr)]
+            ),
+            "eth_getTransactionCount": self._get_transaction_count,
+            "eth_estimateGas": self._estimate_gas,
+            "eth_call": self._call,
+            "eth_sendRawTransaction": self._send_raw_transaction,
+            "eth_getTransactionReceipt": lambda tx_hash: self._receipts.get(
+                tx_hash.lower()
+            ),
+            "zks_getMainContract": lambda: MAIN_CONTRACT,
+            "zks_L1ChainId": lambda: hex(ETH_CHAIN_ID),
+            "zks_getBridgeContracts": lambda: BRIDGE_CONTRACTS,
+        }
+
+    def handle(self, payload):
+        """
+        Answers a single or batched JSON-RPC request.
+
+        Args:
+            payload (dict | list[dict]): The decoded request body.
+
+        Returns:
+            dict | list[dict]: The JSON-RPC responses.
+        """
+        if isinstance(payload, list):
+            return [self._handle_one(req) for req in payload]
+        return self._handle_one(payload)
+
+    def request_latency(self, payload) -> float:
+        """
+        Returns the seconds a request takes, the slowest call of a batch.
+        """
+        reqs = payload if isinstance(payload, list) else [payload]
+        default = self.latency.get("default", 0.0)
+        return max(
+            (self.latency.get(req.get("method"), default) for req in reqs),
+            default=default,
+        )
+
+    def counts(self) -> Counter:
+        """
+        Returns the number of calls per method, HTTP requests under "http".
+        """
+        with self._lock:
+            return Counter(self._calls)
+
+    def count_http(self) -> None:
+        with self._lock:
+            self._calls["http"] += 1
+
+    def credit(self, addr: str, amount: int) -> None:
+        """
+        Adds wei to the balance of an address.
+        """
+        with self._lock:
+            self._balances[to_checksum_address(addr)] += amount
+
+    def schedule_deposit(self, l2_hash: bytes, to: str, amount: int, delay: float):
+        """
+        Executes a deposit on this chain in the first block after `delay` seconds.
+        """
+        tx = {
+            "hash": l2_hash,
+            "type": 0xFF,
+            "from": to,
+            "nonce": None,
+            "to": to,
+            "value": amount,
+            "data": b"",
+        }
+        with self._lock:
+            self._deposits.append((time.monotonic() + delay, tx))
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _handle_one(self, req: dict) -> dict:
+        method = req.get("method")
+        with self._lock:
+            self._calls[method] += 1
+        resp = {"jsonrpc": "2.0", "id": req.get("id")}
+        handler = self.methods.get(method)
+        if handler is None:
+            self.unknown_methods.add(method)
+            resp["error"] = {"code": -32601, "message": f"method {method} not found"}
+            return resp
+        try:
+            resp["result"] = handler(*req.get("params", []))
+        except RPCError as e:
+            resp["error"] = {"code": e.code, "message": str(e)}
+        return resp
+
+    def _mine_loop(self):
+        while not self._stopped.wait(self.block_time):
+            try:
+                self._mine()
+            except Exception:
+                traceback.print_exc()
+
+    def _mine(self):
+        now = time.monotonic()
+        with self._lock:
+            self._block_number += 1
+            number = self._block_number
+            due = [tx for at, tx in self._deposits if at <= now]
+            self._deposits = [(at, tx) for at, tx in self._deposits if at > now]
+            txs, self._mempool = self._mempool + due, []
+            self._blocks[number] = txs
+            block_hash = "0x" + keccak(f"{self.name}:{number}".encode()).hex()
+            for index, tx in enumerate(txs):
+                self._apply(tx, number, block_hash, index)
+
+    def _apply(self, tx: dict, number: int, block_hash: str, index: int):
+        tx_hash = "0x" + tx["hash"].hex()
+        if tx["nonce"] is not None:
+            self._nonces[tx["from"]] = max(self._nonces[tx["from"]], tx["nonce"] + 1)
+            self._balances[tx["from"]] -= tx["value"]
+        if tx["to"] is not None:
+            self._balances[tx["to"]] += tx["value"]
+
+        logs = []
+        if tx["to"] == MAIN_CONTRACT and tx["data"][:4] == REQUEST_L2_TX_SELECTOR:
+            logs.append(self._execute_deposit(tx, tx_hash, number, block_hash, index))
+
+        gas = TRANSFER_GAS if not tx["data"] else CALL_GAS
+        self._receipts[tx_hash] = {
+            "transactionHash": tx_hash,
+            "transactionIndex": hex(index),
+            "blockHash": block_hash,
+            "blockNumber": hex(number),
+            "from": tx["from"],
+            "to": tx["to"],
+            "cumulativeGasUsed": hex(gas * (index + 1)),
+            "gasUsed": hex(gas),
+            "effectiveGasPrice": hex(BASE_FEE + PRIORITY_FEE),
+            "contractAddress": None,
+            "logs": logs,
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+            "type": hex(tx["type"]),
+        }
+
+    def _execute_deposit(self, tx, tx_hash, number, block_hash, index) -> dict:
+        to, l2_value = decode(["address", "uint256"], tx["data"][4:68])
+        l2_hash = keccak(b"priority:" + tx["hash"])
+        # the deposit leaves L1 with the value, only the L2 value arrives
+        self._balances[MAIN_CONTRACT] -= tx["value"]
+        self.peer.schedule_deposit(
+            l2_hash, to_checksum_address(to), l2_value, self.deposit_delay
+        )
+        topic, data = _priority_request_log_parts(l2_hash)
+        return {
+            "address": MAIN_CONTRACT,
+            "topics": [topic],
+            "data": "0x" + data.hex(),
+            "blockNumber": hex(number),
+            "blockHash": block_hash,
+            "transactionHash": tx_hash,
+            "transactionIndex": hex(index),
+            "logIndex": "0x0",
+            "removed": False,
+        }
+
+    def _get_block_by_number(self, block: str, full_transactions: bool = False):
+        with self._lock:
+            number = (
+                self._block_number if block in ("latest", "pending") else int(block, 16)
+            )
+            txs = self._blocks.get(number)
+        if txs is None:
+            return None
+        block_hash = "0x" + keccak(f"{self.name}:{number}".encode()).hex()
+        return {
+            "number": hex(number),
+            "hash": block_hash,
+            "parentHash": "0x" + keccak(f"{self.name}:{number - 1}".encode()).hex(),
+            "timestamp": hex(int(time.time())),
+            "baseFeePerGas": hex(BASE_FEE),
+            "gasLimit": hex(30_000_000),
+            "gasUsed": hex(TRANSFER_GAS * len(txs)),
+            "miner": "0x" + "00" * 20,
+            "transactions": [
+                (
+                    self._tx_object(tx, number, block_hash, i)
+                    if full_transactions
+                    else "0x" + tx["hash"].hex()
+                )
+                for i, tx in enumerate(txs)
+            ],
+        }
+
+    @staticmethod
+    def _tx_object(tx: dict, number: int, block_hash: str, index: int) -> dict:
+        return {
+            "hash": "0x" + tx["hash"].hex(),
+            "blockNumber": hex(number),
+            "blockHash": block_hash,
+            "transactionIndex": hex(index),
+            "from": tx["from"],
+            "to": tx["to"],
+            "nonce": hex(tx["nonce"] or 0),
+            "value": hex(tx["value"]),
+            "input": "0x" + tx["data"].hex(),
+            "gas": hex(CALL_GAS),
+            "gasPrice": hex(BASE_FEE + PRIORITY_FEE),
+        }
+
+    def _fee_history(self, block_count, newest_block, percentiles):
+        count = int(block_count, 16) if isinstance(block_count, str) else block_count
+        return {
+            "oldestBlock": hex(max(self._block_number - count + 1, 0)),
+            "baseFeePerGas": [hex(BASE_FEE)] * (count + 1),
+            "gasUsedRatio": [0.5] * count,
+            "reward": [[hex(PRIORITY_FEE)] * len(percentiles)] * count,
+        }
+
+    def _get_transaction_count(self, addr: str, block: str = "latest") -> str:
+        addr = to_checksum_address(addr)
+        with self._lock:
+            if block == "pending":
+                return hex(max(self._nonces[addr], self._pending_nonces[addr]))
+            return hex(self._nonces[addr])
+
+    def _estimate_gas(self, tx: dict, block: str = "latest") -> str:
+        data = tx.get("data") or tx.get("input") or "0x"
+        return hex(TRANSFER_GAS if data in ("0x", "") else CALL_GAS)
+
+    def _call(self, tx: dict, block: str = "latest") -> str:
+        data = bytes.fromhex((tx.get("data") or tx.get("input") or "0x")[2:])
+        selector = data[:4]
+        if selector == L2_TX_BASE_COST_SELECTOR:
+            return "0x" + encode(["uint256"], [L2_TX_BASE_COST]).hex()
+        if selector == QUOTER_SWAP_AMOUNT_SELECTOR:
+            amount, path = decode(["uint128", "bytes"], data[4:])
+            # the path is token (20 bytes) followed by fee (3 bytes) and token per hop
+            fees = [_to_int(path[i : i + 3]) for i in range(20, len(path), 23)]
+            acquire = amount * SWAP_PRICE
+            for fee in fees:
+                acquire = acquire * (1_000_000 - fee) // 1_000_000
+            return "0x" + encode(["uint256", "int24[]"], [acquire, []]).hex()
+        return "0x" + "00" * 32
+
+    def _send_raw_transaction(self, raw: str) -> str:
+        tx = decode_raw_tx(bytes.fromhex(raw[2:]))
+        sender = tx["from"]
+        with self._lock:
+            if tx["nonce"] < self._nonces[sender]:
+                raise RPCError(-32000, "nonce too low")
+            self._pending_nonces[sender] = max(
+                self._pending_nonces[sender], tx["nonce"] + 1
+            )
+            self._mempool.append(tx)
+        return "0x" + tx["hash"].hex()
+
+
+class _RPCHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        chain = self.server.chain
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        payload = json.loads(body)
+        chain.count_http()
+        time.sleep(chain.request_latency(payload))
+        data = json.dumps(chain.handle(payload)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeNode:
+    """
+    Serves a fake Ethereum and a fake zkSync Era chain on local HTTP ports.
+
+    Args:
+        eth_block_time (float): Seconds between two L1 blocks.
+        zk_block_time (float): Seconds between two L2 blocks.
+        latency (dict[str, float]): Seconds every method takes, "default" for the rest.
+        deposit_delay (float): Seconds between an L1 deposit and its L2 execution.
+
+    Methods:
+        start(): Starts serving and returns the URLs of the L1 and L2 node.
+        stop(): Stops serving and mining.
+        counts(): Returns the number of calls per method of both chains.
+    """
+
+    def __init__(
+        self,
+        eth_block_time: float = 0.2,
+        zk_block_time: float = 0.1,
+        latency: dict[str, float] = None,
+        deposit_delay: float = 0.0,
+    ):
+        latency = latency or {}
+        self.eth = FakeChain("eth", ETH_CHAIN_ID, eth_block_time, latency)
+        self.zk = FakeChain("zksync", ZKSYNC_CHAIN_ID, zk_block_time, latency)
+        self.eth.peer = self.zk
+        self.eth.deposit_delay = deposit_delay
+        self._servers = []
+
+    def start(self) -> tuple[str, str]:
+        """
+        Starts serving both chains on free local ports.
+
+        Returns:
+            tuple[str, str]: The URLs of the L1 and the L2 node.
+        """
+        urls = []
+        for chain in (self.eth, self.zk):
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _RPCHandler)
+            server.daemon_threads = True
+            server.chain = chain
+            threading.Thread(
+                target=server.serve_forever, name=f"fake-{chain.name}", daemon=True
+            ).start()
+            self._servers.append(server)
+            urls.append(f"http://127.0.0.1:{server.server_address[1]}")
+        return urls[0], urls[1]
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self.eth.stop()
+        self.zk.stop()
+
+    def counts(self) -> dict[str, Counter]:
+        return {self.eth.name: self.eth.counts(), self.zk.name: self.zk.counts()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--block-time", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    node = FakeNode(
+        eth_block_time=args.block_time,
+        zk_block_time=args.block_time / 2,
+        latency={"default": args.latency},
+    )
+    eth_url, zk_url = node.start()
+    print(f"ETH_RPC_URLS={eth_url}")
+    print(f"ZKSYNC_RPC_URLS={zk_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        node.stop()
+
+
+if __name__ == "__main__":
+    main()
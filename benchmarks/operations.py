@@ -0,0 +1,403 @@
+"""
+Runs the ProviderManager operations end to end against a fake JSON-RPC node.
+
+For every wallet count a fresh process starts a FakeNode, points the bot at it
+and at a temporary data directory, and runs generate_wallet, bridge, swap and
+one BackgroundWorker cycle of a generate_wallet|swap pipeline. Every operation
+reports its throughput, the p50/p99 latency of the provider call per wallet and
+the JSON-RPC calls it sent, --rpc-time adds the RPC time per operation and
+method recorded by RPCMetrics. bridge and swap work on the wallets generated
+before them, so they need generate_wallet to run first.
+
+With --rpc-mode record the JSON-RPC traffic of every wallet count is saved to a
+cassette in --cassette-dir, --rpc-mode replay runs the same operations from it
+without the node at full speed, so only the CPU time of the bot is measured, and
+replay_timed adds the recorded latencies back.
+
+With --json the results are saved, and with --baseline a saved run is compared
+against: the exit code is 1 when throughput drops or RPC calls grow by more than
+the tolerance.
+
+Usage:
+    python benchmarks/operations.py [--wallets 10 100 1000] [--ops generate_wallet bridge swap worker]
+        [--exec-mode sync] [--concurrency 20] [--bulk-feed]
+        [--block-time 0.2] [--latency 0.01] [--method-latency eth_call=0.05]
+        [--rpc-time] [--rpc-mode record] [--cassette-dir cassettes]
+        [--json results.json] [--baseline results.json] [--tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent.joinpath("src")
+OPS = ["generate_wallet", "bridge", "swap", "worker"]
+OP_IDS = {"generate_wallet": 1, "bridge": 2, "swap": 3, "worker": 4}
+FUNDER_BALANCE = 10**27
+
+
+class OperationRecorder:
+    """
+    Wraps provider methods to time every call under the running operation.
+
+    Methods:
+        wrap(obj, name, count): Times the method of an object, sync or async.
+        start(op): Starts attributing calls to an operation.
+        summary(op, elapsed): Returns the statistics of an operation.
+    """
+
+    def __init__(self):
+        self.op = None
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+        self._wallets = Counter()
+        self._errors = Counter()
+
+    def start(self, op: str) -> None:
+        self.op = op
+
+    def wrap(self, obj, name: str, count=lambda args, result: 1) -> None:
+        method = getattr(obj, name)
+
+        if asyncio.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await method(*args, **kwargs)
+                except Exception:
+                    self._record(started, 1, 1)
+                    raise
+                self._record(started, count(args, result), _failed(result))
+                return result
+
+        else:
+
+            @functools.wraps(method)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = method(*args, **kwargs)
+                except Exception:
+                    self._record(started, 1, 1)
+                    raise
+                self._record(started, count(args, result), _failed(result))
+                return result
+
+        setattr(obj, name, timed)
+
+    def summary(self, op: str, elapsed: float) -> dict:
+        samples = sorted(self._samples[op])
+        wallets = self._wallets[op]
+        return {
+            "seconds": elapsed,
+            "wallets": wallets,
+            "errors": self._errors[op],
+            "throughput": wallets / elapsed if elapsed else 0.0,
+            "p50_ms": _percentile(samples, 50) * 1000,
+            "p99_ms": _percentile(samples, 99) * 1000,
+        }
+
+    def _record(self, started: float, wallets: int, errors: int) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._samples[self.op].append(elapsed)
+            self._wallets[self.op] += wallets
+            self._errors[self.op] += errors
+
+
+def _failed(result) -> int:
+    # bulk funding and swaps report the failed wallets in its result instead of raising
+    if isinstance(result, dict):
+        return sum(1 for res in result.values() if isinstance(res, Exception))
+    return 0
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(int(len(samples) * pct / 100), len(samples) - 1)]
+
+
+def _write_fixtures(data_dir: Path, wallets: int, bulk_feed: bool, funder):
+    data_dir.joinpath("wallets").mkdir(parents=True)
+    data_dir.joinpath("pipelines").mkdir(parents=True)
+    data_dir.joinpath("logs").mkdir(parents=True)
+    with open(data_dir.joinpath("wallets/sugar_daddy_wallets.csv"), "w") as f:
+        f.write("priv_key,addr,balance,last_updated,zk_balance,zk_last_updated\n")
+        f.write(f"{funder.key.hex()},{funder.address},,,,\n")
+
+    generate = {
+        "wallet_count": wallets,
+        "blockchain": "zksync",
+        "feed": True,
+        "feed_amount": 0.01,
+        "bulk_feed": bulk_feed,
+        "swap_fraction": 0.2,
+    }
+    ops = [
+        {"id": 1, "name": "generate_wallet", "details": generate},
+        {"id": 2, "name": "bridge", "details": {"from": "ETH", "to": "ZKSYNC"}},
+        {"id": 3, "name": "swap", "details": {"swap_fraction": 0.2}},
+        {"id": 4, "name": "generate_wallet|swap", "details": generate},
+    ]
+    with open(data_dir.joinpath("pipelines/operations.json"), "w") as f:
+        json.dump(ops, f)
+    with open(data_dir.joinpath("pipelines/pipelines.csv"), "w") as f:
+        f.write("id,name,op_id,next_exec,repeat_every_time,diff_time,state\n")
+        f.write("1,Benchmark Pipeline,4,0,3600,0,active\n")
+
+
+def run_benchmark(config: dict) -> dict:
+    """
+    Runs the operations of one wallet count in the current process.
+
+    Must run in a fresh process, the services keep process-wide singletons.
+
+    Args:
+        config (dict): The parsed command line options and the wallet count.
+
+    Returns:
+        dict: The statistics and RPC counts per operation.
+    """
+    sys.path.insert(0, str(BENCH_DIR))
+    sys.path.insert(0, str(SRC_DIR))
+    from eth_account import Account
+    from fake_node import FakeNode
+
+    node = FakeNode(
+        eth_block_time=config["block_time"],
+        zk_block_time=config["block_time"] / 2,
+        latency={"default": config["latency"], **config["method_latency"]},
+    )
+    eth_url, zk_url = node.start()
+    funder = Account.create()
+    node.eth.credit(funder.address, FUNDER_BALANCE)
+
+    data_dir = Path(tempfile.mkdtemp(prefix="bench-")).joinpath("data")
+    _write_fixtures(data_dir, config["wallets"], config["bulk_feed"], funder)
+    os.environ.update(
+        ETH_RPC_URLS=eth_url,
+        ZKSYNC_RPC_URLS=zk_url,
+        EXEC_MODE=config["exec_mode"],
+        MAX_CONCURRENCY=str(config["concurrency"]),
+        RPC_MODE=config["rpc_mode"],
+        RPC_CASSETTE=str(
+            Path(config["cassette_dir"]).joinpath(f"rpc-{config['wallets']}.jsonl.gz")
+        ),
+    )
+
+    # the services read their paths on import, so they are redirected first
+    from utils import constants
+
+    constants.PIPE_PATH = data_dir.joinpath("pipelines/pipelines.csv")
+    constants.OPS_PATH = data_dir.joinpath("pipelines/operations.json")
+    constants.BACKGR_WORKER_LOG_PATH = data_dir.joinpath("logs/background_worker.log")
+    constants.APP_LOG_PATH = constants.BACKGR_WORKER_LOG_PATH
+    constants.TX_JOURNAL_DIR = data_dir.joinpath("transactions")
+    constants.CHECKPOINTS_PATH = data_dir.joinpath("checkpoints.db")
+    constants.ETH_SUGAR_DADDY_WALLETS_PATH = data_dir.joinpath(
+        "wallets/sugar_daddy_wallets.csv"
+    )
+    constants.FARMING_WALLETS_PATH = data_dir.joinpath("wallets/farming_wallets.csv")
+    constants.RPC_METRICS_PATH = data_dir.joinpath("metrics/rpc.prom")
+
+    from models.background_worker import BackgroundWorker
+    from services.managers.mainnet.metrics import RPCMetrics, format_summary
+    from services.tracker.receipts import ReceiptTracker
+    from utils.enums import Mainnet
+
+    ReceiptTracker.POLL_INTERVALS = {
+        Mainnet.ETHEREUM: config["block_time"] / 2,
+        Mainnet.ZKSYNC_ERA: config["block_time"] / 4,
+    }
+    worker = BackgroundWorker()
+    prov_mngr = worker.prov_mngr
+
+    recorder = OperationRecorder()
+    if config["exec_mode"] == "async":
+        recorder.wrap(prov_mngr.async_zk_sync_prov, "transfer_and_bridge")
+        recorder.wrap(prov_mngr.async_zk_sync_prov, "bridge")
+        recorder.wrap(prov_mngr.async_izumi_prov, "swap")
+        recorder.wrap(
+            prov_mngr.async_izumi_prov,
+            "swap_many",
+            count=lambda args, result: len(args[0]),
+        )
+    else:
+        recorder.wrap(prov_mngr.zk_sync_prov, "transfer_and_bridge")
+        recorder.wrap(prov_mngr.zk_sync_prov, "bridge")
+        recorder.wrap(prov_mngr.izumi_prov, "swap")
+        recorder.wrap(
+            prov_mngr.izumi_prov, "swap_many", count=lambda args, result: len(args[0])
+        )
+    recorder.wrap(
+        prov_mngr.zk_sync_prov,
+        "transfer_and_bridge_many",
+        count=lambda args, result: len(args[1]),
+    )
+
+    results = {}
+    try:
+        for op in config["ops"]:
+            recorder.start(op)
+            before = node.counts()
+            started = time.perf_counter()
+            if op == "worker":
+                _run_worker_cycle(worker)
+            elif op == "bridge" and config["exec_mode"] == "sync":
+                # the sync dispatch has no bridge operation, call it directly
+                prov_mngr.bridge(prov_mngr.ops[OP_IDS[op]]["details"])
+            else:
+                prov_mngr.exec_op_by_id(OP_IDS[op])
+            elapsed = time.perf_counter() - started
+            after = node.counts()
+            results[op] = {
+                **recorder.summary(op, elapsed),
+                "rpc": {chain: dict(after[chain] - before[chain]) for chain in after},
+            }
+    finally:
+        node.stop()
+
+    unknown = node.eth.unknown_methods | node.zk.unknown_methods
+    return {
+        "results": results,
+        "unknown_methods": sorted(unknown),
+        "rpc_time": format_summary(RPCMetrics().snapshot()),
+    }
+
+
+def _run_worker_cycle(worker) -> None:
+    worker.update_state()
+    for index in worker.scheduler.pop_due():
+        worker.dispatch(index)
+    while True:
+        with worker.pipes_lock:
+            if not worker.running:
+                return
+        time.sleep(0.01)
+
+
+def _print_results(wallets: int, run: dict, rpc_time: bool) -> None:
+    print(f"\n== {wallets} wallets ==")
+    print(
+        f"{'operation':<16}{'wallets':>8}{'errors':>8}{'seconds':>10}"
+        f"{'wallets/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'rpc':>8}{'http':>8}"
+    )
+    for op, res in run["results"].items():
+        rpc = sum(n for c in res["rpc"].values() for m, n in c.items() if m != "http")
+        http = sum(c.get("http", 0) for c in res["rpc"].values())
+        print(
+            f"{op:<16}{res['wallets']:>8}{res['errors']:>8}{res['seconds']:>10.2f}"
+            f"{res['throughput']:>11.1f}{res['p50_ms']:>10.1f}{res['p99_ms']:>10.1f}"
+            f"{rpc:>8}{http:>8}"
+        )
+    for op, res in run["results"].items():
+        for chain, counts in res["rpc"].items():
+            methods = ", ".join(
+                f"{m}={n}" for m, n in sorted(counts.items()) if m != "http"
+            )
+            if methods:
+                print(f"  {op} {chain}: {methods}")
+    if run["unknown_methods"]:
+        print(f"  unsupported RPC methods: {', '.join(run['unknown_methods'])}")
+    if rpc_time:
+        print(run["rpc_time"])
+
+
+def _regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for wallets, run in results.items():
+        for op, res in run["results"].items():
+            base = baseline.get(wallets, {}).get("results", {}).get(op)
+            if base is None:
+                continue
+            if res["throughput"] < base["throughput"] * (1 - tolerance):
+                found.append(
+                    f"{op} @ {wallets} wallets: {res['throughput']:.1f} wallets/s, "
+                    f"baseline {base['throughput']:.1f}"
+                )
+            for chain, counts in res["rpc"].items():
+                calls = sum(counts.values())
+                base_calls = sum(base["rpc"].get(chain, {}).values())
+                if calls > base_calls * (1 + tolerance):
+                    found.append(
+                        f"{op} @ {wallets} wallets: {calls} {chain} RPC calls, "
+                        f"baseline {base_calls}"
+                    )
+    return found
+
+
+def _method_latency(value: str) -> tuple[str, float]:
+    method, seconds = value.split("=")
+    return method, float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--wallets", type=int, nargs="+", default=[10])
+    parser.add_argument("--ops", nargs="+", choices=OPS, default=OPS)
+    parser.add_argument("--exec-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--bulk-feed", action="store_true")
+    parser.add_argument("--block-time", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--method-latency", type=_method_latency, nargs="*", default=[])
+    parser.add_argument("--rpc-time", action="store_true")
+    parser.add_argument(
+        "--rpc-mode",
+        choices=["live", "record", "replay", "replay_timed"],
+        default="live",
+    )
+    parser.add_argument("--cassette-dir", type=Path, default=Path("cassettes"))
+    parser.add_argument("--json", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {}
+    for wallets in args.wallets:
+        config = {
+            "wallets": wallets,
+            "ops": args.ops,
+            "exec_mode": args.exec_mode,
+            "concurrency": args.concurrency,
+            "bulk_feed": args.bulk_feed,
+            "block_time": args.block_time,
+            "latency": args.latency,
+            "method_latency": dict(args.method_latency),
+            "rpc_mode": args.rpc_mode,
+            "cassette_dir": str(args.cassette_dir.resolve()),
+        }
+        # every wallet count gets a fresh process and therefore fresh singletons
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            run = executor.submit(run_benchmark, config).result()
+        results[str(wallets)] = run
+        _print_results(wallets, run, args.rpc_time)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        found = _regressions(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in found:
+            print(f"regression: {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
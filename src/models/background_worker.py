@@ -1,60 +1,259 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 from math import floor
 import os
 import random
-from subprocess import Popen, DEVNULL
+import signal
+import threading
 
 import time
 import pandas as pd
+from models.control import ControlServer, ErrorLog, worker_socket_path
+from models.scheduler import PipelineScheduler
+from services.managers.account.shard import current_shard
+from services.managers.mainnet.metrics import RPCMetrics
 from services.managers.provider.core import ProviderManager
 from utils.constants import (
+    CONFIG_POLL_INTERVAL,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PARALLEL_PIPES,
+    METRICS_EXPORT_INTERVAL,
     OPS_PATH,
     PIPE_PATH,
+    RPC_METRICS_PATH,
+    WORKER_ERRORS_KEPT,
 )
+from utils.enums import ExecutionMode
 from utils.logger import logger
-from utils.utils import singleton
+from utils.utils import FileLock, singleton
 
 
 @singleton
 class BackgroundWorker:
+    """
+    Runs the active pipelines whenever they are due.
+
+    Pipelines are kept in a PipelineScheduler, so the worker sleeps exactly until
+    the next one is due. The pipelines and operations files are only re-read when
+    their modification time changes, which is checked every CONFIG_POLL_INTERVAL
+    seconds.
+
+    Due pipelines run in parallel on a bounded thread pool (PARALLEL_PIPES). A
+    pipeline is never dispatched again while it is still running, and its next
+    execution time is updated and saved under a lock once it finishes.
+
+    The RPC metrics of all pipelines are written to RPC_METRICS_PATH every
+    METRICS_EXPORT_INTERVAL seconds in the Prometheus text format.
+
+    Started by a WorkerSupervisor, the worker only works on the farming wallets
+    of its shard. Every shard runs all pipelines, but only the first one saves
+    the execution times, the others pick them up when the file is reloaded.
+
+    The worker is controlled through the Unix socket of its shard, see
+    ControlServer. Draining stops dispatching while the running pipelines finish,
+    stopping drains and exits once nothing runs anymore, so no transaction is cut
+    off. SIGTERM and SIGINT stop the worker the same way.
+    """
+
     def __init__(self):
-        self.operations = self.load_ops()
+        self.shard = current_shard()
+        self.scheduler = PipelineScheduler()
+        self.config_mtimes = {}
+        self.pipes_lock = threading.RLock()
+        self.running = set()
+        self.started = {}
+        self.draining = False
+        self.stopping = False
+        self.started_at = time.time()
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("PARALLEL_PIPES", DEFAULT_PARALLEL_PIPES)),
+            thread_name_prefix="pipeline",
+        )
+        self.ops = self.load_ops()
         self.pipes = self.read_pip()
-        self.prov_mngr = ProviderManager()
+        self.prov_mngr = ProviderManager(
+            exec_mode=ExecutionMode(os.environ.get("EXEC_MODE", "sync")),
+            concurrency=int(os.environ.get("MAX_CONCURRENCY", DEFAULT_CONCURRENCY)),
+            shard=self.shard,
+        )
+        self.error_log = ErrorLog(WORKER_ERRORS_KEPT)
+        logger.addHandler(self.error_log)
+        self.control = ControlServer(
+            worker_socket_path(self.shard.index),
+            {
+                "status": self.status,
+                "errors": self.error_log.records,
+                "metrics": self.metrics,
+                "drain": self.drain,
+                "resume": self.resume,
+                "stop": self.stop,
+                "reload": self.reload,
+            },
+        )
+        self.schedule_pipes()
 
     def run(self):
-        logger.info(f"Worker on process: {os.getpid()}")
-        while True:
-            self.update_state()
-            pipes_to_run = self.get_pipes_to_run()
-            pipe_names = ", ".join(pipes_to_run["name"].astype(str))
-            if len(pipes_to_run) == 0:
-                logger.info("No pipes to run, sleeping...")
-            else:
-                logger.info(f"running pipes: { pipe_names }")
-
-            for index, row in pipes_to_run.iterrows():
-                self.prov_mngr.exec_op_by_id(row["op_id"])
-                self.update_next_exec_time(index)
+        logger.info(
+            f"Worker on process: {os.getpid()}, "
+            f"shard {self.shard.index + 1}/{self.shard.count}"
+        )
+        metrics_path = RPC_METRICS_PATH
+        if self.shard.count > 1:
+            metrics_path = RPC_METRICS_PATH.with_stem(f"rpc-{self.shard.index}")
+            RPCMetrics().const_labels = {"shard": str(self.shard.index)}
+        RPCMetrics().start_exporting(metrics_path, METRICS_EXPORT_INTERVAL)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        self.control.start()
+        try:
+            while not (self.stopping and not self.running):
+                self.update_state()
+                if not self.draining:
+                    for index in self.scheduler.pop_due():
+                        self.dispatch(index)
+
+                self.scheduler.wait(CONFIG_POLL_INTERVAL, ignore_due=self.draining)
+        finally:
+            self.control.close()
+        self.executor.shutdown()
+        logger.info("Worker stopped")
+
+    def status(self) -> dict:
+        with self.pipes_lock:
+            running = [
+                {"name": str(self.pipes.loc[i, "name"]), "since": since}
+                for i, since in self.started.items()
+                if i in self.pipes.index
+            ]
+            queued = len(self.running) - len(self.started)
+        if self.stopping:
+            state = "stopping"
+        elif self.draining:
+            state = "draining"
+        else:
+            state = "running"
+        return {
+            "shard": self.shard.index,
+            "shards": self.shard.count,
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "state": state,
+            "wallets": self.prov_mngr.farming_acct_mngr.count_accts(),
+            "running": running,
+            "queued": queued,
+            "scheduled": len(self.scheduler),
+            "next_due": self.scheduler.next_due(),
+        }
+
+    def metrics(self) -> list[dict]:
+        rows = []
+        for (provider, operation, method), values in RPCMetrics().snapshot().items():
+            # the histogram buckets stay in the Prometheus textfile
+            values.pop("buckets")
+            rows.append(
+                {
+                    "provider": provider,
+                    "operation": operation,
+                    "method": method,
+                    **values,
+                }
+            )
+        return rows
+
+    def drain(self) -> dict:
+        logger.info("Draining, no new pipelines are dispatched")
+        self.draining = True
+        self.scheduler.wake()
+        return self.status()
 
-            time.sleep(100)
+    def resume(self) -> dict:
+        if self.stopping:
+            raise RuntimeError("The worker is stopping")
+        logger.info("Resuming, pipelines are dispatched again")
+        self.draining = False
+        self.scheduler.wake()
+        return self.status()
 
-    def get_pipes_to_run(self):
-        return self.pipes[
-            (self.pipes["next_exec"] < time.time()) & (self.pipes["state"] == "active")
-        ]
+    def stop(self) -> dict:
+        logger.info("Stopping once the running pipelines finished")
+        self.draining = self.stopping = True
+        self.scheduler.wake()
+        return self.status()
+
+    def reload(self) -> dict:
+        logger.info("Reloading pipelines and operations")
+        # forgetting the modification times makes the main loop re-read both files
+        self.config_mtimes.clear()
+        self.scheduler.wake()
+        return self.status()
+
+    def _handle_signal(self, signum, frame):
+        # no wake(), the handler may interrupt the main thread holding the event's
+        # lock, the main loop notices within CONFIG_POLL_INTERVAL
+        self.draining = self.stopping = True
+
+    def dispatch(self, index):
+        with self.pipes_lock:
+            if index in self.running:
+                return
+            self.running.add(index)
+            name = self.pipes.loc[index, "name"]
+            op_id = self.pipes.loc[index, "op_id"]
+
+        logger.info(f"running pipe: {name}")
+        self.executor.submit(self.run_pipe, index, op_id)
+
+    def run_pipe(self, index, op_id):
+        with self.pipes_lock:
+            self.started[index] = time.time()
+        try:
+            self.prov_mngr.exec_op_by_id(op_id)
+        except Exception:
+            logger.exception(f"Pipe {index} failed")
+        finally:
+            with self.pipes_lock:
+                self.running.discard(index)
+                self.started.pop(index, None)
+                self.update_next_exec_time(index)
+
+    def schedule_pipes(self):
+        active = self.pipes[self.pipes["state"] == "active"]
+        self.scheduler.reset(zip(active["next_exec"].astype(float), active.index))
+        if len(active) == 0:
+            logger.info("No pipes to run, sleeping...")
 
     def update_state(self):
-        self.pipes = self.read_pip()
-        self.ops = self.load_ops()
+        if self.config_changed(PIPE_PATH):
+            logger.info("Pipelines changed, reloading...")
+            with self.pipes_lock:
+                self.pipes = self.read_pip()
+                self.schedule_pipes()
+        if self.config_changed(OPS_PATH):
+            logger.info("Operations changed, reloading...")
+            self.ops = self.load_ops()
+            self.prov_mngr.ops = self.ops
+
+    def config_changed(self, path) -> bool:
+        mtime = os.stat(path).st_mtime_ns
+        return self.config_mtimes.get(path) != mtime
 
     def read_pip(self):
+        self.config_mtimes[PIPE_PATH] = os.stat(PIPE_PATH).st_mtime_ns
         return pd.read_csv(PIPE_PATH, index_col=0, header=0)
 
     def save_pipe(self):
-        self.pipes.to_csv(PIPE_PATH)
+        # the first shard keeps the schedule, the others follow its reloads
+        if self.shard.index != 0:
+            return
+        with FileLock(PIPE_PATH.with_suffix(".lock")):
+            tmp_path = PIPE_PATH.with_suffix(".tmp")
+            self.pipes.to_csv(tmp_path)
+            os.replace(tmp_path, PIPE_PATH)
+            # our own writes must not trigger a reload
+            self.config_mtimes[PIPE_PATH] = os.stat(PIPE_PATH).st_mtime_ns
 
     def load_ops(self):
+        self.config_mtimes[OPS_PATH] = os.stat(OPS_PATH).st_mtime_ns
         with open(OPS_PATH) as f:
             operations = json.load(f)
         if operations is None:
@@ -63,17 +262,18 @@ class BackgroundWorker:
 
         return {x["id"]: x for x in operations}
 
-    def load_pip(self):
-        return pd.read_csv(PIPE_PATH, index_col=0, header=0)
-
     def update_next_exec_time(self, index):
+        if index not in self.pipes.index:
+            return
         pipe = self.pipes.loc[index]
         repeat_every_time = pipe["repeat_every_time"]
         diff_time = pipe["diff_time"]
 
-        next_exec_time = self.get_next_exec_time(repeat_every_time, diff_time)
-        self.pipes.loc[index, "next_exec"] = floor(next_exec_time)
+        next_exec_time = floor(self.get_next_exec_time(repeat_every_time, diff_time))
+        self.pipes.loc[index, "next_exec"] = next_exec_time
         self.save_pipe()
+        if pipe["state"] == "active":
+            self.scheduler.push(next_exec_time, index)
 
     def get_next_exec_time(self, repeat_every_time, diff_time):
         random_time = random.randint(-diff_time, diff_time)
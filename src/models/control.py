@@ -0,0 +1,236 @@
+from collections import deque
+import json
+import logging
+from pathlib import Path
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from typing import Any, Callable
+
+from utils.constants import CONTROL_TIMEOUT, WORKER_CONTROL_DIR
+from utils.logger import logger
+
+
+class ControlServer:
+    """
+    Serves the control commands of a worker process on a Unix socket.
+
+    Clients send one JSON object per line, e.g. {"cmd": "status"}, and get one
+    JSON line back: {"ok": true, "result": ...} or {"ok": false, "error": ...}.
+    Every connection is served on its own thread, so commands are answered while
+    the worker sleeps or runs pipelines.
+
+    Args:
+        path (Path): The socket file.
+        handlers (dict[str, Callable[[], Any]]): The commands, their results must be JSON serializable.
+
+    Methods:
+        start(): Binds the socket and serves commands on a background thread.
+        close(): Stops serving and removes the socket file.
+    """
+
+    def __init__(self, path: Path, handlers: dict[str, Callable[[], Any]]):
+        self.path = path
+        self.handlers = handlers
+        self._server = None
+
+    def start(self) -> None:
+        """
+        Binds the socket and serves commands on a background thread.
+
+        Raises:
+            RuntimeError: If another worker is listening on the socket.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            try:
+                send_command(self.path, "status")
+            except OSError:
+                # left behind by a worker that was killed
+                self.path.unlink(missing_ok=True)
+            else:
+                raise RuntimeError(f"A worker is already listening on {self.path}")
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    reply = server._dispatch(line)
+                    self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.path), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name="worker-control", daemon=True
+        ).start()
+        logger.info(f"Control socket listening on {self.path}")
+
+    def close(self) -> None:
+        """
+        Stops serving and removes the socket file.
+        """
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self.path.unlink(missing_ok=True)
+
+    def _dispatch(self, line: bytes) -> dict:
+        try:
+            cmd = json.loads(line)["cmd"]
+        except (ValueError, KeyError, TypeError):
+            return {"ok": False, "error": "Expected a JSON object with a cmd"}
+        if cmd not in self.handlers:
+            return {"ok": False, "error": f"Unknown command {cmd}"}
+        try:
+            return {"ok": True, "result": self.handlers[cmd]()}
+        except Exception as e:
+            logger.exception(f"Control command {cmd} failed")
+            return {"ok": False, "error": str(e)}
+
+
+class ErrorLog(logging.Handler):
+    """
+    Keeps the last error records of a logger for the errors command.
+
+    Args:
+        maxlen (int): The number of records kept.
+
+    Methods:
+        records(): Returns the kept errors, oldest first.
+    """
+
+    def __init__(self, maxlen: int):
+        super().__init__(logging.ERROR)
+        self._records = deque(maxlen=maxlen)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if record.exc_info and record.exc_info[1] is not None:
+            exc = traceback.format_exception_only(*record.exc_info[:2])[-1].strip()
+            message = f"{message}: {exc}"
+        self._records.append({"time": record.created, "message": message})
+
+    def records(self) -> list[dict]:
+        """
+        Returns the kept errors, oldest first.
+
+        Returns:
+            list[dict]: The unix time and message of every error.
+        """
+        return list(self._records)
+
+
+def worker_socket_path(shard_index: int) -> Path:
+    """
+    Returns the control socket of the worker of a shard.
+
+    Args:
+        shard_index (int): The index of the shard, 0 for a single worker.
+    """
+    return WORKER_CONTROL_DIR.joinpath(f"shard-{shard_index}.sock")
+
+
+def send_command(path: Path, cmd: str, timeout: float = CONTROL_TIMEOUT) -> Any:
+    """
+    Sends one command to the control socket of a worker.
+
+    Args:
+        path (Path): The socket file.
+        cmd (str): The command.
+        timeout (float): Seconds to wait for the connection and the reply.
+
+    Returns:
+        Any: The result of the command.
+
+    Raises:
+        OSError: If no worker is listening on the socket.
+        RuntimeError: If the worker failed to run the command.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(json.dumps({"cmd": cmd}).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"The worker on {path} closed the connection")
+    reply = json.loads(line)
+    if not reply["ok"]:
+        raise RuntimeError(reply["error"])
+    return reply["result"]
+
+
+def query_workers(cmd: str) -> list:
+    """
+    Sends a command to every running worker.
+
+    Args:
+        cmd (str): The command.
+
+    Returns:
+        list: The results of the reachable workers, ordered by shard.
+    """
+    results = []
+    for path in sorted(WORKER_CONTROL_DIR.glob("shard-*.sock")):
+        try:
+            results.append(send_command(path, cmd))
+        except OSError:
+            continue
+    return results
+
+
+def query_metrics() -> dict[tuple[str, str, str], dict]:
+    """
+    Reads and sums the RPC metrics of every running worker.
+
+    Returns:
+        dict[tuple[str, str, str], dict]: The counters and duration sum per (provider, operation, method).
+    """
+    series = {}
+    for rows in query_workers("metrics"):
+        for row in rows:
+            key = (row.pop("provider"), row.pop("operation"), row.pop("method"))
+            values = series.setdefault(key, {})
+            for name, value in row.items():
+                values[name] = values.get(name, 0) + value
+    return series
+
+
+def format_status(workers: list[dict]) -> str:
+    """
+    Formats the status of all workers with a total line.
+
+    Args:
+        workers (list[dict]): The results of the status command, see query_workers.
+
+    Returns:
+        str: One line per worker followed by the totals.
+    """
+    now = time.time()
+    lines = []
+    for status in workers:
+        running = (
+            ", ".join(
+                f"{pipe['name']} ({now - pipe['since']:.0f} s)"
+                for pipe in status["running"]
+            )
+            or "-"
+        )
+        lines.append(
+            f"shard {status['shard']}/{status['shards']} (pid {status['pid']}, "
+            f"{status['state']}): {status['wallets']} wallets, "
+            f"{status['queued']} queued, {status['scheduled']} scheduled, "
+            f"running: {running}"
+        )
+    if len(workers) > 1:
+        lines.append(
+            f"{len(workers)} workers, "
+            f"{sum(status['wallets'] for status in workers)} wallets, "
+            f"{sum(len(status['running']) for status in workers)} pipelines running"
+        )
+    return "\n".join(lines)
@@ -1,13 +1,10 @@
 import os
 import sys
-from pyfiglet import figlet_format
-from termcolor import cprint
-import time
 from colorama import init
 
 init(strip=not sys.stdout.isatty())
-from prompt_toolkit import prompt
 from PyInquirer.prompt import prompt
+from utils.constants import LOGO_CACHE_DIR
 from utils.menu_options import MANAGE_STRATEGIES_MENU, MenuOption
 from termcolor import colored
 import shutil
@@ -109,6 +106,21 @@ class CryptoBountyBotCLI:
     def show_logo(self):
         os.system("cls" if os.name == "nt" else "clear")
         terminal_width, _ = shutil.get_terminal_size()
+        logo_path = LOGO_CACHE_DIR.joinpath(f"logo-{terminal_width}.txt")
+        if logo_path.exists():
+            logo = logo_path.read_text()
+        else:
+            logo = self.render_logo(terminal_width)
+            os.makedirs(LOGO_CACHE_DIR, exist_ok=True)
+            tmp_path = logo_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(logo)
+            os.replace(tmp_path, logo_path)
+        print(logo)
+
+    def render_logo(self, terminal_width: int) -> str:
+        # pyfiglet loads its fonts on import, only pay for it on a cache miss
+        from pyfiglet import figlet_format
+
         welcome_txt = figlet_format(
             "Welcome to",
             font="small",
@@ -127,7 +139,11 @@ class CryptoBountyBotCLI:
             justify="center",
             width=terminal_width,
         )
-        cprint(welcome_txt, "white")
-        cprint(name_txt, "green")
-        cprint(vers_txt, "white")
-        print(colored("Created by: @pstemporowski", "green"))
+        return "\n".join(
+            [
+                colored(welcome_txt, "white"),
+                colored(name_txt, "green"),
+                colored(vers_txt, "white"),
+                colored("Created by: @pstemporowski", "green"),
+            ]
+        )
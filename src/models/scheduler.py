@@ -0,0 +1,119 @@
+import heapq
+import threading
+import time
+
+
+class PipelineScheduler:
+    """
+    Min-heap of pipelines keyed by their next execution time.
+
+    Entries are invalidated lazily: rescheduling a pipeline pushes a new entry
+    and the stale one is skipped when it reaches the top of the heap.
+
+    Methods:
+        reset(entries): Replaces all scheduled pipelines.
+        push(next_exec, key): Schedules a pipeline.
+        remove(key): Unschedules a pipeline.
+        pop_due(now): Returns the keys of all pipelines due at `now`.
+        next_due(): Returns the time the next pipeline is due, or None.
+        wait(max_wait, ignore_due): Sleeps until the next pipeline is due, `max_wait` passed or wake() is called.
+        wake(): Interrupts a running wait().
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int]] = []
+        self._scheduled: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._scheduled)
+
+    def reset(self, entries) -> None:
+        """
+        Replaces all scheduled pipelines.
+
+        Args:
+            entries (Iterable[tuple[float, int]]): (next_exec, key) pairs.
+        """
+        with self._lock:
+            self._scheduled = {key: next_exec for next_exec, key in entries}
+            self._heap = [(t, k) for k, t in self._scheduled.items()]
+            heapq.heapify(self._heap)
+        self.wake()
+
+    def push(self, next_exec: float, key: int) -> None:
+        """
+        Schedules a pipeline.
+
+        Args:
+            next_exec (float): The unix time the pipeline is due.
+            key (int): The index of the pipeline.
+        """
+        with self._lock:
+            self._scheduled[key] = next_exec
+            heapq.heappush(self._heap, (next_exec, key))
+        self.wake()
+
+    def remove(self, key: int) -> None:
+        """
+        Unschedules a pipeline.
+
+        Args:
+            key (int): The index of the pipeline.
+        """
+        with self._lock:
+            self._scheduled.pop(key, None)
+
+    def pop_due(self, now: float = None) -> list[int]:
+        """
+        Returns the keys of all pipelines due at `now` and unschedules them.
+
+        Args:
+            now (float): The unix time to compare against, defaults to the current time.
+
+        Returns:
+            list[int]: The indices of the due pipelines, earliest first.
+        """
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_exec, key = heapq.heappop(self._heap)
+                if self._scheduled.get(key) == next_exec:
+                    del self._scheduled[key]
+                    due.append(key)
+        return due
+
+    def next_due(self) -> float | None:
+        """
+        Returns the time the next pipeline is due, or None if nothing is scheduled.
+        """
+        with self._lock:
+            while self._heap and self._scheduled.get(self._heap[0][1]) != (
+                self._heap[0][0]
+            ):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def wait(self, max_wait: float, ignore_due: bool = False) -> None:
+        """
+        Sleeps until the next pipeline is due, `max_wait` passed or wake() is called.
+
+        Args:
+            max_wait (float): The maximum number of seconds to sleep.
+            ignore_due (bool): Sleeps past due pipelines, e.g. while dispatching is paused.
+        """
+        next_due = None if ignore_due else self.next_due()
+        timeout = max_wait
+        if next_due is not None:
+            timeout = min(max_wait, max(0.0, next_due - time.time()))
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def wake(self) -> None:
+        """
+        Interrupts a running wait().
+        """
+        self._wakeup.set()
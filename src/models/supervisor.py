@@ -0,0 +1,104 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from utils.constants import (
+    RUN_WORKER_SCRIPT_PATH,
+    WORKER_RESTART_DELAY,
+)
+from utils.logger import logger
+
+
+class WorkerSupervisor:
+    """
+    Runs one BackgroundWorker process per shard of the farming wallets.
+
+    Every worker is started with WORKER_SHARD and WORKER_SHARDS set and only
+    works on the wallets of its shard, so CPU-bound work like key derivation,
+    signing and encoding scales with the cores of the host. Workers that fail
+    are restarted after WORKER_RESTART_DELAY seconds, workers stopped through
+    their control socket are not. The supervisor exits once all workers stopped.
+    SIGTERM and SIGINT stop all workers gracefully, they finish their running
+    pipelines however long that takes. A second signal kills them.
+
+    Args:
+        shards (int): The number of worker processes.
+
+    Methods:
+        run(): Starts the workers and keeps them running until stopped.
+        stop(): Stops all workers once their running pipelines finished.
+    """
+
+    def __init__(self, shards: int):
+        if shards < 1:
+            raise ValueError("At least one shard is required")
+        self.shards = shards
+        self.procs: dict[int, subprocess.Popen] = {}
+        self.restart_at: dict[int, float] = {}
+        self.stopping = False
+        self.killing = False
+
+    def run(self):
+        logger.info(f"Supervisor on process: {os.getpid()}, {self.shards} shards")
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        for index in range(self.shards):
+            self._start(index)
+
+        while not self.stopping and self.procs:
+            now = time.monotonic()
+            for index, proc in list(self.procs.items()):
+                if proc.poll() is None:
+                    continue
+                if proc.returncode == 0:
+                    logger.info(f"Worker of shard {index} stopped")
+                    del self.procs[index]
+                elif index not in self.restart_at:
+                    logger.error(
+                        f"Worker of shard {index} exited with {proc.returncode}, "
+                        f"restarting in {WORKER_RESTART_DELAY} s"
+                    )
+                    self.restart_at[index] = now + WORKER_RESTART_DELAY
+                elif self.restart_at[index] <= now:
+                    del self.restart_at[index]
+                    self._start(index)
+            time.sleep(1)
+        self.stop()
+
+    def stop(self):
+        """
+        Sends SIGTERM to all workers and waits until they finished their running
+        pipelines and exited. Workers are only killed after a second signal.
+        """
+        for proc in self.procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        logger.info("Waiting for the workers to finish their running pipelines")
+        while any(proc.poll() is None for proc in self.procs.values()):
+            if self.killing:
+                for proc in self.procs.values():
+                    if proc.poll() is None:
+                        proc.kill()
+                    proc.wait()
+                logger.warning("Killed the workers")
+                break
+            time.sleep(1)
+        logger.info("All workers stopped")
+
+    def _start(self, index: int):
+        env = {
+            **os.environ,
+            "WORKER_SHARD": str(index),
+            "WORKER_SHARDS": str(self.shards),
+        }
+        self.procs[index] = subprocess.Popen(
+            [sys.executable, str(RUN_WORKER_SCRIPT_PATH)], env=env
+        )
+        logger.info(f"Started worker of shard {index}: {self.procs[index].pid}")
+
+    def _handle_signal(self, signum, frame):
+        # a second signal gives up on the running pipelines
+        self.killing = self.stopping
+        self.stopping = True
@@ -1,4 +1,5 @@
 from models.background_worker import BackgroundWorker
+from models.supervisor import WorkerSupervisor
 import os
 from dotenv import load_dotenv
 from utils.logger import logger
@@ -6,7 +7,12 @@ from utils.logger import logger
 
 def main():
     load_dotenv()
-    BackgroundWorker().run()
+    shards = int(os.environ.get("WORKER_SHARDS", 1))
+    # the supervisor starts this script again once per shard with WORKER_SHARD set
+    if shards > 1 and "WORKER_SHARD" not in os.environ:
+        WorkerSupervisor(shards).run()
+    else:
+        BackgroundWorker().run()
 
 
 if __name__ == "__main__":
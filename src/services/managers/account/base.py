@@ -1,30 +1,32 @@
+import os
+from pathlib import Path
 import pandas as pd
 from abc import ABC, abstractmethod
-from pandas.errors import EmptyDataError
 
-COLS = ["priv_key", "addr", "balance", "last_updated"]
-
-
-import pandas as pd
-from abc import ABC, abstractmethod
+from services.managers.account.store import COLS, SqliteAccountStore
 
 
 class BaseAcountManager(ABC):
     """
     Base class for managing accounts.
 
+    Accounts live in a SQLite database next to the accounts file. An existing
+    accounts CSV is imported on first use, and the CSV format stays available
+    for import and export.
+
     Args:
         accts_path (str): The path to the accounts file.
 
     Attributes:
         accts_path (str): The path to the accounts file.
-        accts_df (pd.DataFrame): The DataFrame containing the account information.
+        store (SqliteAccountStore): The database holding the accounts.
+        accts_df (pd.DataFrame): A snapshot DataFrame of the account information.
 
     Methods:
-        read_csv(accts_path: str) -> pd.DataFrame:
-            Reads the accounts file and returns a DataFrame.
+        import_csv(accts_path: str) -> int:
+            Imports the accounts of a CSV file into the store.
         save_accts_to_csv() -> None:
-            Saves the account information to the accounts file.
+            Exports the account information to the accounts file.
         create_and_save_acct():
             Abstract method for creating and saving an account.
         get_balance(addr):
@@ -33,36 +35,43 @@ class BaseAcountManager(ABC):
 
     def __init__(self, accts_path: str):
         self.accts_path = accts_path
-        self.accts_df = self.read_csv(accts_path)
+        self.store = SqliteAccountStore(Path(accts_path).with_suffix(".db"))
+        if len(self.store) == 0 and os.path.exists(accts_path):
+            self.import_csv(accts_path)
 
-    def read_csv(self, accts_path: str) -> pd.DataFrame:
+    @property
+    def accts_df(self) -> pd.DataFrame:
         """
-        Reads the accounts file and returns a DataFrame.
+        Returns a snapshot DataFrame of the account information.
+        """
+        return pd.DataFrame(
+            [[row[col] for col in COLS] for row in self.store.iter_rows()],
+            columns=COLS,
+        )
+
+    def import_csv(self, accts_path: str) -> int:
+        """
+        Imports the accounts of a CSV file into the store.
 
         Args:
             accts_path (str): The path to the accounts file.
 
         Returns:
-            pd.DataFrame: The DataFrame containing the account information.
-
-        Raises:
-            FileNotFoundError: If the accounts file is not found.
-            EmptyDataError: If the accounts file is empty.
+            int: The number of imported accounts.
         """
         try:
-            return pd.read_csv(accts_path)
+            imported = self.store.import_csv(accts_path)
         except FileNotFoundError:
-            print("CSV file not found. Creating a new file when saving accounts.")
-        except EmptyDataError:
-            print("CSV file is empty")
-
-        return pd.DataFrame(columns=COLS)
+            print("CSV file not found.")
+            return 0
+        print(f"Imported {imported} accounts from {accts_path}")
+        return imported
 
     def save_accts_to_csv(self) -> None:
         """
-        Saves the account information to the accounts file.
+        Exports the account information to the accounts file.
         """
-        self.accts_df.to_csv(self.accts_path, index=False)
+        self.store.export_csv(self.accts_path)
 
     @abstractmethod
     def create_and_save_acct(self):
@@ -1,7 +1,12 @@
-import os
+import time
+from typing import Iterator
 from eth_account import Account
-from web3 import HTTPProvider, Web3
+from web3 import Web3
 from services.managers.account.base import BaseAcountManager
+from services.managers.account.shard import Shard
+from services.managers.mainnet.batch import batch_request
+from services.managers.mainnet.core import MainnetManager
+from utils.enums import Mainnet
 from eth_account.account import LocalAccount
 from utils.logger import logger
 
@@ -10,22 +15,41 @@ class ErsAccountManager(BaseAcountManager):
     """
     ErsAccountManager is a class that manages Ethereum accounts for the ERS system.
 
+    With a shard, only the accounts of that shard are listed, refreshed and
+    created, other accounts of the store are skipped without deriving their keys.
+
     Args:
         addr_path (str): The file path to the address file.
+        shard (Shard): The partition of the accounts to work on, all accounts by default.
 
     Attributes:
-        accts_df (pandas.DataFrame): A DataFrame that stores the Ethereum accounts.
+        store (SqliteAccountStore): The database that stores the Ethereum accounts.
+        accts_cache (dict[str, LocalAccount]): Derived accounts keyed by checksum address.
+        shard (Shard): The partition of the accounts to work on.
 
     Methods:
         get_priv_key(addr): Returns the private key for a given Ethereum address.
+        get_acct(addr): Returns the account of a given Ethereum address.
         get_eth_accts(): Returns a list of all Ethereum accounts.
-        create_and_save_acct(): Creates a new Ethereum account and saves it to the DataFrame.
+        iter_eth_accts(chunk_size): Yields all Ethereum accounts in chunks.
+        count_accts(): Returns the number of accounts of the shard.
+        create_and_save_acct(): Creates a new Ethereum account and saves it to the store.
         get_balance(addr): Returns the balance of a given Ethereum address.
+        refresh_balances(net): Fetches the balances of all accounts in batches and saves them.
 
     """
 
-    def __init__(self, addr_path):
+    BALANCE_COLS = {
+        Mainnet.ETHEREUM: ("balance", "last_updated"),
+        Mainnet.ZKSYNC_ERA: ("zk_balance", "zk_last_updated"),
+    }
+    BALANCE_BATCH_SIZE = 500
+
+    def __init__(self, addr_path, shard: Shard = Shard()):
         super().__init__(addr_path)
+        self.accts_cache: dict[str, LocalAccount] = {}
+        self.shard = shard
+        self._counted = (0, 0)
 
     def get_priv_key(self, addr):
         """
@@ -38,7 +62,29 @@ class ErsAccountManager(BaseAcountManager):
             str: The private key associated with the address.
 
         """
-        return self.accts_df.get(addr)
+        acct = self.get_acct(addr)
+        return None if acct is None else acct.key.hex()
+
+    def get_acct(self, addr) -> LocalAccount | None:
+        """
+        Returns the account of a given Ethereum address.
+
+        The key is only derived the first time the account is requested.
+
+        Args:
+            addr (str): The Ethereum address.
+
+        Returns:
+            LocalAccount | None: The account, or None if the address is unknown.
+
+        """
+        addr = Web3.to_checksum_address(addr)
+        if addr not in self.accts_cache:
+            row = self.store.get(addr)
+            if row is None:
+                return None
+            self.accts_cache[addr] = Account.from_key(row["priv_key"])
+        return self.accts_cache[addr]
 
     def get_eth_accts(self) -> list[LocalAccount]:
         """
@@ -48,27 +94,65 @@ class ErsAccountManager(BaseAcountManager):
             list[LocalAccount]: A list of LocalAccount objects representing the Ethereum accounts.
 
         """
-        return self.accts_df.apply(
-            lambda row: Account.from_key(row["priv_key"]), axis=1
-        ).tolist()
+        return [acct for chunk in self.iter_eth_accts() for acct in chunk]
+
+    def iter_eth_accts(self, chunk_size: int = 1000) -> Iterator[list[LocalAccount]]:
+        """
+        Yields all Ethereum accounts in chunks, deriving only uncached keys.
+
+        Args:
+            chunk_size (int): The number of accounts per chunk.
+
+        Returns:
+            Iterator[list[LocalAccount]]: Chunks of LocalAccount objects in insertion order.
+
+        """
+        chunk = []
+        for row in self.store.iter_rows(chunk_size):
+            if not self.shard.owns(row["addr"]):
+                continue
+            acct = self.accts_cache.get(row["addr"])
+            if acct is None:
+                acct = Account.from_key(row["priv_key"])
+                self.accts_cache[acct.address] = acct
+            chunk.append(acct)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def count_accts(self) -> int:
+        """
+        Returns the number of accounts of the shard.
+
+        Returns:
+            int: The number of accounts, only recounted when the store grew.
+
+        """
+        total = len(self.store)
+        if self.shard.count == 1:
+            return total
+        if self._counted[0] != total:
+            owned = sum(1 for addr in self.store.addrs() if self.shard.owns(addr))
+            self._counted = (total, owned)
+        return self._counted[1]
 
     def create_and_save_acct(self) -> LocalAccount:
         """
-        Creates a new Ethereum account and saves it to the DataFrame.
+        Creates a new Ethereum account of the shard and saves it to the store.
 
         Returns:
             LocalAccount: The newly created Ethereum account.
 
         """
         acct = Account.create()
+        # keys are drawn until the address falls into the shard
+        while not self.shard.owns(acct.address):
+            acct = Account.create()
         logger.info(f"Created new account: {acct.address}")
-        self.accts_df.loc[len(self.accts_df)] = [
-            acct.key.hex(),
-            acct.address,
-            None,
-            None,
-        ]
-        self.save_accts_to_csv()
+        self.store.add(acct.key.hex(), acct.address)
+        self.accts_cache[acct.address] = acct
         return acct
 
     @staticmethod
@@ -83,6 +167,40 @@ class ErsAccountManager(BaseAcountManager):
             float: The balance of the address in Ether.
 
         """
-        eth_web = Web3(HTTPProvider(os.environ["ETH_URL"]))
+        eth_web = MainnetManager().eth_web3
         balance = eth_web.eth.get_balance(addr)
         return eth_web.from_wei(balance, "ether")
+
+    def refresh_balances(self, net: Mainnet) -> None:
+        """
+        Fetches the balances of all accounts in batches and saves them.
+
+        Balances are requested as JSON-RPC batches of BALANCE_BATCH_SIZE calls
+        over the shared MainnetManager connection, and written back together
+        with their timestamp in a single transaction.
+
+        Args:
+            net (Mainnet): The network to fetch the balances from.
+
+        """
+        web3 = MainnetManager().get_web3(net)
+        addrs = [addr for addr in self.store.addrs() if self.shard.owns(addr)]
+        balances = []
+        for i in range(0, len(addrs), self.BALANCE_BATCH_SIZE):
+            chunk = addrs[i : i + self.BALANCE_BATCH_SIZE]
+            balances.extend(
+                batch_request(
+                    web3, [("eth_getBalance", [addr, "latest"]) for addr in chunk]
+                )
+            )
+
+        updated_at = int(time.time())
+        self.store.update_balances(
+            *self.BALANCE_COLS[net],
+            [
+                (float(Web3.from_wei(int(wei, 16), "ether")), updated_at, addr)
+                for addr, wei in zip(addrs, balances)
+                if wei is not None
+            ],
+        )
+        logger.info(f"Refreshed {len(addrs)} balances on {net.value}")
@@ -0,0 +1,109 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+import threading
+
+from web3 import Web3
+
+from utils.constants import WALLET_LOCKS_DIR
+from utils.utils import FileLock, singleton
+
+
+@singleton
+class WalletLockManager:
+    """
+    Process-wide locks per wallet address.
+
+    Pipelines running in parallel hold the locks of the wallets they send from
+    or fund, so two pipelines never race on the nonce or balance of one wallet.
+    Locks are acquired in address order to avoid deadlocks and are not
+    reentrant.
+
+    Wallets that other worker processes send from as well, like the Sugar Daddy
+    wallets in sharded mode, are marked with share(). Holding one of them also
+    takes a file lock in WALLET_LOCKS_DIR and drops the local nonce counters of
+    the wallet, since another process may have sent from it in the meantime.
+
+    Methods:
+        hold(*addrs): Context manager holding the locks of the given wallets.
+        hold_async(*addrs): Async variant of hold that does not block the event loop.
+        share(addr): Marks a wallet as used by several worker processes.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self):
+        self._locks: dict[str, threading.Lock] = {}
+        self._file_locks: dict[str, FileLock] = {}
+        self._guard = threading.Lock()
+
+    def share(self, addr: str) -> None:
+        """
+        Marks a wallet as used by several worker processes.
+
+        Args:
+            addr (str): The address of the wallet.
+        """
+        addr = Web3.to_checksum_address(addr)
+        with self._guard:
+            self._file_locks.setdefault(
+                addr, FileLock(WALLET_LOCKS_DIR.joinpath(f"{addr}.lock"))
+            )
+
+    @contextmanager
+    def hold(self, *addrs: str):
+        """
+        Holds the locks of the given wallets.
+
+        Args:
+            *addrs (str): The addresses of the wallets.
+        """
+        locks = self._get_locks(addrs)
+        for lock in locks:
+            lock.acquire()
+            if isinstance(lock, FileLock):
+                self._forget_nonces(lock)
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @asynccontextmanager
+    async def hold_async(self, *addrs: str):
+        """
+        Async variant of hold that does not block the event loop.
+
+        Args:
+            *addrs (str): The addresses of the wallets.
+        """
+        locks = self._get_locks(addrs)
+        acquired = []
+        try:
+            for lock in locks:
+                while not lock.acquire(blocking=False):
+                    await asyncio.sleep(self.POLL_INTERVAL)
+                acquired.append(lock)
+                if isinstance(lock, FileLock):
+                    self._forget_nonces(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def _get_locks(self, addrs) -> list:
+        keys = sorted({Web3.to_checksum_address(addr) for addr in addrs})
+        locks = []
+        with self._guard:
+            for key in keys:
+                locks.append(self._locks.setdefault(key, threading.Lock()))
+                # the thread lock comes first, one FileLock is never used twice at once
+                if key in self._file_locks:
+                    locks.append(self._file_locks[key])
+        return locks
+
+    @staticmethod
+    def _forget_nonces(lock: FileLock) -> None:
+        # the nonce manager needs the network, it is only loaded in sharded mode
+        from services.managers.nonce.core import NonceManager
+
+        NonceManager().forget(lock.path.stem)
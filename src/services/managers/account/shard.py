@@ -0,0 +1,46 @@
+import os
+from typing import NamedTuple
+
+
+class Shard(NamedTuple):
+    """
+    The partition of the farming wallets owned by one worker process.
+
+    Wallets are assigned by their address modulo the number of shards. Addresses
+    are keccak hashes, so the partitions are even and never change as long as
+    the number of shards stays the same.
+    """
+
+    index: int = 0
+    count: int = 1
+
+    def owns(self, addr: str) -> bool:
+        """
+        Returns whether the wallet of an address belongs to the shard.
+
+        Args:
+            addr (str): The address of the wallet.
+        """
+        return self.count == 1 or int(addr, 16) % self.count == self.index
+
+    def share(self, total: int) -> int:
+        """
+        Returns the part of `total` wallets the shard creates.
+
+        Args:
+            total (int): The number of wallets to create over all shards.
+        """
+        return total // self.count + (self.index < total % self.count)
+
+
+def current_shard() -> Shard:
+    """
+    Returns the shard of the current process, set by the WorkerSupervisor.
+
+    Returns:
+        Shard: The shard from WORKER_SHARD and WORKER_SHARDS, the single shard when unset.
+    """
+    return Shard(
+        int(os.environ.get("WORKER_SHARD", 0)),
+        int(os.environ.get("WORKER_SHARDS", 1)),
+    )
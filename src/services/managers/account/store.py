@@ -0,0 +1,189 @@
+import csv
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Iterator
+
+COLS = [
+    "priv_key",
+    "addr",
+    "balance",
+    "last_updated",
+    "zk_balance",
+    "zk_last_updated",
+]
+BALANCE_COLS = {"balance", "last_updated", "zk_balance", "zk_last_updated"}
+# the layout of the key files, the zkSync balances only live in the database
+CSV_COLS = ["priv_key", "addr", "balance", "last_updated"]
+
+
+class SqliteAccountStore:
+    """
+    Transactional account storage backed by SQLite.
+
+    Accounts are appended in O(1), looked up through the primary key index on
+    the address and updated in single transactions. The database runs in WAL
+    mode with a busy timeout, so the CLI and the worker can use it at once, and
+    syncs every commit to disk.
+
+    Args:
+        db_path (str | Path): The path to the SQLite database file.
+
+    Methods:
+        add(priv_key, addr): Appends an account.
+        get(addr): Returns the row of an account or None.
+        iter_rows(chunk_size): Yields all rows in insertion order.
+        addrs(): Returns all addresses in insertion order.
+        update_balances(balance_col, updated_col, rows): Writes balances in one transaction.
+        import_csv(csv_path): Imports accounts from a CSV file, skipping known addresses.
+        export_csv(csv_path): Exports all accounts to a CSV file in the CSV_COLS format.
+    """
+
+    def __init__(self, db_path):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # the store holds the only copy of the keys, a committed account
+            # must survive a power loss before it gets funded
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS accounts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    priv_key TEXT NOT NULL,
+                    addr TEXT NOT NULL UNIQUE,
+                    balance REAL,
+                    last_updated INTEGER,
+                    zk_balance REAL,
+                    zk_last_updated INTEGER
+                )
+                """
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def add(self, priv_key: str, addr: str) -> None:
+        """
+        Appends an account.
+
+        Args:
+            priv_key (str): The hex encoded private key.
+            addr (str): The checksum address.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO accounts (priv_key, addr) VALUES (?, ?)", (priv_key, addr)
+            )
+
+    def get(self, addr: str) -> sqlite3.Row | None:
+        """
+        Returns the row of an account or None.
+
+        Args:
+            addr (str): The checksum address.
+        """
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT {', '.join(COLS)} FROM accounts WHERE addr = ?", (addr,)
+            ).fetchone()
+
+    def iter_rows(self, chunk_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """
+        Yields all rows in insertion order, reading `chunk_size` rows at a time.
+
+        Args:
+            chunk_size (int): The number of rows fetched per query.
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, {', '.join(COLS)} FROM accounts "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1]["id"]
+
+    def addrs(self) -> list[str]:
+        """
+        Returns all addresses in insertion order.
+        """
+        with self._lock:
+            return [
+                row[0]
+                for row in self._conn.execute("SELECT addr FROM accounts ORDER BY id")
+            ]
+
+    def update_balances(
+        self, balance_col: str, updated_col: str, rows: list[tuple]
+    ) -> None:
+        """
+        Writes balances in one transaction.
+
+        Args:
+            balance_col (str): The column receiving the balances.
+            updated_col (str): The column receiving the timestamps.
+            rows (list[tuple]): (balance, timestamp, addr) tuples.
+        """
+        if not {balance_col, updated_col} <= BALANCE_COLS:
+            raise ValueError(f"Unknown balance columns {balance_col}, {updated_col}")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"UPDATE accounts SET {balance_col} = ?, {updated_col} = ? "
+                "WHERE addr = ?",
+                rows,
+            )
+
+    def import_csv(self, csv_path) -> int:
+        """
+        Imports accounts from a CSV file, skipping known addresses.
+
+        Columns of COLS the file does not have, like the zkSync balances of an
+        exported key file, are left empty.
+
+        Args:
+            csv_path (str | Path): The path to the CSV file.
+
+        Returns:
+            int: The number of imported accounts.
+        """
+        with open(csv_path, newline="") as f:
+            rows = [
+                tuple(row.get(col) or None for col in COLS)
+                for row in csv.DictReader(f)
+            ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO accounts ({', '.join(COLS)}) "
+                f"VALUES ({', '.join('?' * len(COLS))})",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def export_csv(self, csv_path) -> None:
+        """
+        Exports all accounts to a CSV file in the CSV_COLS format.
+
+        The file is written next to the target and moved into place, so a crash
+        never leaves a partially written export behind.
+
+        Args:
+            csv_path (str | Path): The path to the CSV file.
+        """
+        tmp_path = Path(f"{csv_path}.tmp")
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLS)
+            for row in self.iter_rows():
+                writer.writerow([row[col] for col in CSV_COLS])
+        tmp_path.replace(csv_path)
@@ -0,0 +1,147 @@
+import threading
+import time
+from statistics import median
+
+from web3 import Web3
+
+from services.managers.mainnet.core import MainnetManager
+from utils.enums import Mainnet
+from utils.logger import logger
+from utils.utils import AsyncSingleFlight
+
+
+class FeeOracle:
+    """
+    Serves EIP-1559 fee parameters of one chain from a cached eth_feeHistory.
+
+    The fee history is fetched at most once per TTL (about one block), so all
+    providers and wallets sending within the same block share a single RPC call.
+    Concurrent async callers await the same refresh.
+
+    Args:
+        net (Mainnet): The chain to serve fees for.
+
+    Methods:
+        get_fees(speed): Returns maxFeePerGas and maxPriorityFeePerGas for the next block.
+        get_fees_async(speed): Async variant of get_fees.
+        gas_price(speed): Returns a legacy gas price for the next block.
+    """
+
+    TTLS = {Mainnet.ETHEREUM: 12.0, Mainnet.ZKSYNC_ERA: 2.0}
+    HISTORY_BLOCKS = 10
+    PERCENTILES = {"slow": 10, "normal": 50, "fast": 90}
+    BASE_FEE_MULTIPLIER = 2
+
+    def __init__(self, net: Mainnet):
+        self.net = net
+        mainnet_mngr = MainnetManager()
+        self.web3 = mainnet_mngr.get_web3(net)
+        self.async_web3 = mainnet_mngr.get_async_web3(net)
+        self.ttl = self.TTLS[net]
+        self._lock = threading.Lock()
+        self._refreshes = AsyncSingleFlight()
+        self._fetched_at = 0.0
+        self._base_fee = 0
+        self._priority_fees: dict[str, int] = {}
+
+    def get_fees(self, speed: str = "normal") -> dict[str, int]:
+        """
+        Returns maxFeePerGas and maxPriorityFeePerGas for the next block.
+
+        Args:
+            speed (str): One of "slow", "normal" or "fast".
+
+        Returns:
+            dict[str, int]: The fee fields of an EIP-1559 transaction in wei.
+        """
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._update(
+                        self.web3.eth.fee_history(
+                            self.HISTORY_BLOCKS,
+                            "latest",
+                            list(self.PERCENTILES.values()),
+                        )
+                    )
+        return self._fees(speed)
+
+    async def get_fees_async(self, speed: str = "normal") -> dict[str, int]:
+        """
+        Async variant of get_fees.
+
+        Args:
+            speed (str): One of "slow", "normal" or "fast".
+
+        Returns:
+            dict[str, int]: The fee fields of an EIP-1559 transaction in wei.
+        """
+        if self._is_stale():
+            await self._refreshes.run(None, self._refresh_async)
+        return self._fees(speed)
+
+    def gas_price(self, speed: str = "normal") -> int:
+        """
+        Returns a legacy gas price for the next block.
+
+        Args:
+            speed (str): One of "slow", "normal" or "fast".
+
+        Returns:
+            int: The gas price in wei.
+        """
+        self.get_fees(speed)
+        return self._base_fee + self._priority_fees[speed]
+
+    async def _refresh_async(self) -> None:
+        # a refresh that finished while this one was scheduled may have done it
+        if not self._is_stale():
+            return
+        history = await self.async_web3.eth.fee_history(
+            self.HISTORY_BLOCKS, "latest", list(self.PERCENTILES.values())
+        )
+        with self._lock:
+            self._update(history)
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    def _update(self, history) -> None:
+        # the last entry is the base fee of the pending block
+        self._base_fee = history["baseFeePerGas"][-1]
+        rewards = history.get("reward") or [[0] * len(self.PERCENTILES)]
+        self._priority_fees = {
+            speed: int(median(block[i] for block in rewards))
+            for i, speed in enumerate(self.PERCENTILES)
+        }
+        self._fetched_at = time.monotonic()
+        logger.debug(
+            f"{self.net.value} base fee {Web3.from_wei(self._base_fee, 'gwei')} gwei"
+        )
+
+    def _fees(self, speed: str) -> dict[str, int]:
+        priority_fee = self._priority_fees[speed]
+        return {
+            "maxFeePerGas": self.BASE_FEE_MULTIPLIER * self._base_fee + priority_fee,
+            "maxPriorityFeePerGas": priority_fee,
+        }
+
+
+_oracles: dict[Mainnet, FeeOracle] = {}
+_oracles_lock = threading.Lock()
+
+
+def get_fee_oracle(net: Mainnet) -> FeeOracle:
+    """
+    Returns the process-wide FeeOracle of a chain.
+
+    Args:
+        net (Mainnet): The chain of the oracle.
+
+    Returns:
+        FeeOracle: The oracle shared by all providers on the chain.
+    """
+    with _oracles_lock:
+        if net not in _oracles:
+            _oracles[net] = FeeOracle(net)
+        return _oracles[net]
@@ -0,0 +1,211 @@
+import math
+import threading
+import time
+
+from hexbytes import HexBytes
+
+from services.managers.mainnet.batch import batch_request
+from services.managers.mainnet.core import MainnetManager
+from services.tracker.receipts import get_receipt_tracker
+from utils.enums import Mainnet
+from utils.logger import logger
+from utils.utils import AsyncSingleFlight
+
+
+class GasLimitCache:
+    """
+    Serves gas limits of one chain from cached estimates and learned margins.
+
+    Estimates are cached per transaction shape, that is the called contract,
+    the function selector and the calldata length. Plain transfers share one
+    shape. The margin added on top of an estimate is learned from the gasUsed
+    of mined transactions, so it grows when estimates fall short and shrinks
+    back towards MIN_MARGIN otherwise. Concurrent async misses of one shape
+    await a single estimate.
+
+    Args:
+        net (Mainnet): The chain to serve gas limits for.
+
+    Methods:
+        gas_limit(tx, estimate): Returns the gas limit of a transaction.
+        gas_limit_async(tx, estimate): Async variant of gas_limit.
+        refresh(txs): Estimates all stale shapes of the transactions in one batch.
+        learn(tx_hash, tx): Adjusts the margin of the shape once the transaction is mined.
+    """
+
+    TTLS = {Mainnet.ETHEREUM: 600.0, Mainnet.ZKSYNC_ERA: 60.0}
+    DEFAULT_MARGIN = 1.25
+    MIN_MARGIN = 1.05
+    HEADROOM = 1.1
+    PEAK_DECAY = 0.98
+    RECEIPT_TIMEOUT = 900
+
+    def __init__(self, net: Mainnet):
+        self.net = net
+        mainnet_mngr = MainnetManager()
+        self.web3 = mainnet_mngr.get_web3(net)
+        self.async_web3 = mainnet_mngr.get_async_web3(net)
+        self.receipt_tracker = get_receipt_tracker(net)
+        self.ttl = self.TTLS[net]
+        self._lock = threading.Lock()
+        self._estimates: dict[tuple, tuple[int, float]] = {}
+        self._peaks: dict[tuple, float] = {}
+        self._estimating = AsyncSingleFlight()
+
+    def gas_limit(self, tx: dict, estimate=None) -> int:
+        """
+        Returns the gas limit of a transaction, estimating its shape if stale.
+
+        Args:
+            tx (dict): The transaction, "from", "to", "value" and "data" are used.
+            estimate (callable): Optional callable estimating the transaction instead of eth_estimateGas.
+
+        Returns:
+            int: The gas limit including the learned margin.
+        """
+        key = self.shape(tx)
+        if self._is_stale(key):
+            if estimate is None:
+                self.refresh([tx])
+            else:
+                self._store(key, estimate())
+            if key not in self._estimates:
+                raise RuntimeError(f"Gas estimation failed on {self.net.value}")
+        return self._limit(key)
+
+    async def gas_limit_async(self, tx: dict, estimate=None) -> int:
+        """
+        Async variant of gas_limit.
+
+        Args:
+            tx (dict): The transaction, "from", "to", "value" and "data" are used.
+            estimate (callable): Optional coroutine function estimating the transaction.
+
+        Returns:
+            int: The gas limit including the learned margin.
+        """
+        key = self.shape(tx)
+        if self._is_stale(key):
+            await self._estimating.run(
+                key, lambda: self._estimate_async(key, tx, estimate)
+            )
+        return self._limit(key)
+
+    async def _estimate_async(self, key: tuple, tx: dict, estimate) -> None:
+        # an estimate that finished while this one was scheduled may have done it
+        if not self._is_stale(key):
+            return
+        if estimate is None:
+            gas = await self.async_web3.eth.estimate_gas(self._estimate_params(tx))
+        else:
+            gas = await estimate()
+        self._store(key, gas)
+
+    def refresh(self, txs: list[dict]) -> None:
+        """
+        Estimates all stale shapes of the transactions in one batch.
+
+        Args:
+            txs (list[dict]): The transactions about to be sent.
+        """
+        stale = {}
+        for tx in txs:
+            key = self.shape(tx)
+            if key not in stale and self._is_stale(key):
+                stale[key] = tx
+        if not stale:
+            return
+
+        results = batch_request(
+            self.web3,
+            [("eth_estimateGas", [self._estimate_params(tx)]) for tx in stale.values()],
+        )
+        for key, result in zip(stale, results):
+            if result is not None:
+                self._store(key, int(result, 16))
+        logger.debug(f"Estimated {len(stale)} gas limits on {self.net.value}")
+
+    def learn(self, tx_hash, tx: dict) -> None:
+        """
+        Adjusts the margin of the shape of a transaction once it is mined.
+
+        Args:
+            tx_hash (HexBytes | str): The hash of the sent transaction.
+            tx (dict): The sent transaction.
+        """
+        key = self.shape(tx)
+        self.receipt_tracker.track(
+            tx_hash,
+            timeout=self.RECEIPT_TIMEOUT,
+            callback=lambda fut: self._observe(key, fut),
+        )
+
+    @staticmethod
+    def shape(tx: dict) -> tuple:
+        data = HexBytes(tx.get("data") or b"")
+        # transfers without calldata cost the same whoever receives them
+        to = tx.get("to") if data else None
+        return (to, data[:4].hex(), len(data))
+
+    def _is_stale(self, key: tuple) -> bool:
+        with self._lock:
+            entry = self._estimates.get(key)
+        return entry is None or time.monotonic() - entry[1] > self.ttl
+
+    def _store(self, key: tuple, gas: int) -> None:
+        with self._lock:
+            self._estimates[key] = (gas, time.monotonic())
+
+    def _limit(self, key: tuple) -> int:
+        with self._lock:
+            gas = self._estimates[key][0]
+            peak = self._peaks.get(key)
+        margin = (
+            self.DEFAULT_MARGIN
+            if peak is None
+            else max(self.MIN_MARGIN, peak * self.HEADROOM)
+        )
+        return math.ceil(gas * margin)
+
+    def _observe(self, key: tuple, fut) -> None:
+        if fut.exception() is not None:
+            return
+        receipt = fut.result()
+        with self._lock:
+            if key not in self._estimates:
+                return
+            gas, fetched_at = self._estimates[key]
+            ratio = receipt["gasUsed"] / gas
+            self._peaks[key] = max(ratio, self._peaks.get(key, ratio) * self.PEAK_DECAY)
+            if not receipt["status"]:
+                # a reverted transaction may have run out of gas, estimate again
+                self._estimates[key] = (gas, fetched_at - self.ttl)
+
+    @staticmethod
+    def _estimate_params(tx: dict) -> dict:
+        params = {k: tx[k] for k in ("from", "to") if tx.get(k)}
+        if tx.get("value"):
+            params["value"] = hex(tx["value"])
+        if tx.get("data"):
+            params["data"] = "0x" + bytes(HexBytes(tx["data"])).hex()
+        return params
+
+
+_caches: dict[Mainnet, GasLimitCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_gas_limits(net: Mainnet) -> GasLimitCache:
+    """
+    Returns the process-wide GasLimitCache of a chain.
+
+    Args:
+        net (Mainnet): The chain of the cache.
+
+    Returns:
+        GasLimitCache: The cache shared by all providers on the chain.
+    """
+    with _caches_lock:
+        if net not in _caches:
+            _caches[net] = GasLimitCache(net)
+        return _caches[net]
@@ -0,0 +1,49 @@
+import json
+
+from web3 import Web3
+from web3._utils.request import make_post_request
+
+from utils.logger import logger
+
+
+def batch_request(web3: Web3, calls: list[tuple[str, list]]) -> list:
+    """
+    Sends several JSON-RPC calls to the node of a connection in a single batch.
+
+    Args:
+        web3 (Web3): The connection whose endpoint receives the batch.
+        calls (list[tuple[str, list]]): The (method, params) pairs to send.
+
+    Returns:
+        list: The raw results in the order of the calls, None for calls that failed.
+    """
+    if not calls:
+        return []
+
+    provider = web3.provider
+    if hasattr(provider, "make_batch_request"):
+        return _order_responses(provider.make_batch_request(calls), calls)
+
+    payload = [
+        {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+        for i, (method, params) in enumerate(calls)
+    ]
+    raw = make_post_request(
+        provider.endpoint_uri,
+        json.dumps(payload).encode(),
+        **provider.get_request_kwargs(),
+    )
+    return _order_responses(json.loads(raw), calls)
+
+
+def _order_responses(responses: list[dict], calls: list[tuple[str, list]]) -> list:
+    by_id = {resp.get("id"): resp for resp in responses}
+    results = []
+    for i, (method, _) in enumerate(calls):
+        resp = by_id.get(i, {})
+        if "error" in resp or "result" not in resp:
+            logger.warning(f"Batched {method} failed: {resp.get('error')}")
+            results.append(None)
+        else:
+            results.append(resp["result"])
+    return results
@@ -0,0 +1,230 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Callable
+
+from web3._utils.caching import generate_cache_key
+from web3.types import RPCEndpoint, RPCResponse
+
+from utils.enums import Mainnet
+
+# results that never change once a chain is deployed
+IMMUTABLE_METHODS = {
+    "eth_chainId",
+    "net_version",
+    "zks_L1ChainId",
+    "zks_getMainContract",
+    "zks_getBridgeContracts",
+    "zks_getTestnetPaymaster",
+}
+# results that only change with the state, cached per block
+BLOCK_SCOPED_METHODS = {"eth_call", "eth_getBalance"}
+# decimals(), symbol() and name() of a token never change either
+IMMUTABLE_SELECTORS = {"0x313ce567", "0x95d89b41", "0x06fdde03"}
+
+
+class RPCCache:
+    """
+    Read-through cache of the JSON-RPC results of one chain.
+
+    Chain ids, contract addresses, contract code and token metadata are kept for
+    the lifetime of the process. eth_call and eth_getBalance results are keyed to
+    a block: requests for "latest" are pinned to the head block number learned
+    from the eth_blockNumber responses passing by, e.g. from the receipt tracker.
+    The head is trusted for HEAD_TTL seconds, reads while it is stale go to the
+    node uncached instead of fetching it. Pending state and errors are never
+    cached. Block-scoped entries are evicted least recently used first.
+
+    Args:
+        net (Mainnet): The chain whose results are cached.
+
+    Methods:
+        key(method, params): Returns the cache key of a request, None if it is not cacheable.
+        set_head(response): Pins "latest" to the block number of an eth_blockNumber response.
+        get(key): Returns the cached response of a key.
+        put(method, params, key, response): Caches a successful response.
+    """
+
+    HEAD_TTL = {Mainnet.ETHEREUM: 2.0, Mainnet.ZKSYNC_ERA: 1.0}
+    MAXSIZE = 4096
+
+    def __init__(self, net: Mainnet):
+        self.net = net
+        self.head_ttl = self.HEAD_TTL[net]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._immutable: dict[str, RPCResponse] = {}
+        self._scoped: OrderedDict[str, RPCResponse] = OrderedDict()
+        self._head = None
+        self._head_expires = 0.0
+
+    def key(self, method: str, params: Any) -> str | None:
+        """
+        Returns the cache key of a request.
+
+        Args:
+            method (str): The JSON-RPC method.
+            params (Any): The params of the request.
+
+        Returns:
+            str | None: The key, None if the result must not be cached.
+        """
+        if method in IMMUTABLE_METHODS:
+            return generate_cache_key((method, params))
+        if _is_immutable(method, params):
+            return generate_cache_key((method, params[0]))
+        if method not in BLOCK_SCOPED_METHODS:
+            return None
+
+        block = _block(params)
+        if block == "latest":
+            with self._lock:
+                if self._head is None or self._head_expires <= time.monotonic():
+                    return None
+                block = self._head
+        elif not isinstance(block, int) and not str(block).startswith("0x"):
+            # pending, safe and finalized move on their own
+            return None
+        return generate_cache_key((method, params[0], block))
+
+    def set_head(self, response: RPCResponse) -> None:
+        """
+        Pins "latest" to the block number of an eth_blockNumber response.
+
+        Args:
+            response (RPCResponse): The response of eth_blockNumber.
+        """
+        head = response.get("result")
+        if head is None or "error" in response:
+            return
+        if isinstance(head, str):
+            head = int(head, 16)
+        with self._lock:
+            if self._head is None or head >= self._head:
+                self._head = head
+            self._head_expires = time.monotonic() + self.head_ttl
+
+    def get(self, key: str) -> RPCResponse | None:
+        """
+        Returns the cached response of a key.
+
+        Args:
+            key (str): The key of the request.
+
+        Returns:
+            RPCResponse | None: The response, None on a miss.
+        """
+        with self._lock:
+            response = self._immutable.get(key)
+            if response is None:
+                response = self._scoped.get(key)
+                if response is not None:
+                    self._scoped.move_to_end(key)
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def put(self, method: str, params: Any, key: str, response: RPCResponse) -> None:
+        """
+        Caches a successful response.
+
+        Args:
+            method (str): The JSON-RPC method of the request.
+            params (Any): The params of the request.
+            key (str): The key of the request.
+            response (RPCResponse): The response of the node.
+        """
+        # "0x" is the code of an account without a contract, or a failed call
+        if "error" in response or response.get("result") in (None, "0x"):
+            return
+        with self._lock:
+            if method in IMMUTABLE_METHODS or _is_immutable(method, params):
+                self._immutable[key] = response
+                return
+            self._scoped[key] = response
+            self._scoped.move_to_end(key)
+            while len(self._scoped) > self.MAXSIZE:
+                self._scoped.popitem(last=False)
+
+
+def _is_immutable(method: str, params: Any) -> bool:
+    # contract code and token metadata, whatever block they are read at
+    if method == "eth_getCode":
+        return True
+    return method == "eth_call" and _selector(params[0]) in IMMUTABLE_SELECTORS
+
+
+def _block(params: Any):
+    return params[1] if len(params) > 1 else "latest"
+
+
+def _selector(tx: dict) -> str:
+    data = tx.get("data") or tx.get("input") or ""
+    if isinstance(data, (bytes, bytearray)):
+        data = "0x" + bytes(data).hex()
+    return data[:10].lower()
+
+
+def build_rpc_cache_middleware(cache: RPCCache):
+    """
+    Builds a web3 middleware answering cacheable requests from an RPCCache.
+
+    Args:
+        cache (RPCCache): The cache of the chain of the connection.
+
+    Returns:
+        Middleware: The middleware, to be added as the outermost layer.
+    """
+
+    def rpc_cache_middleware(make_request: Callable, w3) -> Callable:
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if method == "eth_blockNumber":
+                response = make_request(method, params)
+                cache.set_head(response)
+                return response
+            key = cache.key(method, params)
+            if key is None:
+                return make_request(method, params)
+            response = cache.get(key)
+            if response is None:
+                response = make_request(method, params)
+                cache.put(method, params, key, response)
+            return response
+
+        return middleware
+
+    return rpc_cache_middleware
+
+
+def async_build_rpc_cache_middleware(cache: RPCCache):
+    """
+    Builds the AsyncWeb3 counterpart of build_rpc_cache_middleware.
+
+    Args:
+        cache (RPCCache): The cache of the chain of the connection.
+
+    Returns:
+        AsyncMiddleware: The middleware, to be added as the outermost layer.
+    """
+
+    async def async_rpc_cache_middleware(make_request: Callable, w3) -> Callable:
+        async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if method == "eth_blockNumber":
+                response = await make_request(method, params)
+                cache.set_head(response)
+                return response
+            key = cache.key(method, params)
+            if key is None:
+                return await make_request(method, params)
+            response = cache.get(key)
+            if response is None:
+                response = await make_request(method, params)
+                cache.put(method, params, key, response)
+            return response
+
+        return middleware
+
+    return async_rpc_cache_middleware
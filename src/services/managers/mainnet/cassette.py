@@ -0,0 +1,217 @@
+import atexit
+from collections import deque
+import gzip
+import json
+from pathlib import Path
+import threading
+import time
+
+from utils.enums import RPCMode
+from utils.logger import logger
+
+NOT_RECORDED = -32099
+
+
+class Cassette:
+    """
+    Records the JSON-RPC traffic of a run to a file and serves it back offline.
+
+    In RECORD mode every request is appended as one JSON line with the provider
+    name, its start offset, its duration, the request and the response. Files
+    ending in .gz are gzip compressed. The file is flushed every FLUSH_INTERVAL
+    seconds, so a recording killed before it is closed still replays up to the
+    last flush, the truncated tail is skipped.
+
+    In REPLAY modes nothing is sent over the network. Every call of a request,
+    batched or not, is answered with the recorded response of the same method and
+    params, in recorded order. Calls whose params were never recorded, e.g. the
+    addresses of freshly generated wallets or re-signed transactions, get the next
+    unused response of the same method instead. Once the responses of a call are
+    used up the last one is repeated, so extra polls see the final state.
+    REPLAY_TIMED additionally waits the recorded duration of every request, REPLAY
+    answers at full speed and leaves only the CPU time of the bot.
+
+    Args:
+        path (Path): The cassette file.
+        mode (RPCMode): RECORD, REPLAY or REPLAY_TIMED.
+
+    Methods:
+        record(provider, request_data, raw_response, started, duration): Appends one request to the cassette.
+        replay(provider, request_data): Returns the recorded response and latency of a request.
+        close(): Flushes and closes a recording cassette.
+    """
+
+    FLUSH_INTERVAL = 5
+
+    def __init__(self, path: Path, mode: RPCMode):
+        if mode == RPCMode.LIVE:
+            raise ValueError("A cassette needs a record or replay mode")
+        self.path = Path(path)
+        self.mode = mode
+        self.replaying = mode != RPCMode.RECORD
+        self.timed = mode == RPCMode.REPLAY_TIMED
+        self._lock = threading.Lock()
+        self._file = None
+        self._started = time.monotonic()
+        self._flushed_at = self._started
+        # responses of the recorded calls and the duration of their request
+        self._calls: list[tuple[dict, float]] = []
+        self._used: list[bool] = []
+        self._by_params: dict[tuple[str, str, str], deque[int]] = {}
+        self._by_method: dict[tuple[str, str], deque[int]] = {}
+        self._last: dict[tuple, int] = {}
+
+        if self.replaying:
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self._open("wt")
+            atexit.register(self.close)
+            logger.info(f"Recording RPC traffic to {self.path}")
+
+    def record(
+        self,
+        provider: str,
+        request_data: bytes,
+        raw_response: bytes,
+        started: float,
+        duration: float,
+    ) -> None:
+        """
+        Appends one request and its response to the cassette.
+
+        Args:
+            provider (str): The name of the provider that sent the request.
+            request_data (bytes): The request body.
+            raw_response (bytes): The response body.
+            started (float): The time.monotonic() at which the request was sent.
+            duration (float): Seconds until the response arrived.
+        """
+        try:
+            response = json.loads(raw_response)
+        except ValueError:
+            return
+        line = json.dumps(
+            {
+                "p": provider,
+                "t": round(started - self._started, 6),
+                "d": round(duration, 6),
+                "q": json.loads(request_data),
+                "r": response,
+            },
+            separators=(",", ":"),
+        )
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                if time.monotonic() - self._flushed_at > self.FLUSH_INTERVAL:
+                    # a gzip sync flush ends the data written so far on a
+                    # readable boundary
+                    self._file.flush()
+                    self._flushed_at = time.monotonic()
+
+    def replay(self, provider: str, request_data: bytes) -> tuple[bytes, float]:
+        """
+        Returns the recorded response of a request.
+
+        Args:
+            provider (str): The name of the provider sending the request.
+            request_data (bytes): The request body.
+
+        Returns:
+            tuple[bytes, float]: The response body and the recorded seconds it took.
+        """
+        request = json.loads(request_data)
+        calls = request if isinstance(request, list) else [request]
+        responses = []
+        duration = 0.0
+        with self._lock:
+            for call in calls:
+                index = self._lookup(provider, call["method"], call.get("params", []))
+                if index is None:
+                    response = {
+                        "jsonrpc": "2.0",
+                        "error": {
+                            "code": NOT_RECORDED,
+                            "message": f"{call['method']} was not recorded",
+                        },
+                    }
+                else:
+                    response, call_duration = self._calls[index]
+                    duration = max(duration, call_duration)
+                responses.append({**response, "id": call.get("id")})
+
+        body = responses if isinstance(request, list) else responses[0]
+        return json.dumps(body).encode(), duration
+
+    def close(self) -> None:
+        """
+        Flushes and closes a recording cassette.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _lookup(self, provider: str, method: str, params) -> int | None:
+        exact = (provider, method, _params_key(params))
+        by_method = (provider, method)
+        for key, queue in (
+            (exact, self._by_params.get(exact)),
+            (by_method, self._by_method.get(by_method)),
+        ):
+            while queue and self._used[queue[0]]:
+                queue.popleft()
+            if queue:
+                index = queue.popleft()
+                self._used[index] = True
+                self._last[key] = self._last[exact] = index
+                return index
+            if key in self._last:
+                return self._last[key]
+        return None
+
+    def _load(self) -> None:
+        for entry in self._read_entries():
+            requests = entry["q"] if isinstance(entry["q"], list) else [entry["q"]]
+            responses = entry["r"] if isinstance(entry["r"], list) else [entry["r"]]
+            by_id = {resp.get("id"): resp for resp in responses}
+            for req in requests:
+                if req.get("id") not in by_id:
+                    continue
+                index = len(self._calls)
+                response = {k: v for k, v in by_id[req["id"]].items() if k != "id"}
+                self._calls.append((response, entry["d"]))
+                self._used.append(False)
+                params_key = _params_key(req.get("params", []))
+                self._by_params.setdefault(
+                    (entry["p"], req["method"], params_key), deque()
+                ).append(index)
+                by_method = (entry["p"], req["method"])
+                self._by_method.setdefault(by_method, deque()).append(index)
+        logger.info(f"Replaying {len(self._calls)} RPC calls from {self.path}")
+
+    def _read_entries(self):
+        count = 0
+        try:
+            with self._open("rt") as f:
+                for line in f:
+                    yield json.loads(line)
+                    count += 1
+        # EOFError and BadGzipFile (an OSError) of a recording that was killed,
+        # a ValueError of the partial line it was writing
+        except (EOFError, OSError, ValueError) as e:
+            if count == 0:
+                raise
+            logger.warning(
+                f"{self.path} ends after {count} requests ({e}), it was not closed"
+            )
+
+    def _open(self, mode: str):
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+
+def _params_key(params) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
@@ -1,8 +1,29 @@
 import os
 
-from web3 import Web3, HTTPProvider
-from zksync2.module.module_builder import ZkSyncBuilder
+from web3 import AsyncWeb3, Web3
+from web3._utils.module import attach_modules
+from zksync2.module.middleware import build_zksync_middleware
+from zksync2.module.zksync_module import ZkSync
 
+from services.managers.mainnet.cache import (
+    RPCCache,
+    async_build_rpc_cache_middleware,
+    build_rpc_cache_middleware,
+)
+from services.managers.mainnet.cassette import Cassette
+from services.managers.mainnet.transport import (
+    AsyncPooledHTTPProvider,
+    EndpointPool,
+    PooledHTTPProvider,
+)
+from utils.constants import (
+    ETH_RPC_URL,
+    RPC_CASSETTE_PATH,
+    RPC_PROBE_INTERVAL,
+    ZKSYNC_RPC_URL,
+)
+from utils.enums import Mainnet, RPCMode
+from utils.logger import logger
 from utils.utils import singleton
 
 
@@ -11,18 +32,153 @@ class MainnetManager:
     """
     A class that manages the mainnet connections for Ethereum and ZKSync.
 
+    Every chain can be served by several RPC endpoints, configured as comma
+    separated lists in the ETH_RPC_URLS and ZKSYNC_RPC_URLS environment variables.
+    Requests go to the fastest healthy endpoint over kept-alive connections and
+    fail over to the next one.
+
+    RPC_MODE=record writes all JSON-RPC traffic to a cassette (RPC_CASSETTE,
+    RPC_CASSETTE_PATH by default), RPC_MODE=replay and replay_timed serve it
+    back without touching the network, at full speed or with the recorded
+    latencies.
+
+    Every connection answers immutable and block-scoped reads from the RPCCache
+    of its chain, shared by the sync and async connections.
+
     Attributes:
         eth_web3 (Web3): An instance of Web3 connected to the Ethereum mainnet.
         zk_web3 (Web3): An instance of Web3 connected to the ZKSync mainnet.
+        async_eth_web3 (AsyncWeb3): An instance of AsyncWeb3 connected to the Ethereum mainnet.
+        async_zk_web3 (AsyncWeb3): An instance of AsyncWeb3 connected to the ZKSync mainnet.
+        pools (dict[Mainnet, EndpointPool]): The RPC endpoints of every network.
+        cassette (Cassette | None): The cassette recorded or replayed, None when live.
+        caches (dict[Mainnet, RPCCache]): The RPC response cache of every network.
 
     Methods:
         __init__(): Initializes the MainnetManager class by setting up the web3 connections and checking the health of the networks.
         check_health(): Checks the health of the Ethereum and ZKSync networks and prints a message if any of them are not connected.
+        get_web3(net): Returns the Web3 instance connected to the given network.
+        get_async_web3(net): Returns the AsyncWeb3 instance connected to the given network.
+        aclose(): Closes the connections the async providers opened on the running event loop.
     """
 
     def __init__(self) -> None:
         """
         Initializes the MainnetManager class by setting up the web3 connections and checking the health of the networks.
         """
-        self.eth_web3 = Web3(HTTPProvider("https://eth-goerli.public.blastapi.io"))
-        self.zk_web3 = ZkSyncBuilder.build("https://testnet.era.zksync.dev")
+        self.pools = {
+            Mainnet.ETHEREUM: EndpointPool(
+                self._read_urls("ETH_RPC_URLS", ETH_RPC_URL)
+            ),
+            Mainnet.ZKSYNC_ERA: EndpointPool(
+                self._read_urls("ZKSYNC_RPC_URLS", ZKSYNC_RPC_URL)
+            ),
+        }
+        self.cassette = self._open_cassette()
+        self.caches = {net: RPCCache(net) for net in Mainnet}
+        self.eth_web3 = Web3(
+            PooledHTTPProvider(
+                self.pools[Mainnet.ETHEREUM], Mainnet.ETHEREUM.value, self.cassette
+            )
+        )
+        self.zk_web3 = self._build_zk_web3(
+            self.pools[Mainnet.ZKSYNC_ERA], Mainnet.ZKSYNC_ERA.value, self.cassette
+        )
+        self.async_eth_web3 = AsyncWeb3(
+            AsyncPooledHTTPProvider(
+                self.pools[Mainnet.ETHEREUM], Mainnet.ETHEREUM.value, self.cassette
+            )
+        )
+        self.async_zk_web3 = AsyncWeb3(
+            AsyncPooledHTTPProvider(
+                self.pools[Mainnet.ZKSYNC_ERA], Mainnet.ZKSYNC_ERA.value, self.cassette
+            )
+        )
+        # the cache is the outermost layer, the zksync middleware skips all others
+        for net in Mainnet:
+            self.get_web3(net).middleware_onion.add(
+                build_rpc_cache_middleware(self.caches[net]), "rpc_cache"
+            )
+            self.get_async_web3(net).middleware_onion.add(
+                async_build_rpc_cache_middleware(self.caches[net]), "rpc_cache"
+            )
+
+        # a replay never reaches the endpoints, probing them would only fail
+        if self.cassette is None or not self.cassette.replaying:
+            for pool in self.pools.values():
+                pool.start_probing(RPC_PROBE_INTERVAL)
+        self.check_health()
+
+    @staticmethod
+    def _open_cassette() -> Cassette | None:
+        mode = RPCMode(os.environ.get("RPC_MODE", RPCMode.LIVE.value))
+        if mode == RPCMode.LIVE:
+            return None
+        return Cassette(os.environ.get("RPC_CASSETTE", RPC_CASSETTE_PATH), mode)
+
+    @staticmethod
+    def _build_zk_web3(pool: EndpointPool, name: str, cassette: Cassette) -> Web3:
+        # ZkSyncBuilder would route every request through its own single-URL
+        # provider, so the zksync middleware is wired to the pool instead
+        provider = PooledHTTPProvider(pool, name, cassette)
+        zk_web3 = Web3(provider)
+        zk_web3.middleware_onion.add(build_zksync_middleware(provider))
+        attach_modules(zk_web3, {"zksync": (ZkSync,)})
+        return zk_web3
+
+    def check_health(self) -> dict[Mainnet, bool]:
+        """
+        Checks the health of the Ethereum and ZKSync networks and prints a message if any of them are not connected.
+
+        Returns:
+            dict[Mainnet, bool]: Whether at least one endpoint of each network is healthy.
+        """
+        health = {}
+        for net, pool in self.pools.items():
+            health[net] = any(e.healthy for e in pool.endpoints)
+            if not health[net]:
+                print(f"{net.value} is not connected")
+                logger.error(f"No healthy RPC endpoint for {net.value}")
+            else:
+                best = pool.best()
+                logger.info(
+                    f"{net.value} routed to {best.uri} ({best.latency * 1000:.0f} ms)"
+                )
+        return health
+
+    def get_web3(self, net: Mainnet) -> Web3:
+        """
+        Returns the Web3 instance connected to the given network.
+
+        Args:
+            net (Mainnet): The network of the connection.
+
+        Returns:
+            Web3: The connection to the network.
+        """
+        return self.zk_web3 if net == Mainnet.ZKSYNC_ERA else self.eth_web3
+
+    def get_async_web3(self, net: Mainnet) -> AsyncWeb3:
+        """
+        Returns the AsyncWeb3 instance connected to the given network.
+
+        Args:
+            net (Mainnet): The network of the connection.
+
+        Returns:
+            AsyncWeb3: The connection to the network.
+        """
+        if net == Mainnet.ZKSYNC_ERA:
+            return self.async_zk_web3
+        return self.async_eth_web3
+
+    async def aclose(self) -> None:
+        """
+        Closes the connections the async providers opened on the running event loop.
+        """
+        for net in Mainnet:
+            await self.get_async_web3(net).provider.aclose()
+
+    def _read_urls(self, env_var: str, default: str) -> list[str]:
+        urls = os.environ.get(env_var, default)
+        return [url.strip() for url in urls.split(",") if url.strip()]
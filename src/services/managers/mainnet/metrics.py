@@ -0,0 +1,301 @@
+import atexit
+from bisect import bisect_left
+from contextlib import contextmanager
+import contextvars
+import os
+from pathlib import Path
+import re
+import threading
+import time
+
+from utils.logger import logger
+from utils.utils import singleton
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_OPERATION = "other"
+BATCH_METHOD = "batch"
+
+_operation = contextvars.ContextVar("rpc_operation", default=DEFAULT_OPERATION)
+
+_COUNTERS = {
+    "calls": ("rpc_calls_total", "JSON-RPC calls sent."),
+    "requests": ("rpc_requests_total", "HTTP round trips, a batch is one request."),
+    "errors": ("rpc_errors_total", "JSON-RPC calls that failed or returned an error."),
+    "sent_bytes": ("rpc_sent_bytes_total", "Bytes of the request bodies."),
+    "received_bytes": ("rpc_received_bytes_total", "Bytes of the response bodies."),
+}
+_DURATION = "rpc_request_duration_seconds"
+_SAMPLE_RE = re.compile(r"^(\w+)\{(.*)\} (\S+)$")
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+@contextmanager
+def rpc_operation(name: str):
+    """
+    Labels the RPC calls made inside the block, and in tasks started from it, with an operation.
+
+    Args:
+        name (str): The name of the operation.
+    """
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+class _Series:
+    __slots__ = (*_COUNTERS, "duration_sum", "buckets")
+
+    def __init__(self):
+        for name in _COUNTERS:
+            setattr(self, name, 0)
+        self.duration_sum = 0.0
+        # one bucket per bound and a last one for +Inf, not cumulative
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class _Observation:
+    def __init__(self):
+        self.received_bytes = 0
+        self.errors = None
+
+    def set_response(self, raw_response: bytes, errors: int) -> None:
+        self.received_bytes = len(raw_response)
+        self.errors = errors
+
+
+@singleton
+class RPCMetrics:
+    """
+    Counters and latency histograms of all JSON-RPC traffic of the process.
+
+    Series are labelled by provider (the chain), operation (set with
+    rpc_operation, e.g. the pipeline operation being executed) and method. A
+    batch of one method is recorded under that method, mixed batches under
+    "batch". Latencies are per HTTP round trip including endpoint failover.
+    const_labels are added to every exported series, e.g. the shard of a worker.
+
+    Methods:
+        observe(provider, methods, request_data): Context manager timing one request.
+        snapshot(): Returns a copy of all series.
+        to_prometheus(): Renders all series in the Prometheus text format.
+        write_textfile(path): Atomically writes the Prometheus text format to a file.
+        start_exporting(path, interval): Writes the textfile every `interval` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str, str], _Series] = {}
+        self.const_labels: dict[str, str] = {}
+        self._export_thread = None
+
+    @contextmanager
+    def observe(self, provider: str, methods: list[str], request_data: bytes):
+        """
+        Times one HTTP request to an RPC node and records it on exit.
+
+        The caller reports the response on the yielded observation. A request
+        that raises counts every call as an error.
+
+        Args:
+            provider (str): The name of the provider sending the request.
+            methods (list[str]): The methods of the calls in the request.
+            request_data (bytes): The request body.
+        """
+        obs = _Observation()
+        start = time.monotonic()
+        try:
+            yield obs
+        finally:
+            duration = time.monotonic() - start
+            errors = len(methods) if obs.errors is None else obs.errors
+            self._record(
+                provider,
+                methods,
+                duration,
+                len(request_data),
+                obs.received_bytes,
+                errors,
+            )
+
+    def snapshot(self) -> dict[tuple[str, str, str], dict]:
+        """
+        Returns a copy of all series.
+
+        Returns:
+            dict[tuple[str, str, str], dict]: The counters and duration sum per (provider, operation, method).
+        """
+        with self._lock:
+            return {
+                key: {
+                    **{name: getattr(series, name) for name in _COUNTERS},
+                    "duration_sum": series.duration_sum,
+                    "buckets": list(series.buckets),
+                }
+                for key, series in self._series.items()
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders all series in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+        for name, (metric, help_text) in _COUNTERS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for key, series in snapshot:
+                lines.append(
+                    f"{metric}{{{_labels(key, self.const_labels)}}} {series[name]}"
+                )
+
+        lines.append(f"# HELP {_DURATION} Latency of the HTTP round trips.")
+        lines.append(f"# TYPE {_DURATION} histogram")
+        for key, series in snapshot:
+            labels = _labels(key, self.const_labels)
+            cumulative = 0
+            for bound, count in zip(
+                [*map(str, LATENCY_BUCKETS), "+Inf"], series["buckets"]
+            ):
+                cumulative += count
+                lines.append(
+                    f'{_DURATION}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{_DURATION}_sum{{{labels}}} {series['duration_sum']:.6f}")
+            lines.append(f"{_DURATION}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        Atomically writes the Prometheus text format to a file.
+
+        Args:
+            path (Path): The file read by the node exporter textfile collector.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_exporting(self, path: Path, interval: float) -> None:
+        """
+        Writes the textfile every `interval` seconds and once more on exit.
+
+        Args:
+            path (Path): The file read by the node exporter textfile collector.
+            interval (float): Seconds between two writes.
+        """
+        if self._export_thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    logger.warning(f"Writing RPC metrics to {path} failed: {e}")
+
+        self._export_thread = threading.Thread(
+            target=run, name="rpc-metrics", daemon=True
+        )
+        self._export_thread.start()
+        atexit.register(self.write_textfile, path)
+
+    def _record(self, provider, methods, duration, sent_bytes, received_bytes, errors):
+        method = methods[0] if len(set(methods)) == 1 else BATCH_METHOD
+        key = (provider, _operation.get(), method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.calls += len(methods)
+            series.requests += 1
+            series.errors += errors
+            series.sent_bytes += sent_bytes
+            series.received_bytes += received_bytes
+            series.duration_sum += duration
+            series.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+
+def _labels(key: tuple[str, str, str], const_labels: dict[str, str]) -> str:
+    labels = [*zip(("provider", "operation", "method"), key), *const_labels.items()]
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def read_textfiles(paths: list[Path]) -> dict[tuple[str, str, str], dict]:
+    """
+    Reads and sums the counters and duration sums of textfiles written by RPCMetrics.
+
+    Series of several workers, e.g. one file per shard, are added up.
+
+    Args:
+        paths (list[Path]): The textfiles.
+
+    Returns:
+        dict[tuple[str, str, str], dict]: The counters and duration sum per (provider, operation, method).
+    """
+    metric_names = {metric: name for name, (metric, _) in _COUNTERS.items()}
+    metric_names[f"{_DURATION}_sum"] = "duration_sum"
+    series = {}
+    for path in paths:
+        for line in path.read_text().splitlines():
+            match = _SAMPLE_RE.match(line)
+            if match is None or match.group(1) not in metric_names:
+                continue
+            labels = {
+                name: _unescape(value)
+                for name, value in _LABEL_RE.findall(match.group(2))
+            }
+            key = (labels["provider"], labels["operation"], labels["method"])
+            values = series.setdefault(key, {})
+            name = metric_names[match.group(1)]
+            values[name] = values.get(name, 0.0) + float(match.group(3))
+    return series
+
+
+def format_summary(series: dict[tuple[str, str, str], dict], top: int = 5) -> str:
+    """
+    Formats the slowest RPC methods of every operation as a table.
+
+    Args:
+        series (dict[tuple[str, str, str], dict]): The series of RPCMetrics.snapshot or read_textfiles.
+        top (int): The number of methods shown per operation.
+
+    Returns:
+        str: The summary, one operation after another sorted by RPC time.
+    """
+    by_op: dict[str, list] = {}
+    for (provider, operation, method), values in series.items():
+        by_op.setdefault(operation, []).append((provider, method, values))
+
+    lines = []
+    for operation, rows in sorted(
+        by_op.items(), key=lambda item: -sum(r[2]["duration_sum"] for r in item[1])
+    ):
+        total = sum(values["duration_sum"] for _, _, values in rows)
+        calls = sum(values["calls"] for _, _, values in rows)
+        lines.append(f"{operation}: {total:.1f} s over {calls:.0f} calls")
+        rows.sort(key=lambda row: -row[2]["duration_sum"])
+        for provider, method, values in rows[:top]:
+            share = values["duration_sum"] / total * 100 if total else 0.0
+            avg_ms = values["duration_sum"] / max(values["requests"], 1) * 1000
+            lines.append(
+                f"  {method:<28} {provider:<17} {values['calls']:>7.0f} calls "
+                f"{values['errors']:>4.0f} err {values['duration_sum']:>8.1f} s "
+                f"{share:>3.0f}% {avg_ms:>7.1f} ms/req "
+                f"{values['received_bytes'] / 1024:>8.0f} KiB"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,357 @@
+import itertools
+import json
+import threading
+import time
+
+import asyncio
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from services.managers.mainnet.cassette import Cassette
+from services.managers.mainnet.metrics import RPCMetrics
+from utils.logger import logger
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RPCEndpointError(Exception):
+    pass
+
+
+class Endpoint:
+    """
+    A single RPC endpoint with its keep-alive session and health statistics.
+
+    Args:
+        uri (str): The HTTP URI of the endpoint.
+        pool_size (int): The maximum number of kept-alive connections to the endpoint.
+    """
+
+    EWMA_WEIGHT = 0.2
+
+    def __init__(self, uri: str, pool_size: int):
+        self.uri = uri
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.healthy = True
+        self.latency = float("inf")
+        self.block_number = 0
+
+    def record(self, latency: float) -> None:
+        self.healthy = True
+        if self.latency == float("inf"):
+            self.latency = latency
+        else:
+            self.latency += self.EWMA_WEIGHT * (latency - self.latency)
+
+    def mark_down(self, err: Exception) -> None:
+        if self.healthy:
+            logger.warning(f"RPC endpoint {self.uri} is unhealthy: {err}")
+        self.healthy = False
+
+
+class EndpointPool:
+    """
+    Ranks the RPC endpoints of one chain by latency and health.
+
+    Endpoints are probed with eth_blockNumber at startup and then in a background
+    thread. Endpoints lagging more than MAX_BLOCK_LAG blocks behind the best one
+    count as unhealthy. Every request updates the latency of the endpoint it used.
+
+    Args:
+        uris (list[str]): The HTTP URIs of the endpoints.
+        pool_size (int): The maximum number of kept-alive connections per endpoint.
+        request_timeout (float): Seconds before a request to an endpoint times out.
+    """
+
+    MAX_BLOCK_LAG = 5
+
+    def __init__(self, uris: list[str], pool_size: int = 20, request_timeout=30):
+        if not uris:
+            raise ValueError("At least one RPC endpoint is required")
+        self.endpoints = [Endpoint(uri, pool_size) for uri in uris]
+        self.request_timeout = request_timeout
+        self._probe_thread = None
+
+    def ranked(self) -> list[Endpoint]:
+        """
+        Returns the healthy endpoints sorted by latency, followed by the unhealthy ones.
+        """
+        return sorted(self.endpoints, key=lambda e: (not e.healthy, e.latency))
+
+    def best(self) -> Endpoint:
+        return self.ranked()[0]
+
+    def probe(self) -> None:
+        """
+        Measures latency and block height of every endpoint.
+        """
+        payload = json.dumps(
+            {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 0}
+        )
+        for endpoint in self.endpoints:
+            start = time.monotonic()
+            try:
+                resp = endpoint.session.post(
+                    endpoint.uri,
+                    data=payload,
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.request_timeout,
+                )
+                resp.raise_for_status()
+                endpoint.block_number = int(resp.json()["result"], 16)
+                endpoint.record(time.monotonic() - start)
+            except Exception as e:
+                endpoint.mark_down(e)
+
+        head = max(e.block_number for e in self.endpoints)
+        for endpoint in self.endpoints:
+            if endpoint.healthy and head - endpoint.block_number > self.MAX_BLOCK_LAG:
+                endpoint.mark_down(f"{head - endpoint.block_number} blocks behind")
+
+    def start_probing(self, interval: float) -> None:
+        """
+        Probes the endpoints now and then every `interval` seconds in the background.
+
+        Args:
+            interval (float): Seconds between two probes.
+        """
+        self.probe()
+        if self._probe_thread is not None or len(self.endpoints) == 1:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.probe()
+
+        self._probe_thread = threading.Thread(target=run, name="rpc-probe", daemon=True)
+        self._probe_thread.start()
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """
+    Web3 provider sending each request to the fastest healthy endpoint of a pool.
+
+    Connection errors, timeouts and retryable HTTP statuses fail over to the next
+    endpoint. JSON-RPC errors are returned to the caller untouched. Every request,
+    batched or not, is recorded in RPCMetrics under the name of the provider.
+    With a cassette the traffic is recorded to it, or served from it instead of
+    the network.
+
+    Args:
+        pool (EndpointPool): The endpoints of the chain.
+        name (str): The provider label of the recorded metrics.
+        cassette (Cassette): The cassette to record to or replay from, if any.
+    """
+
+    def __init__(self, pool: EndpointPool, name: str, cassette: Cassette = None):
+        self.pool = pool
+        self.name = name
+        self.cassette = cassette
+        self.metrics = RPCMetrics()
+        self._ids = itertools.count()
+        super().__init__()
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.pool.best().uri
+
+    def make_request(self, method: RPCEndpoint, params) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        with self.metrics.observe(self.name, [method], request_data) as obs:
+            raw_response = self._post(request_data)
+            response = self.decode_rpc_response(raw_response)
+            obs.set_response(raw_response, int("error" in response))
+        return response
+
+    def make_batch_request(self, calls: list[tuple[str, list]]) -> list[dict]:
+        """
+        Sends several JSON-RPC calls to one endpoint in a single request.
+
+        Args:
+            calls (list[tuple[str, list]]): The (method, params) pairs to send.
+
+        Returns:
+            list[dict]: The raw JSON-RPC responses.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+            for i, (method, params) in enumerate(calls)
+        ]
+        request_data = json.dumps(payload).encode()
+        methods = [method for method, _ in calls]
+        with self.metrics.observe(self.name, methods, request_data) as obs:
+            raw_response = self._post(request_data)
+            responses = json.loads(raw_response)
+            obs.set_response(raw_response, sum("error" in r for r in responses))
+        return responses
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return any(e.healthy for e in self.pool.endpoints)
+
+    def _post(self, data: bytes) -> bytes:
+        if self.cassette is not None and self.cassette.replaying:
+            raw_response, duration = self.cassette.replay(self.name, data)
+            if self.cassette.timed:
+                time.sleep(duration)
+            return raw_response
+
+        start = time.monotonic()
+        raw_response = self._send(data)
+        if self.cassette is not None:
+            self.cassette.record(
+                self.name, data, raw_response, start, time.monotonic() - start
+            )
+        return raw_response
+
+    def _send(self, data: bytes) -> bytes:
+        last_err = None
+        for endpoint in self.pool.ranked():
+            start = time.monotonic()
+            try:
+                resp = endpoint.session.post(
+                    endpoint.uri,
+                    data=data,
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.pool.request_timeout,
+                )
+                if resp.status_code in RETRYABLE_STATUS:
+                    raise RPCEndpointError(f"HTTP {resp.status_code}")
+                resp.raise_for_status()
+            except (requests.RequestException, RPCEndpointError) as e:
+                endpoint.mark_down(e)
+                last_err = e
+                continue
+            endpoint.record(time.monotonic() - start)
+            return resp.content
+
+        raise RPCEndpointError(f"All RPC endpoints failed, last error: {last_err}")
+
+
+class AsyncPooledHTTPProvider(AsyncJSONBaseProvider):
+    """
+    AsyncWeb3 counterpart of PooledHTTPProvider sharing the same EndpointPool.
+
+    aiohttp sessions are bound to the event loop that created them, so every
+    loop (e.g. one per pipeline thread) gets its own kept-alive sessions, which
+    aclose() closes before the loop ends.
+
+    Args:
+        pool (EndpointPool): The endpoints of the chain.
+        name (str): The provider label of the recorded metrics.
+        cassette (Cassette): The cassette to record to or replay from, if any.
+        pool_size (int): The maximum number of kept-alive connections per endpoint.
+
+    Methods:
+        aclose(): Closes the sessions of the running event loop.
+    """
+
+    def __init__(
+        self,
+        pool: EndpointPool,
+        name: str,
+        cassette: Cassette = None,
+        pool_size: int = 20,
+    ):
+        self.pool = pool
+        self.name = name
+        self.cassette = cassette
+        self.pool_size = pool_size
+        self.metrics = RPCMetrics()
+        self._sessions: dict[tuple[int, str], tuple] = {}
+        self._sessions_lock = threading.Lock()
+        super().__init__()
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.pool.best().uri
+
+    async def make_request(self, method: RPCEndpoint, params) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        with self.metrics.observe(self.name, [method], request_data) as obs:
+            raw_response = await self._post(request_data)
+            response = self.decode_rpc_response(raw_response)
+            obs.set_response(raw_response, int("error" in response))
+        return response
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        return any(e.healthy for e in self.pool.endpoints)
+
+    async def _post(self, request_data: bytes) -> bytes:
+        if self.cassette is not None and self.cassette.replaying:
+            raw_response, duration = self.cassette.replay(self.name, request_data)
+            if self.cassette.timed:
+                await asyncio.sleep(duration)
+            return raw_response
+
+        start = time.monotonic()
+        raw_response = await self._send(request_data)
+        if self.cassette is not None:
+            self.cassette.record(
+                self.name, request_data, raw_response, start, time.monotonic() - start
+            )
+        return raw_response
+
+    async def _send(self, request_data: bytes) -> bytes:
+        last_err = None
+        for endpoint in self.pool.ranked():
+            start = time.monotonic()
+            try:
+                async with self._get_session(endpoint.uri).post(
+                    endpoint.uri,
+                    data=request_data,
+                    headers={"Content-Type": "application/json"},
+                    timeout=ClientTimeout(self.pool.request_timeout),
+                ) as resp:
+                    if resp.status in RETRYABLE_STATUS:
+                        raise RPCEndpointError(f"HTTP {resp.status}")
+                    resp.raise_for_status()
+                    raw_response = await resp.read()
+            except Exception as e:
+                endpoint.mark_down(e)
+                last_err = e
+                continue
+            endpoint.record(time.monotonic() - start)
+            return raw_response
+
+        raise RPCEndpointError(f"All RPC endpoints failed, last error: {last_err}")
+
+    async def aclose(self) -> None:
+        """
+        Closes the sessions of the running event loop and their connections.
+
+        Must be awaited before the loop ends, e.g. at the end of asyncio.run.
+        """
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            keys = [
+                k
+                for k, (session_loop, _) in self._sessions.items()
+                if session_loop is loop
+            ]
+            sessions = [self._sessions.pop(key)[1] for key in keys]
+        for session in sessions:
+            await session.close()
+
+    def _get_session(self, uri: str) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            # sessions of loops that ended without aclose() can't be reused
+            for key, (session_loop, _) in list(self._sessions.items()):
+                if session_loop.is_closed():
+                    del self._sessions[key]
+            key = (id(loop), uri)
+            if key not in self._sessions:
+                session = ClientSession(
+                    connector=TCPConnector(limit_per_host=self.pool_size)
+                )
+                self._sessions[key] = (loop, session)
+            return self._sessions[key][1]
@@ -0,0 +1,142 @@
+from contextlib import asynccontextmanager, contextmanager
+import threading
+
+from web3 import Web3
+
+from services.managers.mainnet.core import MainnetManager
+from utils.enums import Mainnet
+from utils.logger import logger
+from utils.utils import singleton
+
+
+@singleton
+class NonceManager:
+    """
+    Hands out transaction nonces from memory per (chain, address).
+
+    The node is only asked for the transaction count the first time an account
+    is used on a chain, or after a send failed and the local counter was reset.
+    This lets several transactions of the same wallet be in flight at once.
+
+    Methods:
+        next_nonce(net, addr): Returns the next nonce for an account, syncing with the node if needed.
+        next_nonce_async(net, addr): Async variant of next_nonce.
+        use_nonce(net, addr): Context manager yielding the next nonce and resetting the account on error.
+        use_nonce_async(net, addr): Async variant of use_nonce.
+        reset(net, addr): Drops the local counter so the next nonce is synced with the node.
+        forget(addr): Drops the local counters of an account on all networks.
+    """
+
+    def __init__(self) -> None:
+        self.mainnet_mngr = MainnetManager()
+        self._nonces: dict[tuple[Mainnet, str], int] = {}
+        self._lock = threading.Lock()
+
+    def next_nonce(self, net: Mainnet, addr: str) -> int:
+        """
+        Returns the next nonce for an account, syncing with the node if needed.
+
+        Args:
+            net (Mainnet): The network the transaction is sent on.
+            addr (str): The address of the sender.
+
+        Returns:
+            int: The nonce to use for the next transaction.
+        """
+        key = (net, Web3.to_checksum_address(addr))
+        nonce = self._allocate(key)
+        if nonce is None:
+            count = self.mainnet_mngr.get_web3(net).eth.get_transaction_count(
+                key[1], "pending"
+            )
+            nonce = self._allocate(key, count)
+        return nonce
+
+    async def next_nonce_async(self, net: Mainnet, addr: str) -> int:
+        """
+        Async variant of next_nonce.
+
+        Args:
+            net (Mainnet): The network the transaction is sent on.
+            addr (str): The address of the sender.
+
+        Returns:
+            int: The nonce to use for the next transaction.
+        """
+        key = (net, Web3.to_checksum_address(addr))
+        nonce = self._allocate(key)
+        if nonce is None:
+            count = await self.mainnet_mngr.get_async_web3(
+                net
+            ).eth.get_transaction_count(key[1], "pending")
+            nonce = self._allocate(key, count)
+        return nonce
+
+    @contextmanager
+    def use_nonce(self, net: Mainnet, addr: str):
+        """
+        Yields the next nonce and resets the account if the block raises.
+
+        Args:
+            net (Mainnet): The network the transaction is sent on.
+            addr (str): The address of the sender.
+        """
+        nonce = self.next_nonce(net, addr)
+        try:
+            yield nonce
+        except Exception:
+            self.reset(net, addr)
+            raise
+
+    @asynccontextmanager
+    async def use_nonce_async(self, net: Mainnet, addr: str):
+        """
+        Async variant of use_nonce.
+
+        Args:
+            net (Mainnet): The network the transaction is sent on.
+            addr (str): The address of the sender.
+        """
+        nonce = await self.next_nonce_async(net, addr)
+        try:
+            yield nonce
+        except Exception:
+            self.reset(net, addr)
+            raise
+
+    def reset(self, net: Mainnet, addr: str) -> None:
+        """
+        Drops the local counter so the next nonce is synced with the node.
+
+        Args:
+            net (Mainnet): The network of the account.
+            addr (str): The address of the account.
+        """
+        key = (net, Web3.to_checksum_address(addr))
+        with self._lock:
+            if self._nonces.pop(key, None) is not None:
+                logger.warning(f"Resetting nonce of {key[1]} on {net.value}")
+
+    def forget(self, addr: str) -> None:
+        """
+        Drops the local counters of an account on all networks.
+
+        Used when another process may have sent from the account.
+
+        Args:
+            addr (str): The address of the account.
+        """
+        addr = Web3.to_checksum_address(addr)
+        with self._lock:
+            for net in Mainnet:
+                self._nonces.pop((net, addr), None)
+
+    def _allocate(
+        self, key: tuple[Mainnet, str], synced_count: int = None
+    ) -> int | None:
+        with self._lock:
+            # another caller may have synced and allocated in the meantime
+            nonce = self._nonces.get(key, synced_count)
+            if nonce is not None:
+                self._nonces[key] = nonce + 1
+            return nonce
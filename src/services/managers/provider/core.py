@@ -1,13 +1,27 @@
+import asyncio
 import json
 from services.managers.account.ers import ErsAccountManager
-from services.provider.eth_native.core import EthMainnetProvider
-from services.provider.izumi.izumi import IzumiProvider
-from services.provider.zksync.zksync import ZksyncEraProvider
-from utils.constants import ETH_SUGAR_DADDY_WALLETS_PATH, FARMING_WALLETS_PATH, OPS_PATH
-from utils.enums import CryptoCurrencies, Mainnet
+from services.managers.account.locks import WalletLockManager
+from services.managers.account.shard import Shard
+from services.managers.mainnet.core import MainnetManager
+from services.managers.mainnet.metrics import rpc_operation
+from services.provider.registry import ProviderRegistry
+from utils.constants import (
+    DEFAULT_CONCURRENCY,
+    ETH_SUGAR_DADDY_WALLETS_PATH,
+    FARMING_WALLETS_PATH,
+    OPS_PATH,
+)
+from utils.enums import CryptoCurrencies, ExecutionMode, Mainnet
 from utils.logger import logger
 
-import json
+# candidate token chains, the Izumi route finder picks the path and fee tiers
+SWAP_TOKEN_CHAINS = [
+    [
+        "0x8C3e3f2983DB650727F3e05B7a7773e4D641537B",
+        "0xA5900cce51c45Ab9730039943B3863C822342034",
+    ],
+]
 
 
 class ProviderManager:
@@ -20,6 +34,11 @@ class ProviderManager:
         farming_acct_mngr (ErsAccountManager): An instance of the ErsAccountManager class for farming wallets.
         sd_acct_mngr (ErsAccountManager): An instance of the ErsAccountManager class for Sugar Daddy wallets.
         ops (set): A set of operation IDs.
+        exec_mode (ExecutionMode): Whether operations run wallet by wallet or concurrently on asyncio.
+        concurrency (int): The maximum number of wallets processed at once in async mode.
+        wallet_locks (WalletLockManager): Keeps parallel pipelines from using the same wallet at once.
+        shard (Shard): The farming wallets this process works on, the Sugar Daddy wallets are shared by all shards.
+        providers (ProviderRegistry): Creates the providers on first use.
 
     Methods:
         read_operations(): Reads the operations from a file and returns a set of operation IDs.
@@ -27,16 +46,51 @@ class ProviderManager:
         generate_wallet(details): Generates new wallets and transfers funds.
         bridge(details): Bridges funds between different blockchains.
         swap(details): Swaps tokens between different chains.
+        refresh_balances(details): Refreshes the stored balances of all wallets.
     """
 
-    def __init__(self):
-        self.izumi_prov = IzumiProvider()
-        self.zk_sync_prov = ZksyncEraProvider()
-        self.eth_net_prov = EthMainnetProvider()
-        self.farming_acct_mngr = ErsAccountManager(FARMING_WALLETS_PATH)
+    def __init__(
+        self,
+        exec_mode: ExecutionMode = ExecutionMode.SYNC,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        shard: Shard = Shard(),
+    ):
+        self.exec_mode = exec_mode
+        self.concurrency = concurrency
+        self.shard = shard
+        self.providers = ProviderRegistry()
+        self.farming_acct_mngr = ErsAccountManager(FARMING_WALLETS_PATH, shard)
         self.sugar_daddy_acct = ErsAccountManager(ETH_SUGAR_DADDY_WALLETS_PATH)
+        self.wallet_locks = WalletLockManager()
+        if shard.count > 1:
+            for addr in self.sugar_daddy_acct.store.addrs():
+                self.wallet_locks.share(addr)
         self.ops = self.read_operations()
 
+    @property
+    def izumi_prov(self):
+        return self.providers.get("izumi")
+
+    @property
+    def zk_sync_prov(self):
+        return self.providers.get("zksync")
+
+    @property
+    def eth_net_prov(self):
+        return self.providers.get("eth_native")
+
+    @property
+    def async_eth_net_prov(self):
+        return self.providers.get("async_eth_native")
+
+    @property
+    def async_izumi_prov(self):
+        return self.providers.get("async_izumi")
+
+    @property
+    def async_zk_sync_prov(self):
+        return self.providers.get("async_zksync", self.concurrency)
+
     def read_operations(self):
         """
         Reads the operations from a file and returns a set of operation IDs.
@@ -57,14 +111,19 @@ class ProviderManager:
         """
         op = self.ops[op_id]
         logger.info(f"Executing operation: {op['name']}")
-        if "generate_wallet" and "swap" in op["name"]:
-            self.generate_wallet_and_swap(op["details"])
-        elif "generate_wallet" in op["name"]:
-            self.generate_wallet(op["details"])
-        elif "swap" in op["name"]:
-            self.swap(op["details"])
-        else:
-            logger.warning(f"Cant find operation: {op['name']}")
+        with rpc_operation(op["name"]):
+            if self.exec_mode == ExecutionMode.ASYNC:
+                asyncio.run(self._exec_op_async_and_close(op))
+            elif "generate_wallet" in op["name"] and "swap" in op["name"]:
+                self.generate_wallet_and_swap(op["details"])
+            elif "generate_wallet" in op["name"]:
+                self.generate_wallet(op["details"])
+            elif "swap" in op["name"]:
+                self.swap(op["details"])
+            elif "refresh_balances" in op["name"]:
+                self.refresh_balances(op["details"])
+            else:
+                logger.warning(f"Cant find operation: {op['name']}")
 
         logger.info(f"Finished executing operation: {op['name']}")
 
@@ -79,24 +138,67 @@ class ProviderManager:
         self.swap(details)
 
     def generate_wallet(self, details: dict):
-        new_addrs_count = details["wallet_count"]
+        """
+        Generates new wallets and funds them from the Sugar Daddy wallet.
+
+        With `bulk_feed` set, all wallets are funded through a single bridge
+        deposit and L2 transfers that are awaited together. In sharded mode every
+        shard creates its share of `wallet_count`.
+
+        Args:
+            details (dict): A dictionary containing the details of the wallet generation.
+        """
+        new_addrs_count = self.shard.share(details["wallet_count"])
         feed_amount = details["feed_amount"]
-        sugar_daddy_acct = self.sugar_daddy_acct.get_eth_accts()[0]
+        sugar_daddy_acct = next(self.sugar_daddy_acct.iter_eth_accts(1))[0]
+
+        if details.get("bulk_feed"):
+            accts = [
+                self.farming_acct_mngr.create_and_save_acct()
+                for _ in range(new_addrs_count)
+            ]
+            with self.wallet_locks.hold(sugar_daddy_acct.address):
+                self.zk_sync_prov.transfer_and_bridge_many(
+                    sugar_daddy_acct,
+                    accts,
+                    Mainnet.ETHEREUM,
+                    Mainnet.ZKSYNC_ERA,
+                    CryptoCurrencies.ETH,
+                    feed_amount,
+                )
+            logger.info(f"Successfully generated {new_addrs_count} new wallets")
+            return
 
         for _ in range(new_addrs_count):
             acct = self.farming_acct_mngr.create_and_save_acct()
 
-            self.zk_sync_prov.transfer_and_bridge(
-                sugar_daddy_acct,
-                acct,
-                Mainnet.ETHEREUM,
-                Mainnet.ZKSYNC_ERA,
-                CryptoCurrencies.ETH,
-                feed_amount,
-            )
+            with self.wallet_locks.hold(sugar_daddy_acct.address, acct.address):
+                self.zk_sync_prov.transfer_and_bridge(
+                    sugar_daddy_acct,
+                    acct,
+                    Mainnet.ETHEREUM,
+                    Mainnet.ZKSYNC_ERA,
+                    CryptoCurrencies.ETH,
+                    feed_amount,
+                )
 
         logger.info(f"Successfully generated {new_addrs_count} new wallets")
 
+    def refresh_balances(self, details: dict):
+        """
+        Refreshes the stored balances of all farming and Sugar Daddy wallets.
+
+        Args:
+            details (dict): A dictionary containing the details of the refresh operation.
+        """
+        acct_mngrs = [self.farming_acct_mngr]
+        # the Sugar Daddy wallets are shared, the first shard refreshes them
+        if self.shard.index == 0:
+            acct_mngrs.append(self.sugar_daddy_acct)
+        for acct_mngr in acct_mngrs:
+            for net in [Mainnet.ETHEREUM, Mainnet.ZKSYNC_ERA]:
+                acct_mngr.refresh_balances(net)
+
     def bridge(self, details: dict):
         """
         Bridges funds between different blockchains.
@@ -108,14 +210,16 @@ class ProviderManager:
         to_blockchain = details["to"]
 
         if from_blockchain == "ETH" and to_blockchain == "ZKSYNC":
-            for acct in self.farming_acct_mngr.get_eth_accts():
-                self.zk_sync_prov.bridge(
-                    acct,
-                    Mainnet.ETHEREUM,
-                    Mainnet.ZKSYNC_ERA,
-                    CryptoCurrencies.ETH,
-                    0.01,
-                )
+            for accts in self.farming_acct_mngr.iter_eth_accts():
+                for acct in accts:
+                    with self.wallet_locks.hold(acct.address):
+                        self.zk_sync_prov.bridge(
+                            acct,
+                            Mainnet.ETHEREUM,
+                            Mainnet.ZKSYNC_ERA,
+                            CryptoCurrencies.ETH,
+                            0.01,
+                        )
 
     def swap(self, details: dict):
         """
@@ -126,14 +230,140 @@ class ProviderManager:
         """
         swap_fraction = details["swap_fraction"]
         balance = 0.01
-        for acct in self.farming_acct_mngr.get_eth_accts():
-            self.izumi_prov.swap(
-                acct,
-                balance * swap_fraction,
-                blockchain=Mainnet.ZKSYNC_ERA,
-                token_chain=[
-                    "0x8C3e3f2983DB650727F3e05B7a7773e4D641537B",
-                    "0xA5900cce51c45Ab9730039943B3863C822342034",
-                ],
-                fee_chain=[2000],
+        for accts in self.farming_acct_mngr.iter_eth_accts():
+            # every chunk is built and signed as one batch
+            with self.wallet_locks.hold(*(acct.address for acct in accts)):
+                results = self.izumi_prov.swap_many(
+                    accts, balance * swap_fraction, SWAP_TOKEN_CHAINS
+                )
+            for addr, res in results.items():
+                if isinstance(res, Exception):
+                    logger.error(f"Swap failed for {addr}: {res}")
+
+    async def _exec_op_async_and_close(self, op: dict):
+        try:
+            await self.exec_op_async(op)
+        finally:
+            # the HTTP sessions are bound to this loop, asyncio.run closes it next
+            await MainnetManager().aclose()
+
+    async def exec_op_async(self, op: dict):
+        """
+        Executes an operation concurrently over all of its wallets.
+
+        Every wallet runs its own steps in order, while up to `concurrency`
+        wallets are in flight at the same time.
+
+        Args:
+            op (dict): The operation to be executed.
+        """
+        details = op["details"]
+        sem = asyncio.Semaphore(details.get("concurrency", self.concurrency))
+        if "generate_wallet" in op["name"]:
+            steps = [self._fund_wallet_async]
+            if "swap" in op["name"]:
+                steps.append(self._swap_wallet_async)
+            accts = [
+                self.farming_acct_mngr.create_and_save_acct()
+                for _ in range(self.shard.share(details["wallet_count"]))
+            ]
+            if details.get("bulk_feed"):
+                accts = await asyncio.to_thread(self._fund_wallets_bulk, accts, details)
+                steps.remove(self._fund_wallet_async)
+        elif "swap" in op["name"]:
+            steps = [self._swap_wallet_async]
+            accts = self.farming_acct_mngr.get_eth_accts()
+        elif "bridge" in op["name"]:
+            steps = [self._bridge_wallet_async]
+            accts = self.farming_acct_mngr.get_eth_accts()
+        elif "refresh_balances" in op["name"]:
+            await asyncio.to_thread(self.refresh_balances, details)
+            return
+        else:
+            logger.warning(f"Cant find operation: {op['name']}")
+            return
+
+        if steps == [self._swap_wallet_async]:
+            # swaps on their own are built and signed as one batch
+            swapped = await self._swap_wallets_bulk(accts, details)
+            results = [swapped[acct.address] for acct in accts]
+        else:
+            if self._swap_wallet_async in steps:
+                # all wallets swap the same amount, so one quote batch serves them all
+                await asyncio.to_thread(
+                    self.izumi_prov.route_finder.prefetch,
+                    [int(0.01 * details["swap_fraction"] * 10**18)],
+                    SWAP_TOKEN_CHAINS,
+                )
+            results = await asyncio.gather(
+                *[self._run_wallet_steps(sem, acct, steps, details) for acct in accts],
+                return_exceptions=True,
             )
+        failed = [
+            (acct.address, res)
+            for acct, res in zip(accts, results)
+            if isinstance(res, Exception)
+        ]
+        for addr, err in failed:
+            logger.error(f"Operation {op['name']} failed for {addr}: {err}")
+        logger.info(
+            f"Processed {len(accts) - len(failed)}/{len(accts)} wallets for {op['name']}"
+        )
+
+    async def _run_wallet_steps(self, sem, acct, steps: list, details: dict):
+        async with sem, self.wallet_locks.hold_async(acct.address):
+            for step in steps:
+                await step(acct, details)
+
+    def _fund_wallets_bulk(self, accts: list, details: dict) -> list:
+        sugar_daddy_acct = next(self.sugar_daddy_acct.iter_eth_accts(1))[0]
+        with self.wallet_locks.hold(sugar_daddy_acct.address):
+            results = self.zk_sync_prov.transfer_and_bridge_many(
+                sugar_daddy_acct,
+                accts,
+                Mainnet.ETHEREUM,
+                Mainnet.ZKSYNC_ERA,
+                CryptoCurrencies.ETH,
+                details["feed_amount"],
+            )
+        return [
+            acct for acct in accts if not isinstance(results[acct.address], Exception)
+        ]
+
+    async def _fund_wallet_async(self, acct, details: dict):
+        sugar_daddy_acct = next(self.sugar_daddy_acct.iter_eth_accts(1))[0]
+        await self.async_zk_sync_prov.transfer_and_bridge(
+            sugar_daddy_acct,
+            acct,
+            Mainnet.ETHEREUM,
+            Mainnet.ZKSYNC_ERA,
+            CryptoCurrencies.ETH,
+            details["feed_amount"],
+        )
+
+    async def _bridge_wallet_async(self, acct, details: dict):
+        await self.async_zk_sync_prov.bridge(
+            acct,
+            Mainnet.ETHEREUM,
+            Mainnet.ZKSYNC_ERA,
+            CryptoCurrencies.ETH,
+            0.01,
+        )
+
+    async def _swap_wallets_bulk(self, accts: list, details: dict) -> dict:
+        async with self.wallet_locks.hold_async(*(acct.address for acct in accts)):
+            return await self.async_izumi_prov.swap_many(
+                accts,
+                0.01 * details["swap_fraction"],
+                SWAP_TOKEN_CHAINS,
+                concurrency=details.get("concurrency", self.concurrency),
+            )
+
+    async def _swap_wallet_async(self, acct, details: dict):
+        balance = 0.01
+        await self.async_izumi_prov.swap(
+            acct,
+            balance * details["swap_fraction"],
+            blockchain=Mainnet.ZKSYNC_ERA,
+            token_chains=SWAP_TOKEN_CHAINS,
+        )
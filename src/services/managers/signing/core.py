@@ -0,0 +1,101 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from zksync2.signer.eth_signer import PrivateKeyEthSigner
+from zksync2.transaction.transaction712 import Transaction712
+
+from utils.logger import logger
+from utils.utils import singleton
+
+
+@lru_cache(maxsize=4096)
+def _get_account(priv_key: bytes) -> LocalAccount:
+    return Account.from_key(priv_key)
+
+
+@lru_cache(maxsize=4096)
+def _get_zk_signer(priv_key: bytes, chain_id: int) -> PrivateKeyEthSigner:
+    return PrivateKeyEthSigner(_get_account(priv_key), chain_id)
+
+
+def _sign(priv_key: bytes, tx) -> bytes:
+    if isinstance(tx, Transaction712):
+        signer = _get_zk_signer(priv_key, tx.chain_id)
+        return tx.encode(signer.sign_typed_data(tx.to_eip712_struct()))
+    # eth_account tells legacy and EIP-1559 transactions apart by their fee fields
+    return bytes(_get_account(priv_key).sign_transaction(tx).rawTransaction)
+
+
+def _sign_chunk(jobs: list[tuple[bytes, dict | Transaction712]]) -> list[bytes]:
+    return [_sign(priv_key, tx) for priv_key, tx in jobs]
+
+
+@singleton
+class SigningService:
+    """
+    Signs legacy, EIP-1559 and zkSync EIP-712 transactions.
+
+    Single transactions are signed on the calling thread. Large batches are
+    split into chunks and signed across a process pool. Accounts and zkSync
+    signers are cached per process, so a wallet's key is only derived once.
+
+    Methods:
+        sign(priv_key, tx): Signs a transaction and returns its raw bytes.
+        sign_many(jobs): Signs a batch of transactions and returns their raw bytes in order.
+    """
+
+    MIN_POOL_BATCH = 64
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self) -> None:
+        self.max_workers = multiprocessing.cpu_count()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def sign(self, priv_key: bytes, tx: dict | Transaction712) -> bytes:
+        """
+        Signs a transaction on the calling thread.
+
+        Args:
+            priv_key (bytes): The private key of the sender.
+            tx (dict | Transaction712): An Ethereum transaction dict or a zkSync EIP-712 transaction.
+
+        Returns:
+            bytes: The raw signed transaction.
+        """
+        return _sign(bytes(priv_key), tx)
+
+    def sign_many(self, jobs: list[tuple[bytes, dict | Transaction712]]) -> list[bytes]:
+        """
+        Signs a batch of transactions, across the process pool if it is large.
+
+        Args:
+            jobs (list[tuple[bytes, dict | Transaction712]]): The (private key, transaction) pairs.
+
+        Returns:
+            list[bytes]: The raw signed transactions in the order of the jobs.
+        """
+        jobs = [(bytes(priv_key), tx) for priv_key, tx in jobs]
+        if len(jobs) < self.MIN_POOL_BATCH or self.max_workers < 2:
+            return _sign_chunk(jobs)
+
+        chunk_size = -(-len(jobs) // (self.max_workers * self.CHUNKS_PER_WORKER))
+        chunks = [jobs[i : i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        signed = []
+        for chunk in self._get_pool().map(_sign_chunk, chunks):
+            signed.extend(chunk)
+        logger.debug(f"Signed {len(jobs)} transactions on {self.max_workers} processes")
+        return signed
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # the worker runs threads, forking it could copy held locks
+                self._pool = ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-import json
+from services.provider.contracts import load_abi
 
 
 class BaseProvider(ABC):
@@ -7,5 +7,4 @@ class BaseProvider(ABC):
         super().__init__()
 
     def _read_abi(self, abi_path):
-        with open(abi_path, "r") as f:
-            return json.load(f)
+        return load_abi(abi_path)
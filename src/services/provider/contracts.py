@@ -0,0 +1,61 @@
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from web3 import Web3
+from web3.contract import AsyncContract, Contract
+
+from services.managers.mainnet.core import MainnetManager
+from utils.enums import Mainnet
+
+_contracts: dict[tuple, Contract | AsyncContract] = {}
+_contracts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_abi(abi_path: str | Path) -> list[dict]:
+    """
+    Parses an ABI file once per process.
+
+    The returned list is shared by all callers and must not be modified.
+
+    Args:
+        abi_path (str | Path): The path of the ABI json file or Hardhat artifact.
+
+    Returns:
+        list[dict]: The parsed ABI.
+    """
+    with open(abi_path, "r") as f:
+        abi = json.load(f)
+    # Hardhat artifacts keep the ABI next to the bytecode
+    return abi["abi"] if isinstance(abi, dict) else abi
+
+
+def get_contract(
+    net: Mainnet, addr: str, abi_path: str | Path, asynchronous: bool = False
+) -> Contract | AsyncContract:
+    """
+    Returns the process-wide contract object of an address on a chain.
+
+    Args:
+        net (Mainnet): The chain the contract is deployed on.
+        addr (str): The address of the contract.
+        abi_path (str | Path): The path of the ABI json file of the contract.
+        asynchronous (bool): Whether to bind the contract to the AsyncWeb3 connection.
+
+    Returns:
+        Contract | AsyncContract: The contract bound to the connection of the chain.
+    """
+    addr = Web3.to_checksum_address(addr)
+    key = (net, addr, str(abi_path), asynchronous)
+    with _contracts_lock:
+        if key not in _contracts:
+            mainnet_mngr = MainnetManager()
+            web3 = (
+                mainnet_mngr.get_async_web3(net)
+                if asynchronous
+                else mainnet_mngr.get_web3(net)
+            )
+            _contracts[key] = web3.eth.contract(address=addr, abi=load_abi(abi_path))
+        return _contracts[key]
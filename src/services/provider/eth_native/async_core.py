@@ -0,0 +1,96 @@
+from services.managers.fees.core import get_fee_oracle
+from services.managers.gas.core import get_gas_limits
+from services.managers.mainnet.core import MainnetManager
+from services.managers.nonce.core import NonceManager
+from services.managers.signing.core import SigningService
+from services.provider.base import BaseProvider
+from services.tracker.receipts import get_receipt_tracker
+from web3 import Web3
+from eth_account.account import LocalAccount
+from eth_typing import HexStr
+
+from utils.enums import CryptoCurrencies, Mainnet
+
+
+class AsyncEthMainnetProvider(BaseProvider):
+    """
+    Async counterpart of EthMainnetProvider built on AsyncWeb3.
+    """
+
+    def __init__(self):
+        self.web3 = MainnetManager().async_eth_web3
+        self.nonce_mngr = NonceManager()
+        self.signing_service = SigningService()
+        self.receipt_tracker = get_receipt_tracker(Mainnet.ETHEREUM)
+        self.fee_oracle = get_fee_oracle(Mainnet.ETHEREUM)
+        self.gas_limits = get_gas_limits(Mainnet.ETHEREUM)
+        super().__init__()
+
+    async def transfer(
+        self,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        amount: float,
+        crypto: CryptoCurrencies,
+    ):
+        """
+        Transfers a specified amount of cryptocurrency from one account to another.
+
+        Args:
+          from_acct (LocalAccount): The account from which the cryptocurrency will be transferred.
+          to_acct (LocalAccount): The account to which the cryptocurrency will be transferred.
+          amount (float): The amount of cryptocurrency to transfer.
+          crypto (CryptoCurrencies): The type of cryptocurrency to transfer.
+
+        Returns:
+          AttributeDict: The receipt of the transfer.
+        """
+        tx_hash = await self.send_transfer(from_acct, to_acct, amount, crypto)
+        receipt = await self.receipt_tracker.wait_async(tx_hash, timeout=900)
+
+        return receipt
+
+    async def send_transfer(
+        self,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        amount: float,
+        crypto: CryptoCurrencies,
+    ) -> HexStr:
+        """
+        Signs and sends a transfer without waiting for it to be mined.
+
+        Args:
+          from_acct (LocalAccount): The account from which the cryptocurrency will be transferred.
+          to_acct (LocalAccount): The account to which the cryptocurrency will be transferred.
+          amount (float): The amount of cryptocurrency to transfer.
+          crypto (CryptoCurrencies): The type of cryptocurrency to transfer.
+
+        Returns:
+          HexStr: The transaction hash of the transfer.
+        """
+        if crypto != CryptoCurrencies.ETH:
+            raise NotImplementedError("Only ETH is supported yet ")
+
+        async with self.nonce_mngr.use_nonce_async(
+            Mainnet.ETHEREUM, from_acct.address
+        ) as nonce:
+            # Build the transaction
+            tx = {
+                "chainId": 5,
+                "to": Web3.to_checksum_address(to_acct.address),
+                "value": Web3.to_wei(amount, "ether"),
+                "nonce": nonce,
+                **await self.fee_oracle.get_fees_async(),
+            }
+
+            tx["gas"] = await self.gas_limits.gas_limit_async(
+                {**tx, "from": from_acct.address}
+            )
+
+            # Sign the transaction
+            raw_tx = self.signing_service.sign(from_acct.key, tx)
+
+            tx_hash = await self.web3.eth.send_raw_transaction(raw_tx)
+            self.gas_limits.learn(tx_hash, tx)
+            return tx_hash
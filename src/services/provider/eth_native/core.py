@@ -1,9 +1,15 @@
+from services.managers.fees.core import get_fee_oracle
+from services.managers.gas.core import get_gas_limits
 from services.managers.mainnet.core import MainnetManager
+from services.managers.nonce.core import NonceManager
+from services.managers.signing.core import SigningService
 from services.provider.base import BaseProvider
+from services.tracker.receipts import get_receipt_tracker
 from web3 import Web3
 from eth_account.account import LocalAccount
+from eth_typing import HexStr
 
-from utils.enums import CryptoCurrencies
+from utils.enums import CryptoCurrencies, Mainnet
 
 
 class EthMainnetProvider(BaseProvider):
@@ -13,6 +19,11 @@ class EthMainnetProvider(BaseProvider):
 
     def __init__(self):
         self.web3 = MainnetManager().eth_web3
+        self.nonce_mngr = NonceManager()
+        self.signing_service = SigningService()
+        self.receipt_tracker = get_receipt_tracker(Mainnet.ETHEREUM)
+        self.fee_oracle = get_fee_oracle(Mainnet.ETHEREUM)
+        self.gas_limits = get_gas_limits(Mainnet.ETHEREUM)
         super().__init__()
 
     def transfer(
@@ -32,7 +43,31 @@ class EthMainnetProvider(BaseProvider):
           crypto (CryptoCurrencies): The type of cryptocurrency to transfer.
 
         Returns:
-          str: The transaction hash of the transfer.
+          AttributeDict: The receipt of the transfer.
+        """
+        tx_hash = self.send_transfer(from_acct, to_acct, amount, crypto)
+        receipt = self.receipt_tracker.wait(tx_hash, timeout=900)
+
+        return receipt
+
+    def send_transfer(
+        self,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        amount: float,
+        crypto: CryptoCurrencies,
+    ) -> HexStr:
+        """
+        Signs and sends a transfer without waiting for it to be mined.
+
+        Args:
+          from_acct (LocalAccount): The account from which the cryptocurrency will be transferred.
+          to_acct (LocalAccount): The account to which the cryptocurrency will be transferred.
+          amount (float): The amount of cryptocurrency to transfer.
+          crypto (CryptoCurrencies): The type of cryptocurrency to transfer.
+
+        Returns:
+          HexStr: The transaction hash of the transfer.
         """
         if crypto != CryptoCurrencies.ETH:
             raise NotImplementedError("Only ETH is supported yet ")
@@ -40,22 +75,21 @@ class EthMainnetProvider(BaseProvider):
         # Convert amount to wei
         wei = self.web3.to_wei(amount, "ether")
 
-        # Build the transaction
-        tx = {
-            "chainId": 5,
-            "to": Web3.to_checksum_address(to_acct.address),
-            "value": wei,
-            "gas": 1_500_000,
-            "gasPrice": self.web3.eth.gas_price,
-            "nonce": self.web3.eth.get_transaction_count(from_acct.address),
-        }
+        with self.nonce_mngr.use_nonce(Mainnet.ETHEREUM, from_acct.address) as nonce:
+            # Build the transaction
+            tx = {
+                "chainId": 5,
+                "to": Web3.to_checksum_address(to_acct.address),
+                "value": wei,
+                "nonce": nonce,
+                **self.fee_oracle.get_fees(),
+            }
 
-        # Sign the transaction
-        signed_tx = from_acct.sign_transaction(tx)
+            tx["gas"] = self.gas_limits.gas_limit({**tx, "from": from_acct.address})
 
-        tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        receipt = self.web3.eth.wait_for_transaction_receipt(
-            tx_hash, timeout=900, poll_latency=10
-        )
+            # Sign the transaction
+            raw_tx = self.signing_service.sign(from_acct.key, tx)
 
-        return receipt
+            tx_hash = self.web3.eth.send_raw_transaction(raw_tx)
+            self.gas_limits.learn(tx_hash, tx)
+            return tx_hash
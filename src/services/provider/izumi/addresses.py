@@ -3,3 +3,4 @@ from enum import Enum
 
 class Addresses(Enum):
     SWAP_ADDR = "0x3040EE148D09e5B92956a64CDC78b49f48C0cDdc"
+    QUOTER_ADDR = "0xE93D1d35a63f7C6b51ef46a27434375761a7Db28"
@@ -0,0 +1,189 @@
+import asyncio
+from services.provider.contracts import get_contract
+from services.provider.izumi.izumi import IzumiProvider
+from web3 import Web3
+from utils.logger import logger
+from eth_account.account import LocalAccount
+from services.provider.izumi.addresses import Addresses
+from utils.constants import IZUMI_SWAP_ABI_PATH
+from utils.enums import Mainnet
+from utils.utils import AsyncSingleFlight
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+
+class AsyncIzumiProvider(IzumiProvider):
+    """
+    Async counterpart of IzumiProvider built on AsyncWeb3.
+
+    Encoding and signing are pure and reused from IzumiProvider, every network
+    call goes through the AsyncWeb3 connection of the MainnetManager.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.async_zk_web3 = self.mainnet_mngr.async_zk_web3
+        self.async_swap_contract = get_contract(
+            Mainnet.ZKSYNC_ERA,
+            Addresses.SWAP_ADDR.value,
+            IZUMI_SWAP_ABI_PATH,
+            asynchronous=True,
+        )
+        self._chain_id_call = AsyncSingleFlight()
+
+    async def swap(
+        self,
+        acct: LocalAccount,
+        amount: float,
+        blockchain: "zksync",
+        token_chains: list[list[str]],
+    ):
+        """Swap on the ZKSync network
+
+        Args:
+            acct (LocalAccount): The account to swap with
+            amount (float): The amount of ETH to swap
+            token_chains (list[list[str]]): The candidate token chains to swap over
+        """
+        tx = await self.send_swap(acct, amount, blockchain, token_chains)
+
+        tx_receipt = await self.receipt_tracker.wait_async(tx, timeout=5000)
+        logger.info("Successfully swapped ETH to IZI")
+        return tx_receipt
+
+    async def send_swap(
+        self,
+        acct: LocalAccount,
+        amount: float,
+        blockchain: "zksync",
+        token_chains: list[list[str]],
+    ) -> HexBytes:
+        """Sign and send a swap without waiting for it to be mined
+
+        Args:
+            acct (LocalAccount): The account to swap with
+            amount (float): The amount of ETH to swap
+            token_chains (list[list[str]]): The candidate token chains to swap over
+
+        Returns:
+            HexBytes: The hash of the swap transaction
+        """
+        logger.info(
+            f"Swapping with {amount} ETH to IZI over Izumi Finance. Address: {acct.address}"
+        )
+        route = await asyncio.to_thread(
+            self.route_finder.best_route, int(amount * (10**18)), token_chains
+        )
+
+        checksum_addr = Web3.to_checksum_address(acct.address)
+        async with self.nonce_mngr.use_nonce_async(
+            Mainnet.ZKSYNC_ERA, checksum_addr
+        ) as nonce:
+            tx = self._build_swap_tx(
+                acct,
+                amount,
+                route,
+                nonce,
+                await self.get_chain_id_async(),
+                await self.fee_oracle.get_fees_async(),
+            )
+            tx["gas"] = await self.gas_limits.gas_limit_async(tx)
+            raw_tx = self.sign_tx(tx, acct.key)
+            # send the transaction
+            tx_hash = await self.async_zk_web3.eth.send_raw_transaction(raw_tx)
+            self.gas_limits.learn(tx_hash, tx)
+        self._track_swap(tx_hash, route)
+        return tx_hash
+
+    async def swap_many(
+        self,
+        accts: list[LocalAccount],
+        amount: float,
+        token_chains: list[list[str]],
+        concurrency: int = 20,
+    ) -> dict[str, AttributeDict | Exception]:
+        """Swap the same amount from many accounts, signing all swaps as one batch
+
+        Async counterpart of IzumiProvider.swap_many, building and sending up to
+        `concurrency` swaps at once. The batch is signed on a thread, so the
+        event loop keeps running while the process pool signs.
+
+        Args:
+            accts (list[LocalAccount]): The accounts to swap with
+            amount (float): The amount of ETH every account swaps
+            token_chains (list[list[str]]): The candidate token chains to swap over
+            concurrency (int): The maximum number of swaps built or sent at once
+
+        Returns:
+            dict[str, AttributeDict | Exception]: The receipt or the error per address
+        """
+        logger.info(
+            f"Swapping with {amount} ETH to IZI over Izumi Finance from {len(accts)} wallets"
+        )
+        route = await asyncio.to_thread(
+            self.route_finder.best_route,
+            int(amount * (10**18)),
+            token_chains,
+            count=len(accts),
+        )
+        chain_id = await self.get_chain_id_async()
+        fees = await self.fee_oracle.get_fees_async()
+        sem = asyncio.Semaphore(concurrency)
+
+        async def build(acct: LocalAccount) -> dict:
+            async with sem:
+                nonce = await self.nonce_mngr.next_nonce_async(
+                    Mainnet.ZKSYNC_ERA, acct.address
+                )
+                tx = self._build_swap_tx(acct, amount, route, nonce, chain_id, fees)
+                tx["gas"] = await self.gas_limits.gas_limit_async(tx)
+                return tx
+
+        async def send(tx: dict, raw_tx: bytes) -> AttributeDict:
+            async with sem:
+                tx_hash = await self.async_zk_web3.eth.send_raw_transaction(raw_tx)
+            self.gas_limits.learn(tx_hash, tx)
+            return await asyncio.wrap_future(self._track_swap(tx_hash, route))
+
+        results = {}
+        built = []
+        for acct, tx in zip(
+            accts,
+            await asyncio.gather(*map(build, accts), return_exceptions=True),
+        ):
+            if isinstance(tx, Exception):
+                results[acct.address] = self._swap_failed(acct, tx)
+            else:
+                built.append((acct, tx))
+
+        try:
+            raw_txs = await asyncio.to_thread(
+                self.signing_service.sign_many, [(acct.key, tx) for acct, tx in built]
+            )
+        except Exception as e:
+            for acct, _ in built:
+                results[acct.address] = self._swap_failed(acct, e)
+            return results
+
+        receipts = await asyncio.gather(
+            *[send(tx, raw_tx) for (_, tx), raw_tx in zip(built, raw_txs)],
+            return_exceptions=True,
+        )
+        for (acct, _), receipt in zip(built, receipts):
+            if isinstance(receipt, Exception):
+                receipt = self._swap_failed(acct, receipt)
+            results[acct.address] = receipt
+        return results
+
+    async def get_chain_id_async(self) -> int:
+        """Get the chain id of the ZKSync network, fetched once per provider
+
+        Returns:
+            int: The chain id
+        """
+        if self.chain_id is None:
+            # concurrent swaps wait for the first lookup
+            self.chain_id = await self._chain_id_call.run(
+                None, lambda: self.async_zk_web3.eth.chain_id
+            )
+        return self.chain_id
@@ -0,0 +1,64 @@
+from functools import lru_cache
+
+from eth_abi.abi import encode
+from eth_utils import function_signature_to_4byte_selector
+from hexbytes import HexBytes
+
+SWAP_AMOUNT_SELECTOR = function_signature_to_4byte_selector(
+    "swapAmount((bytes,address,uint128,uint256,uint256))"
+)
+REFUND_ETH_SELECTOR = function_signature_to_4byte_selector("refundETH()")
+MULTICALL_SELECTOR = function_signature_to_4byte_selector("multicall(bytes[])")
+
+WORD = 32
+# multicall(bytes[]): selector, array offset, length, 2 element offsets, 1st length
+SWAP_CALL_START = 4 + 5 * WORD
+# swapAmount(params): selector, tuple offset, path offset, then the static fields
+RECIPIENT_POS = SWAP_CALL_START + 4 + 2 * WORD
+AMOUNT_POS = RECIPIENT_POS + WORD
+MIN_ACQUIRED_POS = AMOUNT_POS + WORD
+DEADLINE_POS = MIN_ACQUIRED_POS + WORD
+MAX_UINT128 = 2**128 - 1
+
+
+@lru_cache(maxsize=256)
+def _swap_template(path: str) -> bytes:
+    path_bytes = bytes(HexBytes(path))
+    swap_data = SWAP_AMOUNT_SELECTOR + encode(
+        ["(bytes,address,uint128,uint256,uint256)"],
+        [(path_bytes, "0x" + "00" * 20, 0, 0, 0)],
+    )
+    template = MULTICALL_SELECTOR + encode(
+        ["bytes[]"], [[swap_data, REFUND_ETH_SELECTOR]]
+    )
+    assert template[SWAP_CALL_START : SWAP_CALL_START + len(swap_data)] == swap_data
+    return template
+
+
+def encode_swap_multicall(
+    path: str, recipient: str, amount: int, min_acquired: int, deadline: int
+) -> HexBytes:
+    """Encode the multicall of swapAmount and refundETH of an Izumi swap
+
+    The calldata of every path is encoded once, afterwards only the recipient,
+    amount, minimal output and deadline words are patched in.
+
+    Args:
+        path (str): The encoded token chain path
+        recipient (str): The address receiving the swapped tokens
+        amount (int): The amount to swap in wei
+        min_acquired (int): The minimal output of the swap
+        deadline (int): The unix time after which the swap reverts
+
+    Returns:
+        HexBytes: The calldata of the multicall
+    """
+    if not 0 <= amount <= MAX_UINT128:
+        raise ValueError(f"Swap amount {amount} does not fit into uint128")
+
+    calldata = bytearray(_swap_template(path))
+    calldata[RECIPIENT_POS + 12 : AMOUNT_POS] = HexBytes(recipient)
+    calldata[AMOUNT_POS:MIN_ACQUIRED_POS] = amount.to_bytes(WORD, "big")
+    calldata[MIN_ACQUIRED_POS:DEADLINE_POS] = min_acquired.to_bytes(WORD, "big")
+    calldata[DEADLINE_POS : DEADLINE_POS + WORD] = deadline.to_bytes(WORD, "big")
+    return HexBytes(calldata)
@@ -1,178 +1,244 @@
-from decimal import Decimal
-import json
-from math import floor
-from services.managers.account.ers import ErsAccountManager
+from concurrent.futures import Future
 import time
+from services.managers.fees.core import get_fee_oracle
+from services.managers.gas.core import get_gas_limits
 from services.managers.mainnet.core import MainnetManager
+from services.managers.nonce.core import NonceManager
+from services.managers.signing.core import SigningService
 from services.provider.base import BaseProvider
+from services.provider.contracts import get_contract
+from services.tracker.receipts import get_receipt_tracker
 from web3 import Web3
 from utils.logger import logger
 from utils.constants import ERC_TOKEN_ABI_PATH, IZUMI_SWAP_ABI_PATH
-from utils.enums import CryptoCurrencies
+from utils.enums import Mainnet
 from eth_account.account import LocalAccount
 from services.provider.izumi.addresses import Addresses
-from web3.contract import Contract
-from eth_abi.abi import encode
+from services.provider.izumi.calldata import encode_swap_multicall
+from services.provider.izumi.routes import get_route_finder
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
 
 
 class IzumiProvider(BaseProvider):
     def __init__(self):
         super().__init__()
         self.mainnet_mngr = MainnetManager()
+        self.nonce_mngr = NonceManager()
+        self.signing_service = SigningService()
+        self.receipt_tracker = get_receipt_tracker(Mainnet.ZKSYNC_ERA)
+        self.fee_oracle = get_fee_oracle(Mainnet.ZKSYNC_ERA)
+        self.gas_limits = get_gas_limits(Mainnet.ZKSYNC_ERA)
+        self.route_finder = get_route_finder()
         self.swap_abi = self._read_abi(IZUMI_SWAP_ABI_PATH)
         self.erc_token_abi = self._read_abi(ERC_TOKEN_ABI_PATH)
         self.zk_web3 = self.mainnet_mngr.zk_web3
+        self.chain_id = None
 
-        self.swap_contract = self.get_contr(Addresses.SWAP_ADDR.value, self.swap_abi)
+        self.swap_contract = get_contract(
+            Mainnet.ZKSYNC_ERA, Addresses.SWAP_ADDR.value, IZUMI_SWAP_ABI_PATH
+        )
 
     def swap(
         self,
         acct: LocalAccount,
         amount: float,
         blockchain: "zksync",
-        token_chain: list[str],
-        fee_chain: list[int],
+        token_chains: list[list[str]],
     ):
         """Swap on the ZKSync network
 
         Args:
             acct (LocalAccount): The account to swap with
             amount (float): The amount of ETH to swap
-            token_chain (list[str]): The token chain to swap
-            fee_chain (list[int]): The fee chain to swap
+            token_chains (list[list[str]]): The candidate token chains to swap over
         """
-        logger.info(
-            f"Swapping with {amount} ETH to IZI over Izumi Finance. Address: {acct.address}"
-        )
-        # set the vals for the swap
-        min_ecq = 0
-        deadline = int(time.time()) + 10000
-        decimal_amount = int(amount * (10**18))
+        tx = self.send_swap(acct, amount, blockchain, token_chains)
 
-        gas_price = self.zk_web3.eth.gas_price
-        self.zk_web3.eth.default_account = acct.address
-        checksum_addr = Web3.to_checksum_address(acct.address)
-        nonce = self.zk_web3.eth.get_transaction_count(checksum_addr)
-        path = self._get_token_chain_path(token_chain, fee_chain)
-        tx_params = {
-            "from": checksum_addr,
-            "nonce": nonce,
-            "gas": gas_price,
-            "value": Web3.to_wei(amount, "ether"),
-            "maxPriorityFeePerGas": Web3.to_wei(0.25, "gwei"),
-            "maxFeePerGas": Web3.to_wei(0.25, "gwei"),
-        }
-
-        # init the function calls
-        swap_cll = self.swap_contract.functions.swapAmount(
-            (path, checksum_addr, decimal_amount, min_ecq, deadline)
-        )
-
-        refund_eth_cll = self.swap_contract.functions.refundETH()
-        # encode the function calls to bytes[]
-        encoded_clls = [self.encode_func_cll(x) for x in [swap_cll, refund_eth_cll]]
-        # build the transaction
-        multi_cll = self.swap_contract.functions.multicall(encoded_clls)
-        signed_tx = self.build_and_sign_tx(multi_cll, tx_params, acct.key)
-        # send the transaction
-        tx = self.zk_web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-
-        tx_receipt = self.zk_web3.eth.wait_for_transaction_receipt(
-            tx,
-            timeout=5000,
-        )
-        logger.info(f"Successfully swapped ETH to IZI")
+        tx_receipt = self.receipt_tracker.wait(tx, timeout=5000)
+        logger.info("Successfully swapped ETH to IZI")
+        return tx_receipt
 
-    def build_and_sign_tx(self, cll, tx_params: dict, priv_key: str) -> dict:
-        """Build and sign a transaction
+    def send_swap(
+        self,
+        acct: LocalAccount,
+        amount: float,
+        blockchain: "zksync",
+        token_chains: list[list[str]],
+    ) -> HexBytes:
+        """Sign and send a swap without waiting for it to be mined
 
         Args:
-            tx_params (dict): The parameters for the transaction
-            priv_key (str): The private key to sign with
+            acct (LocalAccount): The account to swap with
+            amount (float): The amount of ETH to swap
+            token_chains (list[list[str]]): The candidate token chains to swap over
 
         Returns:
-            dict: The signed transaction
+            HexBytes: The hash of the swap transaction
         """
-        tx = self.build_tx(cll, tx_params)
-        return self.sign_tx(tx, priv_key)
-
-    def sign_tx(self, tx: dict, priv_key: str) -> dict:
-        """Sign a transaction
-
-        Args:
-            tx (dict): The transaction to sign
-            priv_key (str): The private key to sign with
+        logger.info(
+            f"Swapping with {amount} ETH to IZI over Izumi Finance. Address: {acct.address}"
+        )
+        route = self.route_finder.best_route(int(amount * (10**18)), token_chains)
 
-        Returns:
-            dict: The signed transaction
-        """
-        return self.zk_web3.eth.account.sign_transaction(tx, priv_key)
+        checksum_addr = Web3.to_checksum_address(acct.address)
+        with self.nonce_mngr.use_nonce(Mainnet.ZKSYNC_ERA, checksum_addr) as nonce:
+            tx = self._build_swap_tx(
+                acct,
+                amount,
+                route,
+                nonce,
+                self.get_chain_id(),
+                self.fee_oracle.get_fees(),
+            )
+            tx["gas"] = self.gas_limits.gas_limit(tx)
+            raw_tx = self.sign_tx(tx, acct.key)
+            # send the transaction
+            tx_hash = self.zk_web3.eth.send_raw_transaction(raw_tx)
+            self.gas_limits.learn(tx_hash, tx)
+        self._track_swap(tx_hash, route)
+        return tx_hash
+
+    def swap_many(
+        self,
+        accts: list[LocalAccount],
+        amount: float,
+        token_chains: list[list[str]],
+    ) -> dict[str, AttributeDict | Exception]:
+        """Swap the same amount from many accounts, signing all swaps as one batch
 
-    def build_tx(self, cll, tx_params: dict) -> dict:
-        """Build a transaction
+        The swaps are built first and signed together by the signing service,
+        which spreads large batches over its process pool. They are then sent
+        back to back and awaited together. A failed swap resets the nonce of its
+        wallet and is returned as its result, the other wallets go on.
 
         Args:
-            tx_params (dict): The parameters for the transaction
+            accts (list[LocalAccount]): The accounts to swap with
+            amount (float): The amount of ETH every account swaps
+            token_chains (list[list[str]]): The candidate token chains to swap over
 
         Returns:
-            dict: The built transaction
+            dict[str, AttributeDict | Exception]: The receipt or the error per address
         """
-        if "gas" not in tx_params or tx_params["gas"] == 0:
-            tx_params["gas"] = self.est_gas(cll, tx_params)
-        tx_params["gas"] = 1_500_000
-        return cll.build_transaction(tx_params)
-
-    def est_gas(self, cll, tx_params: dict) -> int:
-        """Estimate the gas for a transaction
+        logger.info(
+            f"Swapping with {amount} ETH to IZI over Izumi Finance from {len(accts)} wallets"
+        )
+        route = self.route_finder.best_route(
+            int(amount * (10**18)), token_chains, count=len(accts)
+        )
+        chain_id = self.get_chain_id()
+        fees = self.fee_oracle.get_fees()
+
+        results = {}
+        built = []
+        for acct in accts:
+            try:
+                nonce = self.nonce_mngr.next_nonce(Mainnet.ZKSYNC_ERA, acct.address)
+                tx = self._build_swap_tx(acct, amount, route, nonce, chain_id, fees)
+                # the swaps share one shape, only the first one is estimated
+                tx["gas"] = self.gas_limits.gas_limit(tx)
+                built.append((acct, tx))
+            except Exception as e:
+                results[acct.address] = self._swap_failed(acct, e)
+
+        try:
+            raw_txs = self.signing_service.sign_many(
+                [(acct.key, tx) for acct, tx in built]
+            )
+        except Exception as e:
+            for acct, _ in built:
+                results[acct.address] = self._swap_failed(acct, e)
+            return results
+
+        pending = {}
+        for (acct, tx), raw_tx in zip(built, raw_txs):
+            try:
+                tx_hash = self.zk_web3.eth.send_raw_transaction(raw_tx)
+                self.gas_limits.learn(tx_hash, tx)
+                pending[acct.address] = self._track_swap(tx_hash, route)
+            except Exception as e:
+                results[acct.address] = self._swap_failed(acct, e)
+
+        for addr, fut in pending.items():
+            try:
+                results[addr] = fut.result()
+            except Exception as e:
+                results[addr] = e
+        return results
+
+    def _build_swap_tx(
+        self,
+        acct: LocalAccount,
+        amount: float,
+        route,
+        nonce: int,
+        chain_id: int,
+        fees: dict[str, int],
+    ) -> dict:
+        """Build an unsigned swap transaction without its gas limit
 
         Args:
-            tx_params (dict): The parameters for the transaction
+            acct (LocalAccount): The account to swap with
+            amount (float): The amount of ETH to swap
+            route (Route): The route picked by the route finder
+            nonce (int): The nonce of the transaction
+            chain_id (int): The chain id of the ZKSync network
+            fees (dict[str, int]): The EIP-1559 fee fields
 
         Returns:
-            int: The estimated gas
+            dict: The transaction
         """
-        tx = cll.build_transaction(tx_params)
-        del tx["data"]
-        return self.zk_web3.eth.estimate_gas(tx)
+        checksum_addr = Web3.to_checksum_address(acct.address)
+        # set the vals for the swap
+        deadline = int(time.time()) + 10000
+        decimal_amount = int(amount * (10**18))
+        return {
+            "from": checksum_addr,
+            "to": self.swap_contract.address,
+            "chainId": chain_id,
+            "nonce": nonce,
+            "value": Web3.to_wei(amount, "ether"),
+            # multicall of swapAmount and refundETH from the precompiled template
+            "data": encode_swap_multicall(
+                route.path, checksum_addr, decimal_amount, route.min_out, deadline
+            ),
+            **fees,
+        }
 
-    def get_contr(self, addr: str, abi: list[dict]) -> Contract:
-        """Get a contract from the address and abi
+    def _track_swap(self, tx_hash: HexBytes, route) -> Future:
+        # a landed swap moved the pool price, the next swaps over it quote afresh
+        return self.receipt_tracker.track(
+            tx_hash,
+            timeout=5000,
+            callback=lambda _: self.route_finder.forget(route.path),
+        )
 
-        Args:
-            addr (str): The address of the contract
-            abi (list[dict]): The abi of the contract
+    def _swap_failed(self, acct: LocalAccount, err: Exception) -> Exception:
+        # the nonce may be allocated without a sent transaction, sync it again
+        self.nonce_mngr.reset(Mainnet.ZKSYNC_ERA, acct.address)
+        return err
+
+    def get_chain_id(self) -> int:
+        """Get the chain id of the ZKSync network, fetched once per provider
 
         Returns:
-            Contract: The contract
+            int: The chain id
         """
+        if self.chain_id is None:
+            self.chain_id = self.zk_web3.eth.chain_id
+        return self.chain_id
 
-        return self.zk_web3.eth.contract(address=addr, abi=abi)
-
-    def _get_token_chain_path(
-        self, token_chain: list[str], fee_chain: list[int]
-    ) -> str:
-        """Get the token chain path for the swap
+    def sign_tx(self, tx: dict, priv_key: str) -> bytes:
+        """Sign a transaction
 
         Args:
-            token_chain (list[str]): The token chain to swap
-            fee_chain (list[int]): The fee chain to swap
+            tx (dict): The transaction to sign
+            priv_key (str): The private key to sign with
 
         Returns:
-            str: The token chain path
+            bytes: The raw signed transaction
         """
-        hex_out = token_chain[0]
-        for i, fee in enumerate(fee_chain):
-            hex_out += hex(fee)[2:].zfill(6)
-            hex_out += token_chain[i + 1][2:]
-
-        return hex_out
-
-    def encode_func_cll(self, call):
-        """Encode a function call to be used in a transaction
-
-        Args:
-            call (ContractFunction): The function to encode"""
-        return self.swap_contract.encodeABI(fn_name=call.fn_name, args=call.args)
+        return self.signing_service.sign(priv_key, tx)
 
     def _get_token_contr(self, addr: str) -> dict:
         """Get the token contract for a given address
@@ -183,4 +249,4 @@ class IzumiProvider(BaseProvider):
         Returns:
             dict: The token contract
         """
-        return self.zk_web3.eth.contract(address=addr, abi=self.erc_token_abi)
+        return get_contract(Mainnet.ZKSYNC_ERA, addr, ERC_TOKEN_ABI_PATH)
@@ -0,0 +1,222 @@
+import itertools
+import threading
+import time
+from typing import NamedTuple
+
+from eth_abi.abi import decode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from services.managers.mainnet.batch import batch_request
+from services.managers.mainnet.core import MainnetManager
+from services.provider.contracts import load_abi
+from services.provider.izumi.addresses import Addresses
+from utils.constants import IZUMI_QUOTER_ABI_PATH
+from utils.logger import logger
+
+
+class Route(NamedTuple):
+    token_chain: list[str]
+    fee_chain: list[int]
+    path: str
+    expected_out: int
+    min_out: int
+
+
+def encode_path(token_chain: list[str], fee_chain: list[int]) -> str:
+    """Encode a token chain and its fee tiers into an Izumi swap path
+
+    Args:
+        token_chain (list[str]): The token chain to swap
+        fee_chain (list[int]): The fee tier of every hop
+
+    Returns:
+        str: The token chain path
+    """
+    hex_out = token_chain[0]
+    for i, fee in enumerate(fee_chain):
+        hex_out += hex(fee)[2:].zfill(6)
+        hex_out += token_chain[i + 1][2:]
+
+    return hex_out
+
+
+class RouteFinder:
+    """
+    Picks the best Izumi swap path by quoting every candidate on the Quoter.
+
+    Every token chain is tried with every combination of fee tiers. Quotes are
+    fetched for the exact amount, all missing ones in a single JSON-RPC batch,
+    and cached for a short TTL, so swaps of the same size from many wallets
+    share one quote round-trip. The quotes of a path are dropped once one of
+    our swaps over it lands, since it moved the pool price.
+
+    Args:
+        web3 (Web3): The connection to the ZKSync network.
+        quoter_addr (str): The address of the Izumi Quoter.
+        quoter_abi (list[dict]): The abi of the Izumi Quoter.
+
+    Methods:
+        best_route(amount, token_chains, slippage, count): Returns the route with the highest output.
+        prefetch(amounts, token_chains): Quotes all candidates of the amounts in one batch.
+        forget(path): Drops the cached quotes of a path.
+    """
+
+    QUOTE_TTL = 10.0
+    FEE_TIERS = [400, 2000, 10000]
+    SLIPPAGE = 0.005
+
+    def __init__(self, web3: Web3, quoter_addr: str, quoter_abi: list[dict]):
+        self.web3 = web3
+        self.quoter = web3.eth.contract(address=quoter_addr, abi=quoter_abi)
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._quotes: dict[tuple[str, int], tuple[float, int | None]] = {}
+
+    def best_route(
+        self,
+        amount: int,
+        token_chains: list[list[str]],
+        slippage: float = None,
+        count: int = 1,
+    ) -> Route:
+        """
+        Returns the candidate route with the highest quoted output.
+
+        When `count` swaps of the amount are sent before any of them lands, the
+        last one only gets what is left after the others moved the price. Its
+        output is the quote of all swaps minus the quote of all but one, both
+        fetched in the same batch, and every swap of the batch accepts it.
+
+        Args:
+            amount (int): The amount to swap in wei.
+            token_chains (list[list[str]]): The candidate token chains.
+            slippage (float): The tolerated share of the output to lose.
+            count (int): The number of swaps of the amount sent at once.
+
+        Returns:
+            Route: The best route and the minimal output to accept.
+        """
+        slippage = self.SLIPPAGE if slippage is None else slippage
+        total, before = amount * count, amount * (count - 1)
+        self.prefetch([total, before] if before else [total], token_chains)
+
+        best = None
+        for token_chain, fee_chain in self._candidates(token_chains):
+            path = encode_path(token_chain, fee_chain)
+            acquire = self._get_quote(path, total)
+            if acquire and before:
+                # a path that cannot quote the earlier swaps is skipped
+                acquire -= self._get_quote(path, before) or acquire
+            if acquire and (best is None or acquire > best[2]):
+                best = (token_chain, fee_chain, acquire)
+        if best is None:
+            raise RuntimeError(f"No Izumi pool quoted a swap of {amount} wei")
+
+        token_chain, fee_chain, expected_out = best
+        logger.debug(f"Best Izumi route {token_chain} over fees {fee_chain}")
+        return Route(
+            token_chain,
+            list(fee_chain),
+            encode_path(token_chain, fee_chain),
+            expected_out,
+            int(expected_out * (1 - slippage)),
+        )
+
+    def prefetch(self, amounts: list[int], token_chains: list[list[str]]) -> None:
+        """
+        Quotes all candidate routes of the amounts that are not cached yet.
+
+        Args:
+            amounts (list[int]): The amounts to swap in wei.
+            token_chains (list[list[str]]): The candidate token chains.
+        """
+        with self._fetch_lock:
+            now = time.monotonic()
+            missing = {
+                (encode_path(token_chain, fee_chain), amount)
+                for amount in amounts
+                for token_chain, fee_chain in self._candidates(token_chains)
+            }
+            with self._lock:
+                missing = [
+                    key
+                    for key in missing
+                    if key not in self._quotes or self._quotes[key][0] <= now
+                ]
+            if not missing:
+                return
+
+            calls = [
+                (
+                    "eth_call",
+                    [
+                        {
+                            "to": self.quoter.address,
+                            "data": self.quoter.encodeABI(
+                                fn_name="swapAmount", args=[amount, path]
+                            ),
+                        },
+                        "latest",
+                    ],
+                )
+                for path, amount in missing
+            ]
+            results = batch_request(self.web3, calls)
+            expires_at = time.monotonic() + self.QUOTE_TTL
+            with self._lock:
+                for key, result in zip(missing, results):
+                    self._quotes[key] = (expires_at, self._decode(result))
+            logger.debug(f"Fetched {len(calls)} Izumi quotes in one batch")
+
+    def forget(self, path: str) -> None:
+        """
+        Drops the cached quotes of a path.
+
+        Args:
+            path (str): The encoded path one of our swaps went over.
+        """
+        with self._lock:
+            for key in [key for key in self._quotes if key[0] == path]:
+                del self._quotes[key]
+
+    def _get_quote(self, path: str, amount: int) -> int | None:
+        with self._lock:
+            entry = self._quotes.get((path, amount))
+        return entry[1] if entry else None
+
+    def _candidates(self, token_chains: list[list[str]]):
+        for token_chain in token_chains:
+            for fee_chain in itertools.product(
+                self.FEE_TIERS, repeat=len(token_chain) - 1
+            ):
+                yield token_chain, fee_chain
+
+    @staticmethod
+    def _decode(result: str | None) -> int | None:
+        # missing pools revert, the batch reports them as failed calls
+        if not result or result == "0x":
+            return None
+        return decode(["uint256", "int24[]"], HexBytes(result))[0]
+
+
+_route_finder: RouteFinder | None = None
+_route_finder_lock = threading.Lock()
+
+
+def get_route_finder() -> RouteFinder:
+    """
+    Returns the process-wide RouteFinder of the ZKSync network.
+
+    Returns:
+        RouteFinder: The route finder shared by all Izumi providers.
+    """
+    global _route_finder
+    with _route_finder_lock:
+        if _route_finder is None:
+            _route_finder = RouteFinder(
+                MainnetManager().zk_web3,
+                Addresses.QUOTER_ADDR.value,
+                load_abi(IZUMI_QUOTER_ABI_PATH),
+            )
+        return _route_finder
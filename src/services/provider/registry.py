@@ -0,0 +1,48 @@
+import importlib
+import threading
+
+from utils.utils import singleton
+
+
+@singleton
+class ProviderRegistry:
+    """
+    Creates every provider on first use and shares it across the process.
+
+    Provider modules are only imported when the provider is first requested,
+    so pipelines never pay for providers they do not touch.
+
+    Methods:
+        get(name, *args): Returns the provider registered under the name.
+    """
+
+    PROVIDERS = {
+        "eth_native": "services.provider.eth_native.core.EthMainnetProvider",
+        "async_eth_native": "services.provider.eth_native.async_core.AsyncEthMainnetProvider",
+        "izumi": "services.provider.izumi.izumi.IzumiProvider",
+        "async_izumi": "services.provider.izumi.async_izumi.AsyncIzumiProvider",
+        "zksync": "services.provider.zksync.zksync.ZksyncEraProvider",
+        "async_zksync": "services.provider.zksync.async_zksync.AsyncZksyncEraProvider",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def get(self, name: str, *args):
+        """
+        Returns the provider registered under the name, creating it if needed.
+
+        Args:
+            name (str): The name of the provider in PROVIDERS.
+            *args: The arguments to create the provider with on first use.
+
+        Returns:
+            BaseProvider: The shared provider instance.
+        """
+        with self._lock:
+            if name not in self._providers:
+                module_name, cls_name = self.PROVIDERS[name].rsplit(".", 1)
+                module = importlib.import_module(module_name)
+                self._providers[name] = getattr(module, cls_name)(*args)
+            return self._providers[name]
@@ -0,0 +1,266 @@
+import asyncio
+from contextlib import nullcontext
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from services.provider.base import BaseProvider
+from services.provider.zksync.deposits import ResumableDeposit
+from services.tracker.receipts import get_receipt_tracker
+from utils.constants import DEFAULT_CONCURRENCY
+from utils.enums import Mainnet, CryptoCurrencies
+from eth_account.signers.local import LocalAccount
+from zksync2.transaction.transaction_builders import TxFunctionCall
+from eth_utils import to_checksum_address
+from eth_typing import HexStr
+from hexbytes import HexBytes
+from web3 import Web3
+from services.managers.account.locks import WalletLockManager
+from services.managers.fees.core import get_fee_oracle
+from services.managers.gas.core import get_gas_limits
+from services.managers.mainnet.core import MainnetManager
+from services.managers.nonce.core import NonceManager
+from services.managers.signing.core import SigningService
+from utils.logger import logger
+
+
+class AsyncZksyncEraProvider(BaseProvider):
+    """
+    Async counterpart of ZksyncEraProvider built on AsyncWeb3.
+
+    Sending an L1 deposit and the EIP-712 gas estimation of zksync2 run on a
+    thread pool sized to the concurrency limit. The funder's lock only covers
+    allocating the nonce of a deposit and sending it. Its L1 receipt and the
+    long L2 finalization wait are awaited through the receipt trackers, so the
+    deposits of one funder overlap.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Initialize the AsyncZksyncEraProvider.
+
+        Args:
+            concurrency (int): The maximum number of blocking zksync2 calls running at once.
+        """
+        mainnet_mngr = MainnetManager()
+        self.zk_web3 = mainnet_mngr.zk_web3
+        self.eth_web3 = mainnet_mngr.eth_web3
+        self.async_zk_web3 = mainnet_mngr.async_zk_web3
+        self.async_eth_web3 = mainnet_mngr.async_eth_web3
+        self.nonce_mngr = NonceManager()
+        self.signing_service = SigningService()
+        self.wallet_locks = WalletLockManager()
+        self.receipt_tracker = get_receipt_tracker(Mainnet.ZKSYNC_ERA)
+        self.l1_receipt_tracker = get_receipt_tracker(Mainnet.ETHEREUM)
+        self.zk_fee_oracle = get_fee_oracle(Mainnet.ZKSYNC_ERA)
+        self.gas_limits = get_gas_limits(Mainnet.ZKSYNC_ERA)
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="zksync"
+        )
+        super().__init__()
+
+    async def bridge(
+        self,
+        acct: LocalAccount,
+        from_net: Mainnet,
+        to_net: Mainnet,
+        token: CryptoCurrencies,
+        amount: float,
+    ) -> tuple[HexStr, HexStr]:
+        """
+        Bridge ETH from L1 to L2 network.
+
+        Args:
+            acct (LocalAccount): The local account used for signing transactions.
+            from_net (Mainnet): From which network the deposit will be made.
+            to_net (Mainnet): To which network the deposit will be made.
+            token (CryptoCurrencies): Which token will be bridged.
+            amount (float): How much the deposit will contain.
+
+        Returns:
+            tuple[HexStr, HexStr]: Deposit transaction hashes on L1 and L2 networks.
+        """
+        if (
+            from_net == Mainnet.ETHEREUM
+            and to_net == Mainnet.ZKSYNC_ERA
+            and token == CryptoCurrencies.ETH
+        ):
+            return await self._deposit_eth_to_zksync_era(
+                f"bridge:{acct.address}", acct, acct, amount
+            )
+
+    async def transfer(
+        self,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        net: Mainnet,
+        token: CryptoCurrencies,
+        amount: float,
+    ) -> HexStr:
+        """
+        Transfer ETH on the L2 network.
+
+        Args:
+            net (Mainnet): The network to transfer on
+            token (CryptoCurrencies): The token to transfer
+            from_acct (LocalAccount): The account to transfer from
+            to_acct (LocalAccount): The account to transfer to
+            amount (float): The amount to transfer
+
+        Raises:
+            NotImplementedError: If the transfer is not supported
+
+        Returns:
+            HexStr: The transaction hash of the transfer
+        """
+        if net == Mainnet.ZKSYNC_ERA and token == CryptoCurrencies.ETH:
+            return await self._transfer_eth(from_acct, to_acct, amount)
+        else:
+            raise NotImplementedError(
+                "Only transferring ETH on ZKSYNC_ERA is supported"
+            )
+
+    async def transfer_and_bridge(
+        self,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        from_net: Mainnet,
+        to_net: Mainnet,
+        token: CryptoCurrencies,
+        amount: float,
+    ) -> tuple[HexStr, HexStr]:
+        if (
+            from_net == Mainnet.ETHEREUM
+            and to_net == Mainnet.ZKSYNC_ERA
+            and token == CryptoCurrencies.ETH
+        ):
+            logger.info(
+                f"Transferring and bridging ETH from (Mainnet) {from_acct.address} to (Zksync Era) {to_acct.address}"
+            )
+            return await self._deposit_eth_to_zksync_era(
+                f"deposit:{from_acct.address}:{to_acct.address}",
+                from_acct,
+                to_acct,
+                amount,
+            )
+        else:
+            raise NotImplementedError(
+                "Only transferring ETH on ZKSYNC_ERA is supported"
+            )
+
+    async def _transfer_eth(
+        self, from_acct: LocalAccount, to_acc: LocalAccount, amount: float
+    ) -> HexStr:
+        """
+        Transfer ETH to a desired address on zkSync network.
+
+        Args:
+            from_acct (LocalAccount): The account to transfer from
+            to_acc (LocalAccount): The account to transfer to
+            amount (float): The amount of ETH to transfer
+
+        Returns:
+            HexStr: The transaction hash of the transfer
+        """
+        tx_hash = await self._send_eth(from_acct, to_acc, amount)
+        await self.receipt_tracker.wait_async(tx_hash, timeout=10000)
+
+        return tx_hash.hex()
+
+    async def _send_eth(
+        self, from_acct: LocalAccount, to_acc: LocalAccount, amount: float
+    ) -> HexBytes:
+        """
+        Sign and send an ETH transfer on zkSync network without waiting for it.
+
+        Args:
+            from_acct (LocalAccount): The account to transfer from
+            to_acc (LocalAccount): The account to transfer to
+            amount (float): The amount of ETH to transfer
+
+        Returns:
+            HexBytes: The transaction hash of the transfer
+        """
+        chain_id = await self.async_zk_web3.eth.chain_id
+        fees = await self.zk_fee_oracle.get_fees_async()
+
+        async with self.nonce_mngr.use_nonce_async(
+            Mainnet.ZKSYNC_ERA, from_acct.address
+        ) as nonce:
+            tx_func_call = TxFunctionCall(
+                chain_id=chain_id,
+                nonce=nonce,
+                from_=from_acct.address,
+                to=to_checksum_address(to_acc.address),
+                value=Web3.to_wei(amount, "ether"),
+                data=HexStr("0x"),
+                gas_limit=0,  # UNKNOWN AT THIS STATE
+                gas_price=fees["maxFeePerGas"],
+                max_priority_fee_per_gas=fees["maxPriorityFeePerGas"],
+            )
+
+            # zksync2 formats the EIP-712 fields, so estimation stays on the sync client
+            est_gas = await self.gas_limits.gas_limit_async(
+                tx_func_call.tx,
+                estimate=lambda: self._run_blocking(
+                    self.zk_web3.zksync.eth_estimate_gas, tx_func_call.tx
+                ),
+            )
+            tx_712 = tx_func_call.tx712(est_gas)
+            msg = self.signing_service.sign(from_acct.key, tx_712)
+
+            tx_hash = await self.async_zk_web3.eth.send_raw_transaction(msg)
+            self.gas_limits.learn(tx_hash, {"to": tx_712.to, "data": tx_712.data})
+            return tx_hash
+
+    async def _deposit_eth_to_zksync_era(
+        self,
+        key: str,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        amount: float,
+    ) -> tuple[HexStr, HexStr]:
+        """
+        Deposit ETH from an L1 account to an L2 account and wait for the L2 leg.
+
+        Args:
+            key (str): The key of the deposit checkpoints.
+            from_acct (LocalAccount): The L1 account paying for the deposit.
+            to_acct (LocalAccount): The L2 account receiving the deposit.
+            amount (float): How much the deposit will contain.
+
+        Returns:
+            tuple[HexStr, HexStr]: Deposit transaction hashes on L1 and L2 networks.
+        """
+        # a wallet bridging to itself is already held by its pipeline, the locks
+        # are not reentrant
+        funder_lock = nullcontext
+        if from_acct.address != to_acct.address:
+            funder_lock = partial(self.wallet_locks.hold, from_acct.address)
+        deposit = ResumableDeposit(
+            self.zk_web3, self.eth_web3, key, from_acct, to_acct, amount, funder_lock
+        )
+        await self._run_blocking(deposit.send_l1)
+
+        l1_hash = deposit.pending_l1_hash()
+        if l1_hash is not None:
+            deposit.confirm_l1(
+                await self.l1_receipt_tracker.wait_async(
+                    l1_hash, timeout=deposit.L1_MINE_TIMEOUT
+                )
+            )
+        # derives the L2 hash, a resumed deposit also recovers its L1 step here
+        l2_hash = await self._run_blocking(deposit.ensure_l2_hash)
+
+        # Wait for deposit transaction on L2 network to be finalized (5-7 minutes)
+        l2_tx_receipt = await self.receipt_tracker.wait_async(
+            l2_hash, timeout=deposit.l2_timeout()
+        )
+        logger.info(f"Successfully transfered and bridged ETH to {to_acct.address}")
+        return deposit.finish(l2_tx_receipt)
+
+    async def _run_blocking(self, func, *args):
+        # executor threads do not inherit the context, keep the RPC metrics label
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, context.run, func, *args
+        )
@@ -0,0 +1,337 @@
+from contextlib import nullcontext
+from pathlib import Path
+import time
+from typing import Callable, ContextManager
+
+from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract import Contract
+from web3.logs import DISCARD
+from zksync2.core.utils import RecommendedGasLimit
+from zksync2.manage_contracts import contract_abi
+from zksync2.provider.eth_provider import EthereumProvider
+
+from services.managers.fees.core import get_fee_oracle
+from services.managers.nonce.core import NonceManager
+from services.managers.signing.core import SigningService
+from services.provider.contracts import get_contract
+from services.tracker.checkpoints import CheckpointStore
+from services.tracker.receipts import get_receipt_tracker
+from utils.enums import DepositState, Mainnet
+from utils.logger import logger
+
+ZKSYNC_MAIN_ABI_PATH = Path(contract_abi.__file__).with_name("IZkSync.json")
+
+
+def get_main_contract(zk_web3: Web3) -> Contract:
+    """
+    Returns the zkSync main contract on L1, shared by all deposits.
+
+    The address lookup is served by the RPC cache, so only the first call of a
+    process reaches the node.
+
+    Args:
+        zk_web3 (Web3): The connection to the ZKSync network.
+
+    Returns:
+        Contract: The main contract bound to the Ethereum connection.
+    """
+    return get_contract(
+        Mainnet.ETHEREUM, zk_web3.zksync.zks_main_contract(), ZKSYNC_MAIN_ABI_PATH
+    )
+
+
+class ResumableDeposit:
+    """
+    L1 to L2 ETH deposit persisted step by step in the CheckpointStore.
+
+    Steps:
+        L1_SENT: The funder's L1 nonce and block are recorded, the deposit is being sent.
+        L1_MINED: The L1 deposit is mined, its hash is known.
+        L2_HASH_KNOWN: The L2 priority operation hash and the L2 wait deadline are known.
+        L2_FINALIZED: The L2 transaction is finalized.
+
+    The L1 deposit call is built here instead of by zksync2, with its nonce
+    handed out by the NonceManager, so one funder can have several deposits in
+    flight. Its receipt is awaited through the ReceiptTracker of Ethereum like
+    every other provider transaction.
+
+    A deposit interrupted after L1_SENT is only sent again if the funder's L1
+    nonce was not used, not even by a pending transaction, or was used by a
+    transaction that is not this deposit. A pending deposit is waited for up to
+    L1_MINE_TIMEOUT seconds, a mined one is looked up on chain.
+
+    Args:
+        zk_web3 (Web3): The connection to the ZKSync network.
+        eth_web3 (Web3): The connection to the Ethereum network.
+        key (str): The key of the deposit in the CheckpointStore.
+        from_acct (LocalAccount): The L1 account paying for the deposit.
+        to_acct (LocalAccount): The L2 account receiving the deposit.
+        amount (float): How much the deposit will contain.
+        funder_lock (Callable[[], ContextManager]): Returns the lock held while the funder's nonce is allocated and the deposit sent.
+
+    Methods:
+        ensure_l2_hash(): Runs the L1 steps that are not done yet and returns the L2 hash.
+        send_l1(): Sends the L1 deposit unless an earlier run did.
+        pending_l1_hash(): Returns the hash of the L1 deposit sent by send_l1 until it is confirmed.
+        confirm_l1(l1_tx_receipt): Records the mined L1 deposit.
+        l2_timeout(): Returns the seconds left to wait for the L2 transaction.
+        finish(l2_receipt): Records the finalized L2 transaction.
+    """
+
+    L2_TIMEOUT = 360
+    MIN_RESUME_WAIT = 30
+    MAX_RECOVERY_BLOCKS = 1000
+    L1_MINE_TIMEOUT = 600
+    L1_POLL_INTERVAL = 5
+    L1_GAS_LIMIT = RecommendedGasLimit.DEPOSIT.value
+    L2_GAS_LIMIT = RecommendedGasLimit.DEPOSIT.value
+    L2_GAS_PER_PUBDATA = EthereumProvider.DEPOSIT_GAS_PER_PUBDATA_LIMIT
+
+    def __init__(
+        self,
+        zk_web3: Web3,
+        eth_web3: Web3,
+        key: str,
+        from_acct: LocalAccount,
+        to_acct: LocalAccount,
+        amount: float,
+        funder_lock: Callable[[], ContextManager] = nullcontext,
+    ):
+        self.zk_web3 = zk_web3
+        self.eth_web3 = eth_web3
+        self.key = key
+        self.from_acct = from_acct
+        self.to_acct = to_acct
+        self.amount = amount
+        self.funder_lock = funder_lock
+        self.checkpoints = CheckpointStore()
+        self.nonce_mngr = NonceManager()
+        self.signing_service = SigningService()
+        self.l1_receipts = get_receipt_tracker(Mainnet.ETHEREUM)
+        self._l1_receipt = None
+        self._l1_tx_hash = None
+        self.checkpoint = self.checkpoints.get(key)
+        if (
+            self.checkpoint is not None
+            and self.checkpoint["state"] != DepositState.L2_FINALIZED.value
+        ):
+            logger.info(f"Resuming deposit {key} from {self.checkpoint['state']}")
+        else:
+            self.checkpoint = None
+
+    def ensure_l2_hash(self) -> HexBytes:
+        """
+        Runs the L1 steps that are not done yet and returns the L2 hash.
+
+        Returns:
+            HexBytes: The hash of the L2 priority operation.
+        """
+        self.send_l1()
+        if self.pending_l1_hash() is not None:
+            self._wait_l1()
+        if self.checkpoint["state"] == DepositState.L1_SENT.value:
+            self._recover_l1()
+        if self.checkpoint["state"] == DepositState.L1_MINED.value:
+            self._derive_l2_hash()
+        return HexBytes(self.checkpoint["l2_hash"])
+
+    def send_l1(self) -> None:
+        """
+        Sends the L1 deposit unless an earlier run did.
+
+        Only this step uses the funder's nonce, funder_lock is held around it
+        and not around the waits.
+        """
+        if self.checkpoint is None:
+            self._send_l1()
+
+    def pending_l1_hash(self) -> HexBytes | None:
+        """
+        Returns the hash of the L1 deposit sent by send_l1 until it is confirmed.
+        """
+        if self.checkpoint["state"] == DepositState.L1_SENT.value:
+            return self._l1_tx_hash
+        return None
+
+    def confirm_l1(self, l1_tx_receipt) -> None:
+        """
+        Records the mined L1 deposit.
+
+        Args:
+            l1_tx_receipt (AttributeDict): The receipt of the L1 deposit.
+
+        Raises:
+            RuntimeError: If the L1 deposit failed.
+        """
+        # Check if deposit transaction was successful
+        if not l1_tx_receipt["status"]:
+            self.checkpoints.clear(self.key)
+            raise RuntimeError("Deposit transaction on L1 network failed")
+
+        self.checkpoint = self.checkpoints.save(
+            self.key,
+            DepositState.L1_MINED.value,
+            l1_hash=Web3.to_hex(l1_tx_receipt["transactionHash"]),
+        )
+        self._l1_receipt = l1_tx_receipt
+
+    def l2_timeout(self) -> float:
+        """
+        Returns the seconds left to wait for the L2 transaction.
+        """
+        return max(self.checkpoint["l2_deadline"] - time.time(), self.MIN_RESUME_WAIT)
+
+    def finish(self, l2_receipt) -> tuple[str, str]:
+        """
+        Records the finalized L2 transaction.
+
+        Args:
+            l2_receipt (AttributeDict): The receipt of the L2 transaction.
+
+        Returns:
+            tuple[str, str]: Deposit transaction hashes on L1 and L2 networks.
+        """
+        l2_hash = Web3.to_hex(l2_receipt["transactionHash"])
+        self.checkpoint = self.checkpoints.save(
+            self.key, DepositState.L2_FINALIZED.value, l2_tx_hash=l2_hash
+        )
+        return self.checkpoint["l1_hash"], l2_hash
+
+    def _send_l1(self) -> None:
+        main_contract = get_main_contract(self.zk_web3)
+        amount_wei = Web3.to_wei(self.amount, "ether")
+        gas_price = get_fee_oracle(Mainnet.ETHEREUM).gas_price()
+        base_cost = main_contract.functions.l2TransactionBaseCost(
+            gas_price, self.L2_GAS_LIMIT, self.L2_GAS_PER_PUBDATA
+        ).call()
+
+        addr = self.from_acct.address
+        # the same call zksync2 makes for an ETH deposit, refunds go to the funder
+        tx = main_contract.functions.requestL2Transaction(
+            self.to_acct.address,
+            amount_wei,
+            b"",
+            self.L2_GAS_LIMIT,
+            self.L2_GAS_PER_PUBDATA,
+            [],
+            addr,
+        ).build_transaction(
+            {
+                "from": addr,
+                "chainId": self.eth_web3.eth.chain_id,
+                "gas": self.L1_GAS_LIMIT,
+                "gasPrice": gas_price,
+                "value": base_cost + amount_wei,
+            }
+        )
+        start_block = self.eth_web3.eth.block_number
+
+        with self.funder_lock(), self.nonce_mngr.use_nonce(
+            Mainnet.ETHEREUM, addr
+        ) as nonce:
+            self.checkpoint = self.checkpoints.save(
+                self.key,
+                DepositState.L1_SENT.value,
+                from_addr=addr,
+                to_addr=self.to_acct.address,
+                # bulk funding passes the shortfall as a Decimal
+                amount=str(self.amount),
+                l1_nonce=nonce,
+                l1_start_block=start_block,
+            )
+            tx["nonce"] = nonce
+            self._l1_tx_hash = self.eth_web3.eth.send_raw_transaction(
+                self.signing_service.sign(self.from_acct.key, tx)
+            )
+
+    def _recover_l1(self) -> None:
+        """
+        Finds the deposit of an interrupted L1_SENT step or sends it if it never left.
+        """
+        nonce = self.checkpoint["l1_nonce"]
+        addr = self.from_acct.address
+        deadline = time.monotonic() + self.L1_MINE_TIMEOUT
+        while self.eth_web3.eth.get_transaction_count(addr) <= nonce:
+            # resending a pending deposit would reuse its nonce and replace it
+            if self.eth_web3.eth.get_transaction_count(addr, "pending") <= nonce:
+                logger.info(f"Deposit {self.key} was never sent, sending it again")
+                self.checkpoints.clear(self.key)
+                self.checkpoint = None
+                self._send_l1()
+                return self._wait_l1()
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    f"Nonce {nonce} of {addr} is still pending after "
+                    f"{self.L1_MINE_TIMEOUT} s, deposit {self.key} is kept"
+                )
+            logger.info(f"Deposit {self.key} is pending, waiting for it to be mined")
+            time.sleep(self.L1_POLL_INTERVAL)
+
+        start = self.checkpoint["l1_start_block"]
+        end = min(self.eth_web3.eth.block_number, start + self.MAX_RECOVERY_BLOCKS)
+        for number in range(start, end + 1):
+            block = self.eth_web3.eth.get_block(number, full_transactions=True)
+            for tx in block["transactions"]:
+                if tx["from"] != addr or tx["nonce"] != nonce:
+                    continue
+                if not self._is_deposit(tx):
+                    # the nonce went to another transaction, the deposit never can
+                    logger.info(
+                        f"Nonce {nonce} of {addr} was used by another transaction, "
+                        f"sending deposit {self.key} again"
+                    )
+                    self.checkpoints.clear(self.key)
+                    self.checkpoint = None
+                    self._send_l1()
+                    return self._wait_l1()
+                return self.confirm_l1(
+                    self.eth_web3.eth.get_transaction_receipt(tx["hash"])
+                )
+
+        raise RuntimeError(
+            f"Nonce {nonce} of {addr} was used, but deposit "
+            f"{self.key} was not found in blocks {start}-{end}"
+        )
+
+    def _is_deposit(self, tx) -> bool:
+        main_contract = get_main_contract(self.zk_web3)
+        if tx["to"] != main_contract.address:
+            return False
+        func, args = main_contract.decode_function_input(tx["input"])
+        return (
+            func.fn_name == "requestL2Transaction"
+            and args["_contractL2"] == self.to_acct.address
+        )
+
+    def _wait_l1(self) -> None:
+        # an unmined deposit keeps its L1_SENT checkpoint and is recovered later
+        self.confirm_l1(
+            self.l1_receipts.wait(self._l1_tx_hash, timeout=self.L1_MINE_TIMEOUT)
+        )
+
+    def _derive_l2_hash(self) -> None:
+        l1_tx_receipt = self._l1_receipt
+        if l1_tx_receipt is None:
+            l1_tx_receipt = self.eth_web3.eth.get_transaction_receipt(
+                self.checkpoint["l1_hash"]
+            )
+
+        # Get hash of deposit transaction on L2 network
+        events = (
+            get_main_contract(self.zk_web3)
+            .events.NewPriorityRequest()
+            .process_receipt(l1_tx_receipt, errors=DISCARD)
+        )
+        if not events:
+            raise RuntimeError(
+                f"Deposit {self.key} has no priority request in its L1 receipt"
+            )
+        l2_hash = events[0].args.txHash
+        self.checkpoint = self.checkpoints.save(
+            self.key,
+            DepositState.L2_HASH_KNOWN.value,
+            l2_hash=Web3.to_hex(l2_hash),
+            l2_deadline=time.time() + self.L2_TIMEOUT,
+        )
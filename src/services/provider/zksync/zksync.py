@@ -1,18 +1,22 @@
 import time
 from services.managers.account.ers import ErsAccountManager
 from services.provider.base import BaseProvider
+from services.provider.zksync.deposits import ResumableDeposit
+from services.tracker.receipts import get_receipt_tracker
 from utils.enums import Mainnet, Operations, CryptoCurrencies
 from eth_account.signers.local import LocalAccount
-from zksync2.core.types import Token
-from zksync2.manage_contracts.zksync_contract import ZkSyncContract
-from zksync2.provider.eth_provider import EthereumProvider
 from zksync2.transaction.transaction_builders import TxFunctionCall
-from zksync2.core.types import ZkBlockParams, EthBlockParams
-from zksync2.signer.eth_signer import PrivateKeyEthSigner
+from zksync2.core.types import EthBlockParams
+from zksync2.transaction.transaction712 import Transaction712
 from eth_utils import to_checksum_address
 from eth_typing import HexStr
+from hexbytes import HexBytes
 from web3 import Web3
+from services.managers.fees.core import get_fee_oracle
+from services.managers.gas.core import get_gas_limits
 from services.managers.mainnet.core import MainnetManager
+from services.managers.nonce.core import NonceManager
+from services.managers.signing.core import SigningService
 from utils.utils import singleton
 from utils.logger import logger
 
@@ -35,6 +39,8 @@ class ZksyncEraProvider(BaseProvider):
         },
     }
 
+    L2_TRANSFER_GAS_RESERVE = 1_000_000
+
     def __init__(self):
         """
         Initialize the ZksyncEraProvider.
@@ -42,6 +48,11 @@ class ZksyncEraProvider(BaseProvider):
         mainnet_mngr = MainnetManager()
         self.zk_web3 = mainnet_mngr.zk_web3
         self.eth_web3 = mainnet_mngr.eth_web3
+        self.nonce_mngr = NonceManager()
+        self.signing_service = SigningService()
+        self.receipt_tracker = get_receipt_tracker(Mainnet.ZKSYNC_ERA)
+        self.zk_fee_oracle = get_fee_oracle(Mainnet.ZKSYNC_ERA)
+        self.gas_limits = get_gas_limits(Mainnet.ZKSYNC_ERA)
         super().__init__()
 
     def get_balance(self, token: CryptoCurrencies, acc: LocalAccount) -> float:
@@ -149,6 +160,43 @@ class ZksyncEraProvider(BaseProvider):
                 "Only transferring ETH on ZKSYNC_ERA is supported"
             )
 
+    def transfer_and_bridge_many(
+        self,
+        from_acct: LocalAccount,
+        to_accts: list[LocalAccount],
+        from_net: Mainnet,
+        to_net: Mainnet,
+        token: CryptoCurrencies,
+        amount: float,
+    ) -> dict[str, HexStr | Exception]:
+        """
+        Fund many accounts on L2 from one L1 account with a single bridge deposit.
+
+        Args:
+            from_acct (LocalAccount): The account paying for the funding on L1 and L2.
+            to_accts (list[LocalAccount]): The accounts to fund.
+            from_net (Mainnet): The network the funds come from.
+            to_net (Mainnet): The network the accounts are funded on.
+            token (CryptoCurrencies): The token to fund with.
+            amount (float): The amount every account receives.
+
+        Raises:
+            NotImplementedError: If the funding is not supported
+
+        Returns:
+            dict[str, HexStr | Exception]: The L2 transfer hash or the error per funded address.
+        """
+        if (
+            from_net == Mainnet.ETHEREUM
+            and to_net == Mainnet.ZKSYNC_ERA
+            and token == CryptoCurrencies.ETH
+        ):
+            return self._fund_many_on_zksync_era(from_acct, to_accts, amount)
+        else:
+            raise NotImplementedError(
+                "Only transferring ETH on ZKSYNC_ERA is supported"
+            )
+
     def _transfer_eth(
         self, from_acct: LocalAccount, to_acc: LocalAccount, amount: float
     ) -> HexStr:
@@ -163,54 +211,223 @@ class ZksyncEraProvider(BaseProvider):
         Returns:
             HexStr: The transaction hash of the transfer
         """
+        tx_hash = self._send_eth(from_acct, to_acc, amount)
+        # Wait for transaction to be included in a block
+        self.receipt_tracker.wait(tx_hash, timeout=10000)
+
+        # Return the transaction hash of the transfer
+        return tx_hash.hex()
+
+    def _send_eth(
+        self, from_acct: LocalAccount, to_acc: LocalAccount, amount: float
+    ) -> HexBytes:
+        """
+        Sign and send an ETH transfer on zkSync network without waiting for it.
+
+        Args:
+            from_acct (LocalAccount): The account to transfer from
+            to_acc (LocalAccount): The account to transfer to
+            amount (float): The amount of ETH to transfer
+
+        Returns:
+            HexBytes: The transaction hash of the transfer
+        """
         # Get chain id of zkSync network
         chain_id = self.zk_web3.zksync.chain_id
 
-        # Signer is used to generate signature of provided transaction
-        signer = PrivateKeyEthSigner(self.acc, chain_id)
+        # Get current fees in Wei
+        fees = self.zk_fee_oracle.get_fees()
 
-        # Get nonce of ETH address on zkSync network
-        nonce = self.zk_web3.zksync.get_transaction_count(
-            self.account.address, ZkBlockParams.COMMITTED.value
-        )
+        # Nonce of ETH address on zkSync network is handed out locally
+        with self.nonce_mngr.use_nonce(Mainnet.ZKSYNC_ERA, from_acct.address) as nonce:
+            tx_712 = self._build_eth_transfer(
+                chain_id, nonce, from_acct, to_acc, amount, fees
+            )
+
+            # Sign message & encode it
+            msg = self.signing_service.sign(from_acct.key, tx_712)
+
+            # Transfer ETH
+            tx_hash = self.zk_web3.zksync.send_raw_transaction(msg)
+            self.gas_limits.learn(tx_hash, {"to": tx_712.to, "data": tx_712.data})
+            return tx_hash
+
+    def _build_eth_transfer(
+        self,
+        chain_id: int,
+        nonce: int,
+        from_acct: LocalAccount,
+        to_acc: LocalAccount,
+        amount: float,
+        fees: dict[str, int],
+    ) -> Transaction712:
+        """
+        Build an unsigned EIP-712 ETH transfer on zkSync network.
 
-        # Get current gas price in Wei
-        gas_price = self.zk_web3.zksync.gas_price
+        Args:
+            chain_id (int): The chain id of the zkSync network
+            nonce (int): The nonce of the transfer
+            from_acct (LocalAccount): The account to transfer from
+            to_acc (LocalAccount): The account to transfer to
+            amount (float): The amount of ETH to transfer
+            fees (dict[str, int]): The EIP-1559 fees of the transfer
 
+        Returns:
+            Transaction712: The transfer ready to be signed
+        """
         # Create transaction
         tx_func_call = TxFunctionCall(
-            chain_id=5,
+            chain_id=chain_id,
             nonce=nonce,
             from_=from_acct.address,
             to=to_checksum_address(to_acc.address),
             value=self.zk_web3.to_wei(amount, "ether"),
             data=HexStr("0x"),
             gas_limit=0,  # UNKNOWN AT THIS STATE
-            gas_price=gas_price,
-            max_priority_fee_per_gas=100_000_000,
+            gas_price=fees["maxFeePerGas"],
+            max_priority_fee_per_gas=fees["maxPriorityFeePerGas"],
         )
 
-        # ZkSync transaction gas estimation
-        est_gas = self.zk_web3.zksync.eth_estimate_gas(tx_func_call.tx)
+        # ZkSync transaction gas estimation, shared by all plain transfers
+        est_gas = self.gas_limits.gas_limit(
+            tx_func_call.tx,
+            estimate=lambda: self.zk_web3.zksync.eth_estimate_gas(tx_func_call.tx),
+        )
 
         # Convert transaction to EIP-712 format
-        tx_712 = tx_func_call.tx712(est_gas)
+        return tx_func_call.tx712(est_gas)
 
-        # Sign message & encode it
-        signed_message = signer.sign_typed_data(tx_712.to_eip712_struct())
+    def _fund_many_on_zksync_era(
+        self,
+        from_acct: LocalAccount,
+        to_accts: list[LocalAccount],
+        amount: float,
+    ) -> dict[str, HexStr | Exception]:
+        """
+        Bridge the total once to the L2 address of the funder and fan it out on L2.
 
-        # Encode signed message
-        msg = tx_712.encode(signed_message)
+        Only the shortfall between the L2 balance of the funder and the total
+        (plus a gas reserve for the L2 transfers) is bridged. The L2 transfers
+        are sent back to back with locally managed nonces and awaited together.
 
-        # Transfer ETH
-        tx_hash = self.zk_web3.zksync.send_raw_transaction(msg)
-        # Wait for transaction to be included in a block
-        tx_receipt: self.zk_web3.zksync.wait_for_transaction_receipt(
-            tx_hash, timeout=10000, poll_latency=10
+        Args:
+            from_acct (LocalAccount): The account paying for the funding on L1 and L2.
+            to_accts (list[LocalAccount]): The accounts to fund.
+            amount (float): The amount every account receives.
+
+        Returns:
+            dict[str, HexStr | Exception]: The L2 transfer hash or the error per funded address.
+        """
+        fees = self.zk_fee_oracle.get_fees()
+        needed_wei = len(to_accts) * (
+            Web3.to_wei(amount, "ether")
+            + self.L2_TRANSFER_GAS_RESERVE * fees["maxFeePerGas"]
+        )
+        l2_balance_wei = self.zk_web3.zksync.get_balance(
+            from_acct.address, EthBlockParams.LATEST.value
         )
+        if needed_wei > l2_balance_wei:
+            logger.info(
+                f"Bridging funds for {len(to_accts)} wallets to (Zksync Era) {from_acct.address}"
+            )
+            self._bridge_eth_to_zksync_era(
+                Web3.from_wei(needed_wei - l2_balance_wei, "ether"), from_acct
+            )
 
-        # Return the transaction hash of the transfer
-        return tx_hash.hex()
+        results = {}
+        sent = self._send_eth_many(from_acct, to_accts, amount, fees)
+        pending = {}
+        for acct in to_accts:
+            try:
+                tx_hash = sent.get(acct.address)
+                if tx_hash is None:
+                    # fall back to one by one sends with freshly synced nonces
+                    tx_hash = self._send_eth(from_acct, acct, amount)
+                elif isinstance(tx_hash, Exception):
+                    raise tx_hash
+                pending[acct.address] = (
+                    tx_hash,
+                    self.receipt_tracker.track(tx_hash, timeout=10000),
+                )
+            except Exception as e:
+                logger.error(f"Funding {acct.address} failed: {e}")
+                results[acct.address] = e
+
+        for addr, (tx_hash, fut) in pending.items():
+            try:
+                receipt = fut.result()
+                if not receipt["status"]:
+                    raise RuntimeError(f"Funding transaction {tx_hash.hex()} reverted")
+                results[addr] = tx_hash.hex()
+            except Exception as e:
+                logger.error(f"Funding {addr} failed: {e}")
+                results[addr] = e
+
+        funded = sum(1 for res in results.values() if not isinstance(res, Exception))
+        logger.info(f"Funded {funded}/{len(to_accts)} wallets on Zksync Era")
+        return results
+
+    def _send_eth_many(
+        self,
+        from_acct: LocalAccount,
+        to_accts: list[LocalAccount],
+        amount: float,
+        fees: dict[str, int],
+    ) -> dict[str, HexBytes | Exception]:
+        """
+        Build all L2 transfers of a fan-out, sign them as one batch and send them.
+
+        Building stops at the first failure and sending stops at the first
+        rejected transaction. The local nonce is then reset, and the accounts
+        that are left out of the result can be sent one by one.
+
+        Args:
+            from_acct (LocalAccount): The account to transfer from.
+            to_accts (list[LocalAccount]): The accounts to transfer to.
+            amount (float): The amount every account receives.
+            fees (dict[str, int]): The EIP-1559 fees of the transfers.
+
+        Returns:
+            dict[str, HexBytes | Exception]: The transfer hash or the send error per address.
+        """
+        chain_id = self.zk_web3.zksync.chain_id
+        built = []
+        failed = False
+        for acct in to_accts:
+            try:
+                nonce = self.nonce_mngr.next_nonce(
+                    Mainnet.ZKSYNC_ERA, from_acct.address
+                )
+                built.append(
+                    (
+                        acct,
+                        self._build_eth_transfer(
+                            chain_id, nonce, from_acct, acct, amount, fees
+                        ),
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"Building the transfer to {acct.address} failed: {e}")
+                failed = True
+                break
+
+        raw_txs = self.signing_service.sign_many(
+            [(from_acct.key, tx_712) for _, tx_712 in built]
+        )
+        sent = {}
+        for (acct, tx_712), raw_tx in zip(built, raw_txs):
+            try:
+                tx_hash = self.zk_web3.zksync.send_raw_transaction(raw_tx)
+                sent[acct.address] = tx_hash
+                self.gas_limits.learn(tx_hash, {"to": tx_712.to, "data": tx_712.data})
+            except Exception as e:
+                sent[acct.address] = e
+                failed = True
+                break
+
+        if failed:
+            self.nonce_mngr.reset(Mainnet.ZKSYNC_ERA, from_acct.address)
+        return sent
 
     def _transfer_and_bridge_eth_to_zksync_era(
         self,
@@ -221,39 +438,21 @@ class ZksyncEraProvider(BaseProvider):
         logger.info(
             f"Transferring and bridging ETH from (Mainnet) {from_acct.address} to (Zksync Era) {to_acct.address}"
         )
-        eth_prov = EthereumProvider(self.zk_web3, self.eth_web3, from_acct)
-        l1_tx_receipt = eth_prov.deposit(
-            to=to_acct.address,
-            token=Token.create_eth(),
-            amount=Web3.to_wei(amount, "ether"),
-            gas_price=self.eth_web3.eth.gas_price,
-        )
-
-        # Check if deposit transaction was successful
-        if not l1_tx_receipt["status"]:
-            raise RuntimeError("Deposit transaction on L1 network failed")
-
-        # Get ZkSync contract on L1 network
-        zksync_contr = ZkSyncContract(
-            self.zk_web3.zksync.main_contract_address, self.eth_web3, from_acct
-        )
-
-        # Get hash of deposit transaction on L2 network
-        l2_hash = self.zk_web3.zksync.get_l2_hash_from_priority_op(
-            l1_tx_receipt, zksync_contr
+        deposit = ResumableDeposit(
+            self.zk_web3,
+            self.eth_web3,
+            f"deposit:{from_acct.address}:{to_acct.address}",
+            from_acct,
+            to_acct,
+            amount,
         )
+        l2_hash = deposit.ensure_l2_hash()
 
         # Wait for deposit transaction on L2 network to be finalized (5-7 minutes)
-
-        l2_tx_receipt = self.zk_web3.zksync.wait_for_transaction_receipt(
-            transaction_hash=l2_hash, timeout=360, poll_latency=10
-        )
-        logger.info(f"Successfully transfered and bridged ETH")
+        l2_tx_receipt = self.receipt_tracker.wait(l2_hash, timeout=deposit.l2_timeout())
+        logger.info("Successfully transfered and bridged ETH")
         # return deposit transaction hashes from L1 and L2 networks
-        return (
-            l1_tx_receipt["transactionHash"].hex(),
-            l2_tx_receipt["transactionHash"].hex(),
-        )
+        return deposit.finish(l2_tx_receipt)
 
     def _bridge_eth_to_zksync_era(
         self,
@@ -261,48 +460,26 @@ class ZksyncEraProvider(BaseProvider):
         acct: LocalAccount,
     ) -> tuple[HexStr, HexStr]:
         """
-        Bridge ETH from L2 to L1 network.
+        Bridge ETH from L1 to L2 network.
+
+        Every step of the deposit is checkpointed, so an interrupted bridge
+        resumes where it stopped instead of sending a second deposit.
 
         Args:
-            amount (float): How much the withdrawal will contain.
+            amount (float): How much the deposit will contain.
             acct (LocalAccount): The local account used for signing transactions.
 
         Returns:
             tuple[HexStr, HexStr]: Deposit transaction hashes on L1 and L2 networks.
         """
-
-        eth_prov = EthereumProvider(self.zk_web3, self.eth_web3, acct)
-        l1_tx_receipt = eth_prov.deposit(
-            to=acct.address,
-            token=Token.create_eth(),
-            amount=Web3.to_wei(amount, "ether"),
-            gas_price=self.eth_web3.eth.gas_price,
-        )
-
-        # Check if deposit transaction was successful
-        if not l1_tx_receipt["status"]:
-            raise RuntimeError("Deposit transaction on L1 network failed")
-
-        # Get ZkSync contract on L1 network
-        zksync_contr = ZkSyncContract(
-            self.zk_web3.zksync.main_contract_address, self.eth_web3, acct
-        )
-
-        # Get hash of deposit transaction on L2 network
-        l2_hash = self.zk_web3.zksync.get_l2_hash_from_priority_op(
-            l1_tx_receipt, zksync_contr
+        deposit = ResumableDeposit(
+            self.zk_web3, self.eth_web3, f"bridge:{acct.address}", acct, acct, amount
         )
+        l2_hash = deposit.ensure_l2_hash()
 
         # Wait for deposit transaction on L2 network to be finalized (5-7 minutes)
-        print(
-            "Waiting for deposit transaction on L2 network to be finalized (5-7 minutes)"
-        )
-        l2_tx_receipt = self.zk_web3.zksync.wait_for_transaction_receipt(
-            transaction_hash=l2_hash, timeout=360, poll_latency=10
-        )
-        print("Deposit transaction on L2 network was finalized")
+        logger.info(f"Waiting for deposit {Web3.to_hex(l2_hash)} to be finalized on L2")
+        l2_tx_receipt = self.receipt_tracker.wait(l2_hash, timeout=deposit.l2_timeout())
+        logger.info("Deposit transaction on L2 network was finalized")
         # return deposit transaction hashes from L1 and L2 networks
-        return (
-            l1_tx_receipt["transactionHash"].hex(),
-            l2_tx_receipt["transactionHash"].hex(),
-        )
+        return deposit.finish(l2_tx_receipt)
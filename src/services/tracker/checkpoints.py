@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import threading
+import time
+
+from utils.constants import CHECKPOINTS_PATH
+from utils.utils import singleton
+
+
+@singleton
+class CheckpointStore:
+    """
+    Durable checkpoints of multi-step operations, keyed by operation.
+
+    Every save is committed before the next step starts, so a restarted worker
+    resumes an operation from its last checkpoint instead of repeating it.
+
+    Methods:
+        get(key): Returns the checkpoint of an operation or None.
+        save(key, state, **data): Stores the state of an operation and merges its data.
+        clear(key): Removes the checkpoint of an operation.
+    """
+
+    def __init__(self):
+        CHECKPOINTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            CHECKPOINTS_PATH, timeout=30, check_same_thread=False
+        )
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    key TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key: str) -> dict | None:
+        """
+        Returns the checkpoint of an operation or None.
+
+        Args:
+            key (str): The key of the operation.
+
+        Returns:
+            dict | None: The data of the checkpoint with its `state`.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, data FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[1]), "state": row[0]}
+
+    def save(self, key: str, state: str, **data) -> dict:
+        """
+        Stores the state of an operation and merges its data.
+
+        Args:
+            key (str): The key of the operation.
+            state (str): The step the operation reached.
+            **data: JSON serializable data of the step.
+
+        Returns:
+            dict: The merged data of the checkpoint with its `state`.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **data}
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, state, data, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, state, json.dumps(merged), time.time()),
+            )
+        return {**merged, "state": state}
+
+    def clear(self, key: str) -> None:
+        """
+        Removes the checkpoint of an operation.
+
+        Args:
+            key (str): The key of the operation.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
@@ -0,0 +1,180 @@
+import atexit
+import fcntl
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Iterator
+
+from utils.logger import logger
+
+
+class TransactionJournal:
+    """
+    Segmented, append-only journal of JSON records.
+
+    Every process appends to its own active segment, so concurrent workers never
+    write to the same file. Records are buffered and written with one write and
+    one fsync per batch. Full segments are sealed, and once enough sealed
+    segments pile up they are compacted into a single file under a file lock.
+
+    Segment files, read in this order:
+        compact-<ts>.jsonl: Compacted records.
+        seg-<ts>-<pid>.jsonl: Sealed segments.
+        active-<pid>-<ts>.jsonl: Segments still being written.
+
+    Args:
+        journal_dir (str | Path): The directory holding the segments.
+        flush_every (int): The number of buffered records that triggers a flush.
+        flush_interval (float): The maximum number of seconds a record stays buffered.
+        segment_max_bytes (int): The size after which a segment is sealed.
+        compact_threshold (int): The number of sealed segments that triggers a compaction.
+
+    Methods:
+        append(record): Buffers a record for the next batched write.
+        flush(): Writes and fsyncs all buffered records.
+        read(): Yields all records, oldest segment first.
+        compact(): Merges all sealed segments into one compacted segment.
+    """
+
+    def __init__(
+        self,
+        journal_dir,
+        flush_every: int = 64,
+        flush_interval: float = 1.0,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        compact_threshold: int = 16,
+    ):
+        self.journal_dir = Path(journal_dir)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_threshold = compact_threshold
+        self._buffer: list[bytes] = []
+        self._lock = threading.Lock()
+        self._fd = None
+        self._segment_path = None
+        self._seal_orphans()
+
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="tx-journal", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def append(self, record: dict) -> None:
+        """
+        Buffers a record for the next batched write.
+
+        Args:
+            record (dict): The JSON serializable record.
+        """
+        line = (json.dumps(record, default=str) + "\n").encode()
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """
+        Writes and fsyncs all buffered records.
+        """
+        with self._lock:
+            self._flush_locked()
+
+    def read(self) -> Iterator[dict]:
+        """
+        Yields all records, oldest segment first.
+        """
+        self.flush()
+        with open(self.journal_dir / ".compact.lock", "w") as lock_file:
+            # keeps a compaction from deleting segments while they are read
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            segments = (
+                self._segments("compact-")
+                + self._segments("seg-")
+                + self._segments("active-")
+            )
+            for path in segments:
+                with open(path, "rb") as f:
+                    for line in f:
+                        # a crash can leave a torn last line behind
+                        if line.endswith(b"\n"):
+                            yield json.loads(line)
+
+    def compact(self) -> None:
+        """
+        Merges all sealed segments into one compacted segment.
+        """
+        with open(self.journal_dir / ".compact.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            sealed = self._segments("compact-") + self._segments("seg-")
+            if len(sealed) < 2:
+                return
+
+            target = self.journal_dir / f"compact-{time.time_ns()}.jsonl"
+            tmp = target.with_suffix(".tmp")
+            with open(tmp, "wb") as out:
+                for path in sealed:
+                    with open(path, "rb") as f:
+                        for line in f:
+                            if line.endswith(b"\n"):
+                                out.write(line)
+                out.flush()
+                os.fsync(out.fileno())
+            tmp.replace(target)
+            for path in sealed:
+                path.unlink()
+            logger.info(f"Compacted {len(sealed)} journal segments into {target.name}")
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        if self._fd is None:
+            self._open_segment()
+        os.write(self._fd, b"".join(self._buffer))
+        os.fsync(self._fd)
+        self._buffer.clear()
+        if os.fstat(self._fd).st_size >= self.segment_max_bytes:
+            self._seal_segment()
+
+    def _open_segment(self) -> None:
+        self._segment_path = (
+            self.journal_dir / f"active-{os.getpid()}-{time.time_ns()}.jsonl"
+        )
+        self._fd = os.open(
+            self._segment_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+        )
+
+    def _seal_segment(self) -> None:
+        os.close(self._fd)
+        self._fd = None
+        self._segment_path.replace(
+            self.journal_dir / f"seg-{time.time_ns()}-{os.getpid()}.jsonl"
+        )
+        if len(self._segments("seg-")) >= self.compact_threshold:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def _seal_orphans(self) -> None:
+        # active segments of processes that died are never sealed by their writer
+        for path in self._segments("active-"):
+            pid = int(path.name.split("-")[1])
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                path.replace(self.journal_dir / f"seg-{time.time_ns()}-{pid}.jsonl")
+            except PermissionError:
+                pass
+
+    def _segments(self, prefix: str) -> list[Path]:
+        return sorted(self.journal_dir.glob(f"{prefix}*.jsonl"))
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error(f"Flushing the transaction journal failed: {e}")
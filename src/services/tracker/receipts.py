@@ -0,0 +1,169 @@
+import asyncio
+from concurrent.futures import Future
+import threading
+import time
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+
+from services.managers.mainnet.batch import batch_request
+from services.managers.mainnet.core import MainnetManager
+from services.managers.mainnet.metrics import rpc_operation
+from utils.enums import Mainnet
+from utils.logger import logger
+
+
+class ReceiptTracker:
+    """
+    Watches the blocks of one chain and resolves receipts of pending transactions.
+
+    A single background thread polls the block number and, once per new block,
+    asks for the receipts of all pending transactions in one JSON-RPC batch. RPC
+    volume therefore grows with the block count instead of the number of
+    transactions waited on. The thread stops while nothing is pending.
+
+    Args:
+        net (Mainnet): The chain whose transactions are tracked.
+
+    Methods:
+        track(tx_hash, timeout, callback): Returns a future resolved with the receipt of the transaction.
+        wait(tx_hash, timeout): Blocks until the receipt of the transaction is known.
+        wait_async(tx_hash, timeout): Awaits the receipt of the transaction.
+    """
+
+    POLL_INTERVALS = {Mainnet.ETHEREUM: 2.0, Mainnet.ZKSYNC_ERA: 1.0}
+
+    def __init__(self, net: Mainnet):
+        self.net = net
+        self.web3 = MainnetManager().get_web3(net)
+        self.poll_interval = self.POLL_INTERVALS[net]
+        self._pending: dict[HexBytes, tuple[Future, float]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_block = -1
+
+    def track(self, tx_hash, timeout: float, callback=None) -> Future:
+        """
+        Returns a future resolved with the receipt of the transaction.
+
+        Args:
+            tx_hash (HexBytes | str): The hash of the transaction.
+            timeout (float): Seconds after which the future fails with TimeExhausted.
+            callback (callable): Optional callable invoked with the resolved future.
+
+        Returns:
+            Future: The future of the receipt.
+        """
+        tx_hash = HexBytes(tx_hash)
+        with self._lock:
+            if tx_hash in self._pending:
+                fut = self._pending[tx_hash][0]
+            else:
+                fut = Future()
+                self._pending[tx_hash] = (fut, time.monotonic() + timeout)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"receipts-{self.net.value}", daemon=True
+                )
+                self._thread.start()
+        if callback is not None:
+            fut.add_done_callback(callback)
+        return fut
+
+    def wait(self, tx_hash, timeout: float) -> AttributeDict:
+        """
+        Blocks until the receipt of the transaction is known.
+
+        Args:
+            tx_hash (HexBytes | str): The hash of the transaction.
+            timeout (float): Seconds to wait before raising TimeExhausted.
+
+        Returns:
+            AttributeDict: The receipt of the transaction.
+        """
+        return self.track(tx_hash, timeout).result()
+
+    async def wait_async(self, tx_hash, timeout: float) -> AttributeDict:
+        """
+        Awaits the receipt of the transaction.
+
+        Args:
+            tx_hash (HexBytes | str): The hash of the transaction.
+            timeout (float): Seconds to wait before raising TimeExhausted.
+
+        Returns:
+            AttributeDict: The receipt of the transaction.
+        """
+        return await asyncio.wrap_future(self.track(tx_hash, timeout))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            try:
+                with rpc_operation("receipt_polling"):
+                    self._poll()
+            except Exception as e:
+                logger.warning(f"Polling receipts on {self.net.value} failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        self._expire()
+        block = self.web3.eth.block_number
+        if block <= self._last_block:
+            return
+
+        with self._lock:
+            hashes = list(self._pending)
+        # HexBytes.hex() drops the 0x prefix on newer hexbytes, nodes require it
+        receipts = batch_request(
+            self.web3,
+            [("eth_getTransactionReceipt", [Web3.to_hex(h)]) for h in hashes],
+        )
+        self._last_block = block
+
+        for tx_hash, receipt in zip(hashes, receipts):
+            if receipt is None or receipt.get("blockNumber") is None:
+                continue
+            with self._lock:
+                fut, _ = self._pending.pop(tx_hash, (None, None))
+            if fut is not None and not fut.done():
+                fut.set_result(AttributeDict.recursive(receipt_formatter(receipt)))
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [h for h, (_, dl) in self._pending.items() if dl < now]
+            futs = [self._pending.pop(h)[0] for h in expired]
+        for tx_hash, fut in zip(expired, futs):
+            if not fut.done():
+                fut.set_exception(
+                    TimeExhausted(
+                        f"Transaction {Web3.to_hex(tx_hash)} is not in the chain after timeout"
+                    )
+                )
+
+
+_trackers: dict[Mainnet, ReceiptTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_receipt_tracker(net: Mainnet) -> ReceiptTracker:
+    """
+    Returns the process-wide ReceiptTracker of a chain.
+
+    Args:
+        net (Mainnet): The chain of the tracker.
+
+    Returns:
+        ReceiptTracker: The tracker shared by all providers on the chain.
+    """
+    with _trackers_lock:
+        if net not in _trackers:
+            _trackers[net] = ReceiptTracker(net)
+        return _trackers[net]
@@ -1,14 +1,49 @@
+import time
+
 import pandas as pd
 
-from utils.constants import TX_HISTORY_PATH
+from services.tracker.journal import TransactionJournal
+from utils.constants import TX_JOURNAL_DIR
+
+TX_COLS = [
+    "op_id",
+    "from_addr",
+    "to_addr",
+    "send_at",
+    "completed_at",
+    "amount",
+    "tx_hash",
+    "tx_status",
+    "details",
+    "logged_at",
+]
 
 
 class TransactionsTracker:
+    """
+    Records the transaction history in an append-only journal.
+
+    Every transaction is a single buffered append, so logging stays O(1) per
+    transaction and several workers can log at once.
+
+    Attributes:
+        journal (TransactionJournal): The journal holding the history.
+
+    Methods:
+        read_tx(): Returns the whole transaction history as a DataFrame.
+        add_tx(...): Appends a transaction to the history.
+        save(): Writes all buffered transactions to disk.
+    """
+
     def __init__(self):
-        self.tx_history = self.read_tx()
+        self.journal = TransactionJournal(TX_JOURNAL_DIR)
+
+    @property
+    def tx_history(self) -> pd.DataFrame:
+        return self.read_tx()
 
-    def read_tx(self):
-        return pd.read_csv(TX_HISTORY_PATH, index_col=0, header=0)
+    def read_tx(self) -> pd.DataFrame:
+        return pd.DataFrame(self.journal.read(), columns=TX_COLS)
 
     def add_tx(
         self,
@@ -22,18 +57,25 @@ class TransactionsTracker:
         tx_status,
         details,
     ):
-        self.tx_history = self.tx_history.iloc[len(self.tx_history)] = [
-            op_id,
-            from_addr,
-            to_add,
-            send_at,
-            completed_at,
-            amount,
-            tx_hash,
-            tx_status,
-            details,
-        ]
-        self.save()
+        self.journal.append(
+            dict(
+                zip(
+                    TX_COLS,
+                    [
+                        op_id,
+                        from_addr,
+                        to_add,
+                        send_at,
+                        completed_at,
+                        amount,
+                        tx_hash,
+                        tx_status,
+                        details,
+                        time.time(),
+                    ],
+                )
+            )
+        )
 
     def save(self):
-        self.tx_history.to_csv(TX_HISTORY_PATH)
+        self.journal.flush()
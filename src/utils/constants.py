@@ -7,10 +7,30 @@ RUN_WORKER_SCRIPT_PATH = PROJECT_ROOT.joinpath("run-worker.py")
 BACKGR_WORKER_LOG_PATH = PROJECT_ROOT.joinpath("data/logs/background_worker.log")
 APP_LOG_PATH = PROJECT_ROOT.joinpath("data/logs/background_worker.log")
 OPS_PATH = PROJECT_ROOT.joinpath("data/pipelines/operations.json")
-TX_HISTORY_PATH = PROJECT_ROOT.joinpath("data/transactions.json")
+TX_JOURNAL_DIR = PROJECT_ROOT.joinpath("data/transactions")
+CHECKPOINTS_PATH = PROJECT_ROOT.joinpath("data/checkpoints.db")
+LOGO_CACHE_DIR = PROJECT_ROOT.joinpath("data/cache")
+RPC_METRICS_PATH = PROJECT_ROOT.joinpath("data/metrics/rpc.prom")
+RPC_CASSETTE_PATH = PROJECT_ROOT.joinpath("data/cassettes/rpc.jsonl.gz")
+WALLET_LOCKS_DIR = PROJECT_ROOT.joinpath("data/locks")
+WORKER_CONTROL_DIR = PROJECT_ROOT.joinpath("data/workers")
 ETH_SUGAR_DADDY_WALLETS_PATH = PROJECT_ROOT.joinpath(
     "data/wallets/sugar_daddy_wallets.csv"
 )
 FARMING_WALLETS_PATH = PROJECT_ROOT.joinpath("data/wallets/farming_wallets.csv")
 IZUMI_SWAP_ABI_PATH = PROJECT_ROOT.joinpath("services/provider/izumi/swap/abi.json")
+IZUMI_QUOTER_ABI_PATH = PROJECT_ROOT.joinpath(
+    "services/provider/izumi/quoter/abi.json"
+)
 ERC_TOKEN_ABI_PATH = PROJECT_ROOT.joinpath("services/provider/erc_token/erc20.json")
+
+ETH_RPC_URL = "https://eth-goerli.public.blastapi.io"
+ZKSYNC_RPC_URL = "https://testnet.era.zksync.dev"
+DEFAULT_CONCURRENCY = 20
+DEFAULT_PARALLEL_PIPES = 4
+RPC_PROBE_INTERVAL = 30
+CONFIG_POLL_INTERVAL = 2
+METRICS_EXPORT_INTERVAL = 15
+WORKER_RESTART_DELAY = 5
+CONTROL_TIMEOUT = 2
+WORKER_ERRORS_KEPT = 20
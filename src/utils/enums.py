@@ -19,3 +19,22 @@ class CryptoCurrencies(Enum):
 class SupportedTokenFarming(Enum):
     ZK_SYNC = "ZK_SYNC"
     IZUMI = "IZI"
+
+
+class ExecutionMode(Enum):
+    SYNC = "sync"
+    ASYNC = "async"
+
+
+class RPCMode(Enum):
+    LIVE = "live"
+    RECORD = "record"
+    REPLAY = "replay"
+    REPLAY_TIMED = "replay_timed"
+
+
+class DepositState(Enum):
+    L1_SENT = "l1_sent"
+    L1_MINED = "l1_mined"
+    L2_HASH_KNOWN = "l2_hash_known"
+    L2_FINALIZED = "l2_finalized"
@@ -4,7 +4,8 @@ from utils.constants import BACKGR_WORKER_LOG_PATH
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
-file_handler = logging.FileHandler(BACKGR_WORKER_LOG_PATH)
+# the log file is only opened once the first record is written
+file_handler = logging.FileHandler(BACKGR_WORKER_LOG_PATH, delay=True)
 formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
@@ -1,16 +1,21 @@
 import os
 from subprocess import Popen, DEVNULL
-import pandas as pd
-from PyInquirer import Validator
-import subprocess
+import time
+from typing import TYPE_CHECKING
+from models.control import format_status, query_metrics, query_workers
+from services.managers.mainnet.metrics import format_summary, read_textfiles
 from utils.logger import logger
 
 from utils.constants import (
     BACKGR_WORKER_LOG_PATH,
     PIPE_PATH,
+    RPC_METRICS_PATH,
     RUN_WORKER_SCRIPT_PATH,
 )
 
+if TYPE_CHECKING:
+    from PyInquirer import Validator
+
 
 class MenuOption:
     instances = []
@@ -21,7 +26,7 @@ class MenuOption:
         msg: str = "",
         choices: list = None,
         type: str = None,
-        validator: Validator = None,
+        validator: "Validator" = None,
         style=None,
         funcs: list = None,
         async_funcs=None,
@@ -76,36 +81,87 @@ def start_worker(self):
 
 
 def stop_worker(self):
-    cmd = ["pkill", "-f", str(RUN_WORKER_SCRIPT_PATH)]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    is_terminated = process.wait() == 0
+    # the workers exit once their running pipelines finished
+    is_terminated = len(query_workers("stop")) > 0
 
     if is_terminated:
-        logger.info("Worker terminated succesfully")
+        logger.info("Worker is stopping")
     return is_terminated
 
 
+def drain_worker(self: MenuOption):
+    workers = query_workers("drain")
+    self.msg = "Draining, running pipelines finish and no new ones start"
+    if workers:
+        self.msg += "\n" + format_status(workers)
+
+
+def resume_worker(self: MenuOption):
+    workers = query_workers("resume")
+    self.msg = "Resumed the background worker"
+    if workers:
+        self.msg += "\n" + format_status(workers)
+
+
+def reload_worker(self):
+    query_workers("reload")
+
+
+def set_worker_errors_msg(self: MenuOption):
+    errors = sorted(
+        (error for errors in query_workers("errors") for error in errors),
+        key=lambda error: error["time"],
+    )
+    if not errors:
+        self.msg = "No errors since the worker started"
+        return
+    self.msg = "Last errors of the background worker\n" + "\n".join(
+        f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(error['time']))} "
+        f"{error['message']}"
+        for error in errors
+    )
+
+
 def get_worker_state():
-    cmd = ["pgrep", "-f", "python " + str(RUN_WORKER_SCRIPT_PATH)]
-    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
-        proc.wait()
-        out, _ = proc.communicate()
-        if out is None:
-            return False
-        else:
-            return len(out.decode()) > 0
+    return query_workers("status")
 
 
 def set_choices_on_worker_state(self: MenuOption):
-    if get_worker_state():
-        self.msg = "Background Worker is running"
-        self.choices = [STOP_BCKGR_WORKER_MENU.name, "Back"]
+    workers = get_worker_state()
+    if workers:
+        self.msg = "Background Worker is running\n" + format_status(workers)
+        draining = all(status["state"] != "running" for status in workers)
+        self.choices = [
+            STOP_BCKGR_WORKER_MENU.name,
+            (RESUME_BCKGR_WORKER_MENU if draining else DRAIN_BCKGR_WORKER_MENU).name,
+            RELOAD_BCKGR_WORKER_MENU.name,
+            WORKER_ERRORS_MENU.name,
+            RPC_METRICS_MENU.name,
+            "Back",
+        ]
     else:
         self.msg = "Background Worker is not running"
-        self.choices = [START_BCKGR_WORKER_MENU.name, "Back"]
+        self.choices = [START_BCKGR_WORKER_MENU.name, RPC_METRICS_MENU.name, "Back"]
+
+
+def set_rpc_metrics_msg(self: MenuOption):
+    series = query_metrics()
+    if not series:
+        # a sharded worker writes one file per shard next to RPC_METRICS_PATH
+        paths = sorted(RPC_METRICS_PATH.parent.glob("rpc*.prom"))
+        if not paths:
+            self.msg = "No RPC metrics yet, they are written while the worker runs"
+            return
+        series = read_textfiles(paths)
+    self.msg = "RPC time per operation, slowest methods first\n" + format_summary(
+        series
+    )
 
 
 def set_choices(self: MenuOption):
+    # pandas is only needed once the strategies are shown
+    import pandas as pd
+
     pipes = pd.read_csv(PIPE_PATH, index_col=0, header=0)
     self.choices = [
         f"({state}) {name} " for name, state in zip(pipes.name, pipes.state)
@@ -165,7 +221,47 @@ STOP_BCKGR_WORKER_MENU = MenuOption(
     choices=[
         "Back",
     ],
-    msg="Succesful stopped the background worker",
+    msg="The background worker stops once the running pipelines finished",
+)
+
+DRAIN_BCKGR_WORKER_MENU = MenuOption(
+    "Drain Worker",
+    type="list",
+    funcs=[drain_worker],
+    choices=[
+        "Back",
+    ],
+    msg="Draining the background worker",
+)
+
+RESUME_BCKGR_WORKER_MENU = MenuOption(
+    "Resume Worker",
+    type="list",
+    funcs=[resume_worker],
+    choices=[
+        "Back",
+    ],
+    msg="Resumed the background worker",
+)
+
+RELOAD_BCKGR_WORKER_MENU = MenuOption(
+    "Reload Worker Config",
+    type="list",
+    funcs=[reload_worker],
+    choices=[
+        "Back",
+    ],
+    msg="The background worker reloads the pipelines and operations",
+)
+
+WORKER_ERRORS_MENU = MenuOption(
+    "Worker Errors",
+    type="list",
+    funcs=[set_worker_errors_msg],
+    choices=[
+        "Back",
+    ],
+    msg="No errors since the worker started",
 )
 
 
@@ -179,6 +275,16 @@ START_BCKGR_WORKER_MENU = MenuOption(
     msg="Succesful started the background worker",
 )
 
+RPC_METRICS_MENU = MenuOption(
+    "RPC Metrics",
+    type="list",
+    funcs=[set_rpc_metrics_msg],
+    choices=[
+        "Back",
+    ],
+    msg="No RPC metrics yet, they are written while the worker runs",
+)
+
 MANAGE_BCKGRD_WORKER_MENU = MenuOption(
     "Manage Background Worker",
     type="list",
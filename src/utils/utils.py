@@ -1,4 +1,9 @@
+import asyncio
+import fcntl
+import os
 from pathlib import Path
+import threading
+from typing import Awaitable, Callable, Hashable
 
 
 def get_project_root() -> Path:
@@ -14,3 +19,103 @@ def singleton(cls):
         return inst[cls]
 
     return getinstance
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, shared by all processes of the host.
+
+    Every instance opens its own descriptor, so instances in different threads
+    exclude each other as well. The lock is not reentrant.
+
+    Args:
+        path (str | Path): The lock file, created if missing.
+
+    Methods:
+        acquire(blocking): Takes the lock, returns False if it is held and `blocking` is False.
+        release(): Releases the lock.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Takes the lock.
+
+        Args:
+            blocking (bool): Whether to wait while another holder has the lock.
+
+        Returns:
+            bool: True once the lock is held, False if it is busy and `blocking` is False.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(
+                fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            )
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """
+        Releases the lock if it is held.
+        """
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AsyncSingleFlight:
+    """
+    Runs at most one call per key at a time on every event loop.
+
+    Coroutines asking for a key that is already being fetched on their loop
+    await the running call instead of starting their own, so a burst of
+    concurrent cache misses costs a single request. Cancelling one caller does
+    not cancel the call the others wait for.
+
+    Methods:
+        run(key, func): Awaits the running call of the key or starts func().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[tuple, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable]):
+        """
+        Awaits the running call of the key or starts func() as that call.
+
+        Args:
+            key (Hashable): What is being fetched.
+            func (Callable[[], Awaitable]): Starts the call when none is running.
+
+        Returns:
+            Any: The result of the call.
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        with self._lock:
+            task = self._calls.get(call_key)
+            if task is None:
+                task = self._calls[call_key] = asyncio.ensure_future(func())
+                task.add_done_callback(lambda _: self._forget(call_key))
+        return await asyncio.shield(task)
+
+    def _forget(self, call_key: tuple) -> None:
+        with self._lock:
+            self._calls.pop(call_key, None)